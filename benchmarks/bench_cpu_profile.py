@@ -0,0 +1,182 @@
+"""CPU execution profile benchmark.
+
+Parses a PDF corpus on CPU once per profile option, each in a fresh process
+so that thread settings and model conversions take effect at load time:
+
+    default        runtime default threading (MINERU_CPU_THREADS=0)
+    threads        shared intra-op thread budget for torch and onnxruntime
+    channels_last  thread budget + channels-last conv nets
+    int8           thread budget + int8 dynamic quantization of Linear layers
+    all            all of the above
+
+Reports pages per second and the accuracy delta against the default run:
+mean text similarity of each page's span contents and the exact-match rate
+of formula latex. Result caches are disabled so every run does full
+inference.
+
+    python benchmarks/bench_cpu_profile.py fixtures/mixed --method ocr
+"""
+import argparse
+import difflib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROFILES = {
+    "default": {"MINERU_CPU_THREADS": "0"},
+    "threads": {},
+    "channels_last": {"MINERU_CPU_CHANNELS_LAST": "true"},
+    "int8": {"MINERU_CPU_INT8": "true"},
+    "all": {"MINERU_CPU_CHANNELS_LAST": "true", "MINERU_CPU_INT8": "true"},
+}
+
+
+def collect_outputs(middle_json):
+    """按页收集span文本和公式latex"""
+    page_texts, formulas = [], []
+    for page_info in middle_json["pdf_info"]:
+        texts = []
+        blocks = list(page_info["preproc_blocks"])
+        while blocks:
+            block = blocks.pop(0)
+            blocks.extend(block.get("blocks", []))
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    if span["type"] in ["inline_equation", "interline_equation"]:
+                        formulas.append(span.get("content", ""))
+                    elif "content" in span:
+                        texts.append(span["content"])
+        page_texts.append(" ".join(texts))
+    return page_texts, formulas
+
+
+def run_worker(args):
+    from miner_u_parser.backend.pipeline.model_json_to_middle_json import (
+        result_to_middle_json,
+    )
+    from miner_u_parser.backend.pipeline.pipeline_analyze import doc_analyze
+    from miner_u_parser.cli.common import read_fn
+    from miner_u_parser.data.data_reader_writer import FileBasedDataWriter
+
+    pdf_paths = sorted(Path(args.corpus_dir).glob("*.pdf"))
+    pdf_bytes_list = [read_fn(path) for path in pdf_paths]
+    lang_list = [args.lang] * len(pdf_bytes_list)
+    image_writer = FileBasedDataWriter(args.image_dir)
+
+    # 预热，模型加载时间不计入测量
+    doc_analyze(pdf_bytes_list[:1], lang_list[:1], parse_method=args.method)
+
+    start = time.perf_counter()
+    infer_results, all_image_lists, all_pdf_docs, _, ocr_enabled_list = doc_analyze(
+        pdf_bytes_list, lang_list, parse_method=args.method
+    )
+    page_texts, formulas = [], []
+    for idx, model_list in enumerate(infer_results):
+        middle_json = result_to_middle_json(
+            model_list,
+            all_image_lists[idx],
+            all_pdf_docs[idx],
+            image_writer,
+            lang_list[idx],
+            ocr_enabled_list[idx],
+        )
+        texts, latex = collect_outputs(middle_json)
+        page_texts.extend(texts)
+        formulas.extend(latex)
+    elapsed = time.perf_counter() - start
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {"seconds": elapsed, "page_texts": page_texts, "formulas": formulas},
+            f,
+            ensure_ascii=False,
+        )
+
+
+def run_profile(name, args, output):
+    env = dict(os.environ)
+    env.update(
+        {
+            "MINERU_DEVICE_MODE": "cpu",
+            "MINERU_MFR_CACHE_SIZE": "0",
+            "MINERU_OCR_REC_CACHE_SIZE": "0",
+        }
+    )
+    env.pop("MINERU_CPU_THREADS", None)
+    env.update(PROFILES[name])
+    subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            args.corpus_dir,
+            "--worker",
+            "--output",
+            output,
+            "--lang",
+            args.lang,
+            "--method",
+            args.method,
+            "--image-dir",
+            args.image_dir,
+        ],
+        env=env,
+        check=True,
+    )
+    with open(output, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--lang", default="ch")
+    parser.add_argument("--method", default="ocr", choices=["auto", "txt", "ocr"])
+    parser.add_argument("--image-dir", default="/tmp/bench_cpu_profile_images")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--worker", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    if not list(Path(args.corpus_dir).glob("*.pdf")):
+        raise SystemExit(f"no pdf found in {args.corpus_dir}")
+
+    names = args.profiles.split(",")
+    if "default" not in names:
+        names.insert(0, "default")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            results[name] = run_profile(name, args, os.path.join(tmp_dir, f"{name}.json"))
+
+    reference = results["default"]
+    page_count = len(reference["page_texts"])
+    print(f"{page_count} pages, {len(reference['formulas'])} formulas")
+    for name in names:
+        result = results[name]
+        similarity = [
+            difflib.SequenceMatcher(None, a, b).ratio()
+            for a, b in zip(reference["page_texts"], result["page_texts"])
+        ]
+        text_sim = sum(similarity) / len(similarity) if similarity else 1.0
+        formula_match = (
+            sum(a == b for a, b in zip(reference["formulas"], result["formulas"]))
+            / len(reference["formulas"])
+            if reference["formulas"]
+            else 1.0
+        )
+        print(
+            f"{name:>14}: {page_count / result['seconds']:.3f} pages/s, "
+            f"text similarity {text_sim:.4f}, formula exact match {formula_match:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Char-to-span filling benchmark and regression check.
+
+For every page of the fixture PDFs, builds text spans from the PDF text-layer
+lines (with jitter, split lines and empty boxes, like OCR-det output), fills
+them with the array-based fill_char_in_spans and with the original per-char
+grid loop, checks that both produce identical span contents and the same
+spans needing OCR, and reports the time of both.
+
+    python benchmarks/bench_fill_chars.py fixtures/text_only
+"""
+import argparse
+import collections
+import copy
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import pypdfium2 as pdfium
+
+from miner_u_parser.utils.enum_class import ContentType
+from miner_u_parser.utils.pdf_text_cache import PageTextLayer
+from miner_u_parser.utils.span_pre_proc import (
+    __replace_ligatures,
+    __replace_unicode,
+    calculate_char_in_span,
+    fill_char_in_spans,
+)
+
+
+def chars_to_content_loop(span):
+    """The original implementation, kept as the reference."""
+    if len(span["chars"]) == 0:
+        pass
+    else:
+        span["chars"] = sorted(span["chars"], key=lambda x: x["char_idx"])
+        char_widths = [char["bbox"][2] - char["bbox"][0] for char in span["chars"]]
+        median_width = statistics.median(char_widths)
+        content = ""
+        for char in span["chars"]:
+            char1 = char
+            char2 = (
+                span["chars"][span["chars"].index(char) + 1]
+                if span["chars"].index(char) + 1 < len(span["chars"])
+                else None
+            )
+            if (
+                char2
+                and char2["bbox"][0] - char1["bbox"][2] > median_width * 0.25
+                and char["char"] != " "
+                and char2["char"] != " "
+            ):
+                content += f"{char['char']} "
+            else:
+                content += char["char"]
+        content = __replace_unicode(content)
+        content = __replace_ligatures(content)
+        content = __replace_ligatures(content)
+        span["content"] = content.strip()
+    del span["chars"]
+
+
+def fill_char_in_spans_loop(spans, all_chars, median_span_height):
+    """The original implementation, kept as the reference."""
+    spans = sorted(spans, key=lambda x: x["bbox"][1])
+    grid_size = median_span_height
+    grid = collections.defaultdict(list)
+    for i, span in enumerate(spans):
+        start_cell = int(span["bbox"][1] / grid_size)
+        end_cell = int(span["bbox"][3] / grid_size)
+        for cell_idx in range(start_cell, end_cell + 1):
+            grid[cell_idx].append(i)
+
+    for char in all_chars:
+        char_center_y = (char["bbox"][1] + char["bbox"][3]) / 2
+        cell_idx = int(char_center_y / grid_size)
+        for span_idx in grid.get(cell_idx, []):
+            span = spans[span_idx]
+            if calculate_char_in_span(char["bbox"], span["bbox"], char["char"]):
+                span["chars"].append(char)
+                break
+
+    need_ocr_spans = []
+    for span in spans:
+        chars_to_content_loop(span)
+        if len(span["content"]) * span["height"] < span["width"] * 0.5:
+            need_ocr_spans.append(span)
+        del span["height"], span["width"]
+    return need_ocr_spans
+
+
+def make_spans(rng, page_layer):
+    spans = []
+    for line in page_layer.lines():
+        x0, y0, x1, y1 = line["bbox"]
+        if x1 - x0 < 1 or y1 - y0 < 1:
+            continue
+        boxes = [[x0, y0, x1, y1]]
+        # 部分行拆成两个span，模拟行内公式切分
+        if rng.random() < 0.2:
+            mid = rng.uniform(x0, x1)
+            boxes = [[x0, y0, mid, y1], [mid, y0, x1, y1]]
+        for bx0, by0, bx1, by1 in boxes:
+            jitter = rng.uniform(-1.5, 1.5, size=4)
+            spans.append([bx0 + jitter[0], by0 + jitter[1], bx1 + jitter[2], by1 + jitter[3]])
+    # 没有文字的框
+    for _ in range(3):
+        bx0, by0 = rng.uniform(0, 500), rng.uniform(0, 700)
+        spans.append([bx0, by0, bx0 + rng.uniform(20, 200), by0 + rng.uniform(8, 20)])
+    result = []
+    for bbox in spans:
+        bbox = [round(float(v), 2) for v in bbox]
+        result.append(
+            {
+                "bbox": bbox,
+                "type": ContentType.TEXT,
+                "content": "",
+                "score": 1.0,
+                "height": bbox[3] - bbox[1],
+                "width": bbox[2] - bbox[0],
+            }
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pdf_paths = sorted(Path(args.corpus_dir).glob("*.pdf"))
+    if not pdf_paths:
+        raise SystemExit(f"no pdf found in {args.corpus_dir}")
+
+    rng = np.random.default_rng(args.seed)
+    pages = []
+    for path in pdf_paths:
+        pdf_doc = pdfium.PdfDocument(path.read_bytes())
+        for page_idx in range(len(pdf_doc)):
+            page_layer = PageTextLayer.from_pdf_page(pdf_doc[page_idx])
+            spans = make_spans(rng, page_layer)
+            if spans:
+                pages.append((f"{path.name}:{page_idx}", page_layer, spans))
+        pdf_doc.close()
+
+    loop_time = array_time = 0.0
+    mismatches = []
+    char_count = 0
+    for name, page_layer, spans in pages:
+        loop_spans = copy.deepcopy(spans)
+        all_chars = page_layer.chars()
+        char_count += len(all_chars)
+        median_span_height = statistics.median(span["height"] for span in loop_spans)
+        for span in loop_spans:
+            span["chars"] = []
+        start = time.perf_counter()
+        loop_need_ocr = fill_char_in_spans_loop(loop_spans, all_chars, median_span_height)
+        loop_time += time.perf_counter() - start
+
+        array_spans = copy.deepcopy(spans)
+        start = time.perf_counter()
+        array_need_ocr = fill_char_in_spans(array_spans, page_layer.char_arrays())
+        array_time += time.perf_counter() - start
+
+        same_content = [s["content"] for s in loop_spans] == [s["content"] for s in array_spans]
+        same_need_ocr = [s["bbox"] for s in loop_need_ocr] == [s["bbox"] for s in array_need_ocr]
+        if not (same_content and same_need_ocr):
+            mismatches.append(name)
+
+    print(
+        f"{len(pages)} pages, {char_count} chars\n"
+        f"loop: {loop_time:.3f}s, array: {array_time:.3f}s, "
+        f"speedup {loop_time / max(array_time, 1e-9):.1f}x"
+    )
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} pages filled differently: {mismatches[:10]}")
+    print("span contents identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Layout detection container memory benchmark.
+
+Builds synthetic model output for a long document (layout boxes with int
+polys, OCR lines with float polys and text, formulas with latex), measures
+the memory held by the per-page list of dicts and by PageDetections with
+tracemalloc, and checks that PageDetections converts back to identical dicts.
+
+    python benchmarks/bench_page_detections.py --pages 500
+"""
+import argparse
+import random
+import string
+import time
+import tracemalloc
+
+from miner_u_parser.backend.pipeline.page_detections import PageDetections
+
+
+def make_page(rng, layout_count=25, ocr_count=40, formula_count=8):
+    dets = []
+    for _ in range(layout_count):
+        x0, y0 = rng.randint(0, 1500), rng.randint(0, 2000)
+        x1, y1 = x0 + rng.randint(10, 800), y0 + rng.randint(10, 300)
+        dets.append(
+            {
+                "category_id": rng.randint(0, 10),
+                "poly": [x0, y0, x1, y0, x1, y1, x0, y1],
+                "score": round(rng.random(), 3),
+            }
+        )
+    for _ in range(ocr_count):
+        x0, y0 = rng.uniform(0, 1500), rng.uniform(0, 2000)
+        x1, y1 = x0 + rng.uniform(10, 800), y0 + rng.uniform(10, 40)
+        dets.append(
+            {
+                "category_id": 15,
+                "poly": [x0, y0, x1, y0, x1, y1, x0, y1],
+                "score": round(rng.random(), 3),
+                "text": "".join(rng.choices(string.ascii_letters + " ", k=rng.randint(5, 80))),
+            }
+        )
+    for _ in range(formula_count):
+        x0, y0 = rng.randint(0, 1500), rng.randint(0, 2000)
+        x1, y1 = x0 + rng.randint(10, 400), y0 + rng.randint(10, 100)
+        dets.append(
+            {
+                "category_id": 13,
+                "poly": [x0, y0, x1, y0, x1, y1, x0, y1],
+                "score": round(rng.random(), 2),
+                "latex": "\\frac{" + "".join(rng.choices(string.ascii_lowercase, k=20)) + "}{2}",
+            }
+        )
+    return dets
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def build_dicts():
+        rng = random.Random(args.seed)
+        return [make_page(rng) for _ in range(args.pages)]
+
+    def build_columnar():
+        rng = random.Random(args.seed)
+        return [PageDetections.from_dicts(make_page(rng)) for _ in range(args.pages)]
+
+    dict_pages, dict_bytes, _ = measure(build_dicts)
+    columnar_pages, columnar_bytes, _ = measure(build_columnar)
+
+    start = time.perf_counter()
+    restored = [page.to_dicts() for page in columnar_pages]
+    unpack_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(dict_pages, restored) if a != b)
+    det_count = sum(len(page) for page in dict_pages)
+    print(
+        f"{args.pages} pages, {det_count} detections\n"
+        f"list of dicts: {dict_bytes / 1024**2:.1f}MB, "
+        f"PageDetections: {columnar_bytes / 1024**2:.1f}MB "
+        f"({dict_bytes / max(columnar_bytes, 1):.1f}x smaller), "
+        f"unpack all pages: {unpack_time:.3f}s"
+    )
+    if mismatches:
+        raise SystemExit(f"{mismatches} pages differ after round trip")
+    print("round trip identical")
+
+
+if __name__ == "__main__":
+    main()
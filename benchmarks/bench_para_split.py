@@ -0,0 +1,239 @@
+"""Paragraph merging benchmark and regression check.
+
+Builds synthetic preproc_blocks for a long document (text paragraphs that
+continue across pages, lists, titles, equations, images and tables), then
+runs the original deep-copying para_split, the structural-sharing para_split
+and the lean mode that drops preproc_blocks. Reports time and peak memory of
+each, checks that all modes produce identical para_blocks and that the
+sharing mode leaves preproc_blocks untouched.
+
+    python benchmarks/bench_para_split.py --pages 300
+"""
+import argparse
+import copy
+import random
+import string
+import time
+import tracemalloc
+
+from miner_u_parser.backend.pipeline.para_split import __para_merge_page, para_split
+from miner_u_parser.utils.enum_class import BlockType, ContentType
+
+
+def para_split_deepcopy(page_info_list):
+    """The original implementation, kept as the reference."""
+    all_blocks = []
+    for page_info in page_info_list:
+        blocks = copy.deepcopy(page_info["preproc_blocks"])
+        for block in blocks:
+            block["page_num"] = page_info["page_idx"]
+            block["page_size"] = page_info["page_size"]
+        all_blocks.extend(blocks)
+
+    __para_merge_page(all_blocks)
+    for page_info in page_info_list:
+        page_info["para_blocks"] = []
+        for block in all_blocks:
+            if "page_num" in block:
+                if block["page_num"] == page_info["page_idx"]:
+                    page_info["para_blocks"].append(block)
+                    del block["page_num"]
+                    del block["page_size"]
+
+
+def make_words(rng, count, capitalize=False):
+    words = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+        for _ in range(count)
+    ]
+    if capitalize:
+        words[0] = words[0].capitalize()
+    return " ".join(words)
+
+
+def make_lines(rng, x0, y0, width, line_count, indent_first=True, ragged=False):
+    lines = []
+    for i in range(line_count):
+        left = x0 + (20 if i == 0 and indent_first else 0)
+        right = x0 + width - (rng.randint(60, 200) if ragged or i == line_count - 1 else 0)
+        top = y0 + i * 14
+        text = make_words(rng, rng.randint(6, 12), capitalize=(i == 0))
+        if i == line_count - 1:
+            text += "."
+        lines.append(
+            {
+                "bbox": [left, top, right, top + 12],
+                "spans": [
+                    {
+                        "bbox": [left, top, right, top + 12],
+                        "score": 1.0,
+                        "content": text,
+                        "type": ContentType.TEXT,
+                    }
+                ],
+            }
+        )
+    return lines
+
+
+def make_text_block(rng, index, x0, y0, width, line_count, ragged=False):
+    lines = make_lines(rng, x0, y0, width, line_count, ragged=ragged)
+    return {
+        "type": BlockType.TEXT,
+        "bbox": [x0, y0, x0 + width, y0 + line_count * 14],
+        "lines": lines,
+        "index": index,
+    }
+
+
+def make_group_block(rng, block_type, index, y0):
+    body_type = BlockType.TABLE_BODY if block_type == BlockType.TABLE else BlockType.IMAGE_BODY
+    caption_type = (
+        BlockType.TABLE_CAPTION if block_type == BlockType.TABLE else BlockType.IMAGE_CAPTION
+    )
+    span = {
+        "bbox": [60, y0, 540, y0 + 200],
+        "score": 0.9,
+        "type": ContentType.TABLE if block_type == BlockType.TABLE else ContentType.IMAGE,
+        "image_path": f"{rng.getrandbits(64):016x}.jpg",
+    }
+    if block_type == BlockType.TABLE:
+        span["html"] = "<table>" + "<tr><td>1</td><td>2</td></tr>" * 10 + "</table>"
+    return {
+        "type": block_type,
+        "bbox": [60, y0, 540, y0 + 200],
+        "index": index,
+        "blocks": [
+            {
+                "type": caption_type,
+                "bbox": [60, y0 - 14, 540, y0],
+                "lines": make_lines(rng, 60, y0 - 14, 480, 1),
+                "index": index,
+            },
+            {
+                "type": body_type,
+                "bbox": [60, y0, 540, y0 + 200],
+                "lines": [{"bbox": [60, y0, 540, y0 + 200], "spans": [span]}],
+                "index": index,
+            },
+        ],
+    }
+
+
+def make_page(rng, page_idx):
+    blocks = []
+    y = 60
+    index = 0
+    while y < 700:
+        kind = rng.random()
+        if kind < 0.08:
+            blocks.append(
+                {
+                    "type": BlockType.TITLE,
+                    "bbox": [60, y, 400, y + 16],
+                    "lines": make_lines(rng, 60, y, 340, 1, indent_first=False),
+                    "index": index,
+                }
+            )
+            y += 24
+        elif kind < 0.12:
+            blocks.append(
+                {
+                    "type": BlockType.INTERLINE_EQUATION,
+                    "bbox": [150, y, 450, y + 30],
+                    "lines": [
+                        {
+                            "bbox": [150, y, 450, y + 30],
+                            "spans": [
+                                {
+                                    "bbox": [150, y, 450, y + 30],
+                                    "score": 0.9,
+                                    "content": "\\sum_{i=1}^{n} x_i^2",
+                                    "type": ContentType.INTERLINE_EQUATION,
+                                }
+                            ],
+                        }
+                    ],
+                    "index": index,
+                }
+            )
+            y += 40
+        elif kind < 0.16:
+            blocks.append(make_group_block(rng, rng.choice([BlockType.IMAGE, BlockType.TABLE]), index, y + 14))
+            y += 230
+        elif kind < 0.24:
+            block = make_text_block(rng, index, 60, y, 480, rng.randint(3, 6), ragged=True)
+            blocks.append(block)
+            y += block["bbox"][3] - block["bbox"][1] + 10
+        else:
+            block = make_text_block(rng, index, 60, y, 480, rng.randint(2, 8))
+            blocks.append(block)
+            y += block["bbox"][3] - block["bbox"][1] + 10
+        index += 1
+
+    # 末段不以句号结尾，与下一页首段构成跨页段落
+    last = blocks[-1]
+    if last["type"] == BlockType.TEXT:
+        last_span = last["lines"][-1]["spans"][-1]
+        last_span["content"] = last_span["content"].rstrip(".")
+        last["lines"][-1]["bbox"][2] = last["bbox"][2]
+    first = blocks[0]
+    if first["type"] == BlockType.TEXT and page_idx % 2:
+        first_line = first["lines"][0]
+        first_line["bbox"][0] = first["bbox"][0]
+        first_line["spans"][0]["content"] = first_line["spans"][0]["content"].lower()
+
+    return {
+        "preproc_blocks": blocks,
+        "page_idx": page_idx,
+        "page_size": [612, 792],
+        "discarded_blocks": [],
+    }
+
+
+def run(name, split_fn, pages):
+    pdf_info = copy.deepcopy(pages)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    split_fn(pdf_info)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:>10}: {elapsed:.3f}s, peak +{(peak - base) / 1024**2:.1f}MB, "
+        f"retained +{(current - base) / 1024**2:.1f}MB"
+    )
+    return pdf_info
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [make_page(rng, page_idx) for page_idx in range(args.pages)]
+    block_count = sum(len(page["preproc_blocks"]) for page in pages)
+    print(f"{args.pages} pages, {block_count} blocks")
+
+    reference = run("deepcopy", para_split_deepcopy, pages)
+    shared = run("shared", lambda info: para_split(info, keep_preproc_blocks=True), pages)
+    lean = run("lean", lambda info: para_split(info, keep_preproc_blocks=False), pages)
+
+    errors = []
+    for ref_page, shared_page, lean_page, page in zip(reference, shared, lean, pages):
+        if not ref_page["para_blocks"] == shared_page["para_blocks"] == lean_page["para_blocks"]:
+            errors.append(f"page {page['page_idx']}: para_blocks differ")
+        if shared_page["preproc_blocks"] != page["preproc_blocks"]:
+            errors.append(f"page {page['page_idx']}: preproc_blocks modified")
+        if "preproc_blocks" in lean_page:
+            errors.append(f"page {page['page_idx']}: preproc_blocks kept in lean mode")
+    if errors:
+        raise SystemExit("\n".join(errors[:10]))
+    print("para_blocks identical, preproc_blocks untouched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Middle json store benchmark and regression check.
+
+Builds a synthetic middle json (see bench_para_split.py) and model json,
+saves them with the page store and as plain indented json, and reports file
+sizes, write/read times, the time to decode a single page lazily and the
+time to remake markdown from the stored middle json. Checks that every page
+round-trips unchanged and that the remade markdown equals union_make on the
+in-memory middle json.
+
+    python benchmarks/bench_result_store.py --pages 300
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from bench_para_split import make_page
+
+from miner_u_parser.backend.pipeline.page_detections import PageDetections
+from miner_u_parser.backend.pipeline.para_split import para_split
+from miner_u_parser.backend.pipeline.pipeline_middle_json_mkcontent import union_make
+from miner_u_parser.backend.pipeline.pipeline_result_store import (
+    MIDDLE_JSON_SUFFIX,
+    dump_middle_json,
+    dump_model_json,
+    load_middle_json,
+    load_model_json,
+)
+from miner_u_parser.cli.common import remake_markdown
+
+
+def make_model_page(rng, page_idx):
+    layout_dets = []
+    for _ in range(60):
+        x0, y0 = rng.randint(0, 1500), rng.randint(0, 2000)
+        x1, y1 = x0 + rng.randint(10, 800), y0 + rng.randint(10, 300)
+        layout_dets.append(
+            {
+                "category_id": rng.randint(0, 15),
+                "poly": [x0, y0, x1, y0, x1, y1, x0, y1],
+                "score": round(rng.random(), 3),
+            }
+        )
+    return {
+        "layout_dets": PageDetections.from_dicts(layout_dets),
+        "page_info": {"page_no": page_idx, "width": 1224, "height": 1584},
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pdf_info = [make_page(rng, page_idx) for page_idx in range(args.pages)]
+    para_split(pdf_info)
+    middle_json = {"pdf_info": pdf_info, "_backend": "pipeline", "_version_name": "bench"}
+    model_list = [make_model_page(rng, page_idx) for page_idx in range(args.pages)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "doc_middle.json")
+        store_path = os.path.join(tmp_dir, f"doc{MIDDLE_JSON_SUFFIX}")
+
+        def write_json():
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(middle_json, f, ensure_ascii=False, indent=4)
+
+        def write_store():
+            with open(store_path, "wb") as f:
+                f.write(dump_middle_json(middle_json))
+
+        def read_json():
+            with open(json_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        _, json_write = timed(write_json)
+        _, store_write = timed(write_store)
+        loaded_json, json_read = timed(read_json)
+        loaded, store_open = timed(lambda: load_middle_json(store_path))
+        pages, store_read = timed(lambda: list(loaded["pdf_info"]))
+        _, one_page = timed(lambda: loaded["pdf_info"][args.pages // 2])
+
+        expected_md, make_time = timed(lambda: union_make(middle_json["pdf_info"], "images"))
+        md_path, remake_time = timed(lambda: remake_markdown(store_path))
+        with open(md_path, encoding="utf-8") as f:
+            remade_md = f.read()
+
+        model_bytes = dump_model_json(model_list)
+        model_store = load_model_json(model_bytes)
+        model_ok = all(
+            model_store[i]["layout_dets"] == model_list[i]["layout_dets"].to_dicts()
+            for i in range(len(model_list))
+        )
+
+        print(
+            f"{args.pages} pages\n"
+            f"json:  {os.path.getsize(json_path) / 1024**2:.2f}MB, "
+            f"write {json_write:.3f}s, read {json_read:.3f}s\n"
+            f"store: {os.path.getsize(store_path) / 1024**2:.2f}MB, "
+            f"write {store_write:.3f}s, open {store_open * 1000:.1f}ms, "
+            f"read all pages {store_read:.3f}s, one page {one_page * 1000:.2f}ms\n"
+            f"union_make in memory {make_time:.3f}s, remake from store {remake_time:.3f}s\n"
+            f"model json store: {len(model_bytes) / 1024**2:.2f}MB"
+        )
+
+        errors = []
+        if pages != loaded_json["pdf_info"]:
+            errors.append("middle json pages differ after round trip")
+        if {k: v for k, v in loaded.items() if k != "pdf_info"} != {
+            k: v for k, v in middle_json.items() if k != "pdf_info"
+        }:
+            errors.append("middle json meta differs after round trip")
+        if remade_md != expected_md:
+            errors.append("remade markdown differs")
+        if not model_ok:
+            errors.append("model json differs after round trip")
+        if errors:
+            raise SystemExit("\n".join(errors))
+        print("round trip identical, remade markdown identical")
+
+
+if __name__ == "__main__":
+    main()
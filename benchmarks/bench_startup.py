@@ -0,0 +1,63 @@
+"""Cold-start benchmark for a parse worker.
+
+Measures, each in a fresh interpreter:
+  * import time of the CLI entry point and the pipeline backend, with the
+    slowest top-level imports;
+  * construction of the pipeline model container (models load lazily, so this
+    must not touch torch backends or the hub).
+
+Exits with status 1 when any measurement exceeds its budget.
+
+    python benchmarks/bench_startup.py --import-budget 3 --init-budget 5
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from miner_u_parser.utils.startup_profile import log_import_profile, profile_import
+
+_INIT_SNIPPET = (
+    "from miner_u_parser.backend.pipeline.pipeline_analyze import custom_model_init;"
+    "custom_model_init(lang='en', formula_enable=True, table_enable=True)"
+)
+
+
+def measure_pipeline_init() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", _INIT_SNIPPET], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--import-budget", type=float, default=3.0)
+    parser.add_argument("--init-budget", type=float, default=5.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    failures = []
+    for module_name in (
+        "miner_u_parser.cli.client",
+        "miner_u_parser.backend.pipeline.pipeline_analyze",
+    ):
+        profile = profile_import(module_name, top_n=args.top)
+        log_import_profile(profile)
+        if profile["wall_time"] > args.import_budget:
+            failures.append(
+                f"import {module_name}: {profile['wall_time']:.2f}s > {args.import_budget:.2f}s"
+            )
+
+    init_time = measure_pipeline_init()
+    print(f"pipeline model init: {init_time:.2f}s")
+    if init_time > args.init_budget:
+        failures.append(f"pipeline init: {init_time:.2f}s > {args.init_budget:.2f}s")
+
+    if failures:
+        print("cold-start budget exceeded:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("cold-start budget met")
+
+
+if __name__ == "__main__":
+    main()
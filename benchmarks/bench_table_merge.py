@@ -0,0 +1,216 @@
+"""Cross-page table merge benchmark and regression check.
+
+Builds long tables that continue over many pages (repeated header rows,
+thead/tbody, colspan/rowspan headers, full-width text, nested tables and
+tables that must not be merged), then runs the original merge_table, which
+re-parses the growing merged html with BeautifulSoup for every page, and the
+current one, which parses each table once. Checks that both produce
+identical para_blocks and reports the speedup.
+
+    python benchmarks/bench_table_merge.py --pages 60
+"""
+import argparse
+import copy
+import random
+import time
+
+from bs4 import BeautifulSoup
+
+from miner_u_parser.utils.enum_class import BlockType, SplitFlag
+from miner_u_parser.utils.table_merge import (
+    calculate_table_total_columns,
+    check_rows_match,
+    merge_table,
+    perform_table_merge,
+)
+
+
+def can_merge_tables_soup(current_table_block, previous_table_block):
+    """The original implementation, kept as the reference."""
+    if any(block["type"] == BlockType.TABLE_CAPTION for block in current_table_block["blocks"]):
+        return False, None, None
+    if any(block["type"] == BlockType.TABLE_FOOTNOTE for block in previous_table_block["blocks"]):
+        return False, None, None
+
+    current_html = ""
+    previous_html = ""
+    for block in current_table_block["blocks"]:
+        if block["type"] == BlockType.TABLE_BODY and block["lines"] and block["lines"][0]["spans"]:
+            current_html = block["lines"][0]["spans"][0].get("html", "")
+    for block in previous_table_block["blocks"]:
+        if block["type"] == BlockType.TABLE_BODY and block["lines"] and block["lines"][0]["spans"]:
+            previous_html = block["lines"][0]["spans"][0].get("html", "")
+    if not current_html or not previous_html:
+        return False, None, None
+
+    x0_t1, _, x1_t1, _ = current_table_block["bbox"]
+    x0_t2, _, x1_t2, _ = previous_table_block["bbox"]
+    table1_width = x1_t1 - x0_t1
+    table2_width = x1_t2 - x0_t2
+    if abs(table1_width - table2_width) / min(table1_width, table2_width) >= 0.1:
+        return False, None, None
+
+    soup1 = BeautifulSoup(previous_html, "html.parser")
+    soup2 = BeautifulSoup(current_html, "html.parser")
+    tables_match = calculate_table_total_columns(soup1) == calculate_table_total_columns(soup2)
+    rows_match = check_rows_match(soup1, soup2)
+    return (tables_match or rows_match), soup1, soup2
+
+
+def merge_table_soup(page_info_list):
+    """The original implementation, kept as the reference."""
+    for page_idx in range(len(page_info_list) - 1, 0, -1):
+        page_info = page_info_list[page_idx]
+        previous_page_info = page_info_list[page_idx - 1]
+        if not (page_info["para_blocks"] and page_info["para_blocks"][0]["type"] == BlockType.TABLE):
+            continue
+        current_table_block = page_info["para_blocks"][0]
+        if not (
+            previous_page_info["para_blocks"]
+            and previous_page_info["para_blocks"][-1]["type"] == BlockType.TABLE
+        ):
+            continue
+        previous_table_block = previous_page_info["para_blocks"][-1]
+        wait_merge_table_footnotes = [
+            block for block in current_table_block["blocks"] if block["type"] == BlockType.TABLE_FOOTNOTE
+        ]
+        can_merge, soup1, soup2 = can_merge_tables_soup(current_table_block, previous_table_block)
+        if not can_merge:
+            continue
+        merged_html = perform_table_merge(soup1, soup2, previous_table_block, wait_merge_table_footnotes)
+        for block in previous_table_block["blocks"]:
+            if block["type"] == BlockType.TABLE_BODY and block["lines"] and block["lines"][0]["spans"]:
+                block["lines"][0]["spans"][0]["html"] = merged_html
+                break
+        for block in current_table_block["blocks"]:
+            block["lines"] = []
+            block[SplitFlag.LINES_DELETED] = True
+
+
+HEADERS = {
+    "plain": "<tr><td>序号</td><td>名称</td><td>数量</td><td>金额</td></tr>",
+    "thead": "<thead><tr><th>序号</th><th>名称</th><th>数量</th><th>金额</th></tr></thead>",
+    "span": (
+        '<tr><td rowspan="2">序号</td><td colspan="2">商品</td><td rowspan="2">金额</td></tr>'
+        "<tr><td>名称</td><td>数量</td></tr>"
+    ),
+    "fullwidth": "<tr><td>ＮＯ．</td><td>Ｎａｍｅ</td><td>Ｑｔｙ</td><td>Ａｍｏｕｎｔ</td></tr>",
+    "nested": "<tr><td>序号</td><td><table><tr><td>名</td><td>称</td></tr></table></td><td>数量</td><td>金额</td></tr>",
+}
+
+
+def make_rows(rng, count, start):
+    rows = []
+    for i in range(start, start + count):
+        if rng.random() < 0.05:
+            rows.append(f'<tr><td>{i}</td><td colspan="3">小计 &amp; 备注 &lt;{i}&gt;</td></tr>')
+        else:
+            rows.append(
+                f"<tr><td>{i}</td><td>item-{rng.getrandbits(24):06x}</td>"
+                f"<td>{rng.randint(1, 99)}</td><td>{rng.random() * 1000:.2f}</td></tr>"
+            )
+    return "".join(rows)
+
+
+def make_table_html(rng, style, row_count, start, repeat_header):
+    header = HEADERS[style] if repeat_header else ""
+    body = make_rows(rng, row_count, start)
+    if style == "thead":
+        head = header if repeat_header else ""
+        return f"<table>{head}<tbody>{body}</tbody></table>"
+    if rng.random() < 0.3:
+        return f"<html><body><table><tbody>{header}{body}</tbody></table></body></html>"
+    return f"<table>{header}{body}</table>"
+
+
+def make_table_block(rng, html, width, caption=False, footnote=False):
+    blocks = []
+    if caption:
+        blocks.append({"type": BlockType.TABLE_CAPTION, "bbox": [60, 40, 540, 54], "lines": []})
+    blocks.append(
+        {
+            "type": BlockType.TABLE_BODY,
+            "bbox": [60, 60, 60 + width, 740],
+            "lines": [{"bbox": [60, 60, 60 + width, 740], "spans": [{"type": "table", "html": html}]}],
+        }
+    )
+    if footnote:
+        blocks.append({"type": BlockType.TABLE_FOOTNOTE, "bbox": [60, 742, 540, 756], "lines": []})
+    return {"type": BlockType.TABLE, "bbox": [60, 60, 60 + width, 740], "blocks": blocks}
+
+
+def make_document(rng, pages, rows_per_page):
+    """每段表格连续跨越若干页，段与段之间偶尔被正文或不可合并的表格打断"""
+    page_info_list = []
+    style = "plain"
+    start = 0
+    for page_idx in range(pages):
+        if page_idx == 0 or rng.random() < 0.08:
+            style = rng.choice(list(HEADERS))
+            start = 0
+            first_page = True
+        else:
+            first_page = False
+        html = make_table_html(rng, style, rows_per_page, start, first_page or rng.random() < 0.7)
+        start += rows_per_page
+        width = 480 + rng.randint(-10, 10)
+        para_blocks = []
+        if rng.random() < 0.03:
+            para_blocks.append({"type": BlockType.TEXT, "bbox": [60, 20, 540, 40], "lines": []})
+        para_blocks.append(
+            make_table_block(
+                rng,
+                html,
+                width if rng.random() > 0.03 else 300,
+                caption=first_page,
+                footnote=rng.random() < 0.03,
+            )
+        )
+        page_info_list.append({"page_idx": page_idx, "para_blocks": para_blocks})
+    return page_info_list
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    document = make_document(rng, args.pages, args.rows)
+
+    reference = copy.deepcopy(document)
+    start = time.perf_counter()
+    merge_table_soup(reference)
+    soup_time = time.perf_counter() - start
+
+    merged = copy.deepcopy(document)
+    start = time.perf_counter()
+    merge_table(merged)
+    model_time = time.perf_counter() - start
+
+    merged_count = sum(
+        1
+        for page in reference
+        for block in page["para_blocks"]
+        if block["type"] == BlockType.TABLE and block["blocks"][-1].get(SplitFlag.LINES_DELETED)
+    )
+    print(
+        f"{args.pages} pages, {args.rows} rows per page, {merged_count} tables merged\n"
+        f"original {soup_time:.3f}s, new {model_time:.3f}s, "
+        f"speedup {soup_time / max(model_time, 1e-9):.1f}x"
+    )
+
+    errors = [
+        f"page {ref_page['page_idx']}: para_blocks differ"
+        for ref_page, page in zip(reference, merged)
+        if ref_page["para_blocks"] != page["para_blocks"]
+    ]
+    if errors:
+        raise SystemExit("\n".join(errors[:10]))
+    print("merged html and para_blocks identical")
+
+
+if __name__ == "__main__":
+    main()
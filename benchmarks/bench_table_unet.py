@@ -0,0 +1,83 @@
+"""Wired-table UNet batching benchmark and regression check.
+
+Draws synthetic ruled tables of random sizes and aspect ratios, then runs
+TSRUnet once per table (preprocess + infer) and once through batch_infer.
+Every input is padded to the same fixed canvas on both paths, so the
+batched predictions must match the per-table ones; the script reports the
+number of batches formed, the mismatching pixel ratio and the speedup.
+
+    python benchmarks/bench_table_unet.py --tables 32 --batch-size 8
+"""
+import argparse
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from miner_u_parser.model.table.rec.unet_table.table_structure_unet import TSRUnet
+from miner_u_parser.utils.enum_class import ModelPath
+from miner_u_parser.utils.models_download_utils import auto_download_and_get_model_root_path
+
+
+def make_table_image(rng):
+    width = rng.randint(200, 1600)
+    height = rng.randint(120, 1200)
+    rows = rng.randint(2, 20)
+    cols = rng.randint(2, 8)
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    x0, y0, x1, y1 = 10, 10, width - 10, height - 10
+    for i in range(rows + 1):
+        y = y0 + (y1 - y0) * i // rows
+        cv2.line(img, (x0, y), (x1, y), (0, 0, 0), rng.randint(1, 3))
+    for j in range(cols + 1):
+        x = x0 + (x1 - x0) * j // cols
+        cv2.line(img, (x, y0), (x, y1), (0, 0, 0), rng.randint(1, 3))
+    return img
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model_path = os.path.join(
+        auto_download_and_get_model_root_path(ModelPath.unet_structure),
+        ModelPath.unet_structure,
+    )
+    model = TSRUnet({"model_path": model_path})
+    rng = random.Random(args.seed)
+    images = [make_table_image(rng) for _ in range(args.tables)]
+
+    start = time.perf_counter()
+    single_preds = [model.infer(model.preprocess(img)) for img in images]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_preds = model.batch_infer(images, args.batch_size)
+    batch_time = time.perf_counter() - start
+
+    batch_count = -(-len(images) // args.batch_size)
+    total = mismatched = 0
+    for idx, (single, batched) in enumerate(zip(single_preds, batch_preds)):
+        if single.shape != batched.shape:
+            raise SystemExit(f"table {idx}: shape {single.shape} != {batched.shape}")
+        total += single.size
+        mismatched += int(np.count_nonzero(single != batched))
+    ratio = mismatched / max(total, 1)
+    print(
+        f"{len(images)} tables in {batch_count} batches of up to {args.batch_size}\n"
+        f"per-table {single_time:.3f}s, batched {batch_time:.3f}s, "
+        f"speedup {single_time / max(batch_time, 1e-9):.1f}x\n"
+        f"mismatching pixels {mismatched}/{total} ({ratio:.2e})"
+    )
+    # 批量卷积的浮点累加顺序可能不同，只允许极少量边界像素不一致
+    if ratio > 1e-4:
+        raise SystemExit("batched predictions differ from per-table inference")
+
+
+if __name__ == "__main__":
+    main()
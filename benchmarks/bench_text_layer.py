@@ -0,0 +1,70 @@
+"""Text-layer fast path benchmark.
+
+Parses a corpus of born-digital PDFs in txt mode with the text-layer fast path
+disabled (OCR-det on every text region) and enabled (spans built from the PDF
+text layer, OCR-det only where char coverage is poor), and reports pages per
+second of model inference plus middle-json construction for both.
+
+    python benchmarks/bench_text_layer.py fixtures/text_only --lang en
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from miner_u_parser.backend.pipeline.model_json_to_middle_json import (
+    result_to_middle_json,
+)
+from miner_u_parser.backend.pipeline.pipeline_analyze import doc_analyze
+from miner_u_parser.cli.common import read_fn
+from miner_u_parser.data.data_reader_writer import FileBasedDataWriter
+
+
+def run(fast_path, pdf_bytes_list, lang_list, image_dir):
+    os.environ["MINERU_TEXT_LAYER_FAST_PATH"] = "true" if fast_path else "false"
+    start = time.perf_counter()
+    infer_results, all_image_lists, all_pdf_docs, _, ocr_enabled_list = doc_analyze(
+        pdf_bytes_list, lang_list, parse_method="txt"
+    )
+    image_writer = FileBasedDataWriter(image_dir)
+    page_count = 0
+    for idx, model_list in enumerate(infer_results):
+        result_to_middle_json(
+            model_list,
+            all_image_lists[idx],
+            all_pdf_docs[idx],
+            image_writer,
+            lang_list[idx],
+            ocr_enabled_list[idx],
+        )
+        page_count += len(model_list)
+    return page_count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--image-dir", default="/tmp/bench_text_layer_images")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(Path(args.corpus_dir).glob("*.pdf"))
+    if not pdf_paths:
+        raise SystemExit(f"no pdf found in {args.corpus_dir}")
+    pdf_bytes_list = [read_fn(path) for path in pdf_paths]
+    lang_list = [args.lang] * len(pdf_bytes_list)
+
+    # 预热，避免模型加载时间计入第一次测量
+    run(False, pdf_bytes_list[:1], lang_list[:1], args.image_dir)
+
+    results = {}
+    for fast_path in (False, True):
+        page_count, elapsed = run(fast_path, pdf_bytes_list, lang_list, args.image_dir)
+        results[fast_path] = page_count / elapsed
+        label = "text layer" if fast_path else "ocr-det"
+        print(f"{label:>10}: {page_count} pages in {elapsed:.2f}s, {results[fast_path]:.2f} pages/s")
+    print(f"speedup: {results[True] / results[False]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
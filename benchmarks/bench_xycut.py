@@ -0,0 +1,196 @@
+"""XY-cut reading order benchmark and regression check.
+
+Builds dense synthetic pages (multi-column index pages and schedule grids
+with thousands of blocks) and orders them with the xy-cut fallback of
+cal_block_index, comparing against the original implementation (per-pixel
+projection loop, shuffled input, list.index rank lookup). Checks that the
+projection profiles match, that on pages without coordinate ties both give
+the same order, that the new order is a deterministic permutation, and that
+duplicate bboxes get distinct ranks on both the xy-cut and the layoutreader
+path.
+
+    python benchmarks/bench_xycut.py --blocks 3000
+"""
+import argparse
+import copy
+import random
+import time
+
+import numpy as np
+
+from miner_u_parser.model.reading_order.xycut import (
+    projection_by_bboxes,
+    split_projection_profile,
+)
+from miner_u_parser.utils.block_sort import cal_block_index
+from miner_u_parser.utils.enum_class import BlockType
+
+
+def projection_by_bboxes_loop(boxes, axis):
+    """The original implementation, kept as the reference."""
+    length = np.max(boxes[:, axis::2])
+    res = np.zeros(length, dtype=int)
+    for start, end in boxes[:, axis::2]:
+        res[start:end] += 1
+    return res
+
+
+def recursive_xy_cut_loop(boxes, indices, res):
+    """The original implementation, kept as the reference."""
+    _indices = boxes[:, 1].argsort()
+    y_sorted_boxes = boxes[_indices]
+    y_sorted_indices = indices[_indices]
+    y_projection = projection_by_bboxes_loop(y_sorted_boxes, 1)
+    pos_y = split_projection_profile(y_projection, 0, 1)
+    if not pos_y:
+        return
+    for r0, r1 in zip(*pos_y):
+        _indices = (r0 <= y_sorted_boxes[:, 1]) & (y_sorted_boxes[:, 1] < r1)
+        y_sorted_boxes_chunk = y_sorted_boxes[_indices]
+        y_sorted_indices_chunk = y_sorted_indices[_indices]
+        _indices = y_sorted_boxes_chunk[:, 0].argsort()
+        x_sorted_boxes_chunk = y_sorted_boxes_chunk[_indices]
+        x_sorted_indices_chunk = y_sorted_indices_chunk[_indices]
+        x_projection = projection_by_bboxes_loop(x_sorted_boxes_chunk, 0)
+        pos_x = split_projection_profile(x_projection, 0, 1)
+        if not pos_x:
+            continue
+        arr_x0, arr_x1 = pos_x
+        if len(arr_x0) == 1:
+            res.extend(x_sorted_indices_chunk)
+            continue
+        for c0, c1 in zip(arr_x0, arr_x1):
+            _indices = (c0 <= x_sorted_boxes_chunk[:, 0]) & (x_sorted_boxes_chunk[:, 0] < c1)
+            recursive_xy_cut_loop(
+                x_sorted_boxes_chunk[_indices], x_sorted_indices_chunk[_indices], res
+            )
+
+
+def cal_block_index_loop(fix_blocks):
+    """The original xy-cut branch of cal_block_index, kept as the reference."""
+    block_bboxes = []
+    for block in fix_blocks:
+        block["bbox"] = [max(0, x) for x in block["bbox"]]
+        block_bboxes.append(block["bbox"])
+    random_boxes = np.array(block_bboxes)
+    np.random.shuffle(random_boxes)
+    res = []
+    recursive_xy_cut_loop(np.asarray(random_boxes).astype(int), np.arange(len(block_bboxes)), res)
+    assert len(res) == len(block_bboxes)
+    sorted_boxes = random_boxes[np.array(res)].tolist()
+    for block in fix_blocks:
+        block["index"] = sorted_boxes.index(block["bbox"])
+    return fix_blocks
+
+
+def make_block(bbox):
+    return {"type": BlockType.TEXT, "bbox": bbox, "lines": []}
+
+
+def make_index_page(rng, count, columns=3, ties=True):
+    """多栏目录页：每栏大量短行，行间留有间隔"""
+    blocks = []
+    per_column = count // columns + 1
+    col_width = 2000 // columns
+    used_x = set()
+    for i in range(count):
+        col, row = divmod(i, per_column)
+        x0 = col * col_width + 10
+        if not ties:
+            # 每个block的x0、y0都不相同
+            x0 += rng.randint(0, 40)
+            while (x0, col) in used_x:
+                x0 += 1
+            used_x.add((x0, col))
+        y0 = row * 6
+        blocks.append(make_block([x0, y0, x0 + rng.randint(100, col_width - 60), y0 + 4]))
+    rng.shuffle(blocks)
+    return blocks
+
+
+def make_schedule_page(rng, rows, cols):
+    """时刻表类网格页：行列对齐的大量单元格"""
+    blocks = []
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = c * 60, r * 12
+            blocks.append(make_block([x0, y0, x0 + 50, y0 + 9]))
+    rng.shuffle(blocks)
+    return blocks
+
+
+def order_of(blocks):
+    return [i for i, _ in sorted(enumerate(blocks), key=lambda item: item[1]["index"])]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    np.random.seed(args.seed)
+    errors = []
+
+    # 包含空区间和反向区间
+    starts = np.array([rng.randint(0, 500) for _ in range(2000)])
+    ends = np.maximum(starts + np.array([rng.randint(-5, 80) for _ in range(2000)]), 0)
+    boxes = np.stack([starts, starts, ends, ends], axis=1)
+    for axis in (0, 1):
+        if not np.array_equal(projection_by_bboxes(boxes, axis), projection_by_bboxes_loop(boxes, axis)):
+            errors.append(f"projection differs on axis {axis}")
+
+    cols = 12
+    pages = {
+        "index (no ties)": make_index_page(rng, args.blocks, ties=False),
+        "index": make_index_page(rng, args.blocks),
+        "schedule": make_schedule_page(rng, args.blocks // cols, cols),
+    }
+    for name, blocks in pages.items():
+        loop_blocks = copy.deepcopy(blocks)
+        start = time.perf_counter()
+        cal_block_index_loop(loop_blocks)
+        loop_time = time.perf_counter() - start
+
+        new_blocks = copy.deepcopy(blocks)
+        start = time.perf_counter()
+        cal_block_index(new_blocks, None)
+        new_time = time.perf_counter() - start
+
+        again = copy.deepcopy(blocks)
+        cal_block_index(again, None)
+        new_order = order_of(new_blocks)
+        if sorted(b["index"] for b in new_blocks) != list(range(len(blocks))):
+            errors.append(f"{name}: indexes are not a permutation")
+        if order_of(again) != new_order:
+            errors.append(f"{name}: order is not deterministic")
+        if name == "index (no ties)" and order_of(loop_blocks) != new_order:
+            errors.append(f"{name}: order differs from the original")
+        print(
+            f"{name:>16}: {len(blocks)} blocks, original {loop_time:.3f}s, "
+            f"new {new_time:.3f}s, speedup {loop_time / max(new_time, 1e-9):.1f}x"
+        )
+
+    duplicates = [make_block([10, 10, 200, 20]) for _ in range(3)] + [make_block([10, 30, 200, 40])]
+    cal_block_index(duplicates, None)
+    if sorted(b["index"] for b in duplicates) != [0, 1, 2, 3]:
+        errors.append("xy-cut: duplicate bboxes share an index")
+
+    line_bboxes = [[10, 10, 200, 20], [10, 10, 200, 20], [10, 30, 200, 40]]
+    layout_blocks = [
+        {"type": BlockType.TEXT, "bbox": [10, 10, 200, 20], "lines": [{"bbox": line_bboxes[0]}]},
+        {"type": BlockType.TEXT, "bbox": [10, 10, 200, 20], "lines": [{"bbox": line_bboxes[1]}]},
+        {"type": BlockType.TEXT, "bbox": [10, 30, 200, 40], "lines": [{"bbox": line_bboxes[2]}]},
+    ]
+    cal_block_index(layout_blocks, [line_bboxes[2], line_bboxes[0], line_bboxes[1]])
+    if sorted(b["index"] for b in layout_blocks) != [0, 1, 2]:
+        errors.append("layoutreader: duplicate line bboxes share an index")
+
+    if errors:
+        raise SystemExit("\n".join(errors))
+    print("projection identical, order matches the original without ties, deterministic")
+
+
+if __name__ == "__main__":
+    main()
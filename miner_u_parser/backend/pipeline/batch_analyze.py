@@ -6,13 +6,25 @@ from tqdm import tqdm
 from collections import defaultdict
 import numpy as np
 
+from .batch_tuner import GPU_CANDIDATES, batch_size_tuner
 from .model_init import AtomModelSingleton
 from .model_list import AtomicModel
-from miner_u_parser.utils.config_reader import get_formula_enable, get_table_enable
+from .table_routing import (
+    ROUTE_DUAL,
+    ROUTE_WIRED,
+    ROUTE_WIRELESS,
+    route_table,
+    table_route_stats,
+)
+from miner_u_parser.utils.config_reader import (
+    get_formula_enable,
+    get_table_enable,
+    get_table_routing,
+)
 from miner_u_parser.utils.model_utils import (
     crop_img,
     get_res_list_from_layout_res,
-    clean_vram,
+    maybe_clean_memory,
 )
 from miner_u_parser.utils.ocr_utils import (
     merge_det_boxes,
@@ -26,6 +38,7 @@ from miner_u_parser.utils.ocr_utils import (
     get_rotate_crop_image,
 )
 from miner_u_parser.utils.pdf_image_tools import get_crop_np_img
+from miner_u_parser.utils.text_layer import build_text_layer_spans
 
 YOLO_LAYOUT_BASE_BATCH_SIZE = 1
 MFD_BASE_BATCH_SIZE = 1
@@ -50,7 +63,12 @@ class BatchAnalyze:
         self.model_manager = model_manager
         self.enable_ocr_det_batch = enable_ocr_det_batch
 
-    def __call__(self, images_with_extra_info: list) -> list:
+    def __call__(
+        self,
+        images_with_extra_info: list,
+        text_layers: list = None,
+        furniture_pages: list = None,
+    ) -> list:
         if len(images_with_extra_info) == 0:
             return []
 
@@ -69,32 +87,48 @@ class BatchAnalyze:
 
         # doclayout_yolo
 
-        images_layout_res += self.model.layout_model.batch_predict(
-            pil_images, YOLO_LAYOUT_BASE_BATCH_SIZE
+        layout_model = self.model.layout_model
+        layout_batch_size = batch_size_tuner.get_batch_size(
+            "layout",
+            lambda images: layout_model.batch_predict(images, len(images)),
+            pil_images[: max(GPU_CANDIDATES)],
+            layout_model.device,
+            default=YOLO_LAYOUT_BASE_BATCH_SIZE,
         )
+        images_layout_res += layout_model.batch_predict(pil_images, layout_batch_size)
 
         if self.formula_enable:
             # 公式检测
-            images_mfd_res = self.model.mfd_model.batch_predict(
-                np_images, MFD_BASE_BATCH_SIZE
-            )
-
-            # 公式识别
-            images_formula_list = self.model.mfr_model.batch_predict(
-                images_mfd_res,
-                np_images,
-                batch_size=self.batch_ratio * MFR_BASE_BATCH_SIZE,
+            mfd_model = self.model.mfd_model
+            mfd_batch_size = batch_size_tuner.get_batch_size(
+                "mfd",
+                lambda images: mfd_model.batch_predict(images, len(images)),
+                np_images[: max(GPU_CANDIDATES)],
+                mfd_model.device,
+                default=MFD_BASE_BATCH_SIZE,
             )
+            images_mfd_res = mfd_model.batch_predict(np_images, mfd_batch_size)
+
+            # 公式识别，没有检测到公式时不加载公式识别模型
+            if any(len(mfd_res.boxes) > 0 for mfd_res in images_mfd_res):
+                images_formula_list = self.model.mfr_model.batch_predict(
+                    images_mfd_res,
+                    np_images,
+                    batch_size=self.batch_ratio * MFR_BASE_BATCH_SIZE,
+                )
+            else:
+                images_formula_list = [[] for _ in np_images]
             mfr_count = 0
             for image_index in range(len(np_images)):
                 images_layout_res[image_index] += images_formula_list[image_index]
                 mfr_count += len(images_formula_list[image_index])
 
-        # 清理显存
-        clean_vram(self.model.device, vram_threshold=8)
+        # 内存压力较大时清理显存
+        maybe_clean_memory(self.model.device, reason="after formula")
 
         ocr_res_list_all_page = []
         table_res_list_all_page = []
+        text_layer_region_count = 0
         for index in range(len(np_images)):
             _, ocr_enable, _lang = images_with_extra_info[index]
             layout_res = images_layout_res[index]
@@ -104,6 +138,24 @@ class BatchAnalyze:
                 get_res_list_from_layout_res(layout_res)
             )
 
+            # 文档中已确认重复的页眉页脚区域不做ocr-det和ocr-rec，构建middle json时复制首次结果
+            furniture_tracker, furniture_keys = None, {}
+            if furniture_pages and furniture_pages[index] is not None:
+                furniture_tracker, page_index = furniture_pages[index]
+                ocr_res_list, furniture_keys = furniture_tracker.skip_repeated_regions(
+                    ocr_res_list, pil_images[index], page_index, ocr_enable
+                )
+
+            # 文本层完整的区域直接用pdf中的行框生成span，只有覆盖不足的区域做ocr-det
+            text_lines = text_layers[index] if text_layers else None
+            if not ocr_enable and text_lines is not None and ocr_res_list:
+                region_count = len(ocr_res_list)
+                text_layer_spans, ocr_res_list = build_text_layer_spans(
+                    ocr_res_list, np_img, text_lines, single_page_mfdetrec_res
+                )
+                layout_res.extend(text_layer_spans)
+                text_layer_region_count += region_count - len(ocr_res_list)
+
             ocr_res_list_all_page.append(
                 {
                     "ocr_res_list": ocr_res_list,
@@ -112,6 +164,8 @@ class BatchAnalyze:
                     "np_img": np_img,
                     "single_page_mfdetrec_res": single_page_mfdetrec_res,
                     "layout_res": layout_res,
+                    "furniture_tracker": furniture_tracker,
+                    "furniture_keys": furniture_keys,
                 }
             )
 
@@ -144,8 +198,13 @@ class BatchAnalyze:
                     }
                 )
 
-        # 表格识别 table recognition
-        if self.table_enable:
+        if text_layer_region_count:
+            logger.info(
+                f"text layer fast path: {text_layer_region_count} regions skipped OCR-det"
+            )
+
+        # 表格识别 table recognition，没有表格时不加载表格相关模型
+        if self.table_enable and table_res_list_all_page:
 
             # 图片旋转批量处理
             img_orientation_cls_model = atom_model_manager.get_atom_model(
@@ -235,42 +294,58 @@ class BatchAnalyze:
                             [img_dict["dt_box"], html.escape(ocr_res[0]), ocr_res[1]]
                         ]
 
-            clean_vram(self.model.device, vram_threshold=8)
-
-            # 先对所有表格使用无线表格模型，然后对分类为有线的表格使用有线表格模型
-            wireless_table_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.WirelessTable,
-            )
-            wireless_table_model.batch_predict(table_res_list_all_page)
+            maybe_clean_memory(self.model.device, reason="after table ocr")
 
-            # 单独拿出有线表格进行预测
-            wired_table_res_list = []
+            # 按分类置信度(early_exit策略下还有线密度)决定每个表格跑哪些结构模型
+            table_routing = get_table_routing()
+            routes = []
             for table_res_dict in table_res_list_all_page:
-                # logger.debug(f"Table classification result: {table_res_dict["table_res"]["cls_label"]} with confidence {table_res_dict["table_res"]["cls_score"]}")
-                if (
-                    table_res_dict["table_res"]["cls_label"]
-                    == AtomicModel.WirelessTable
-                    and table_res_dict["table_res"]["cls_score"] < 0.9
-                ) or table_res_dict["table_res"]["cls_label"] == AtomicModel.WiredTable:
-                    wired_table_res_list.append(table_res_dict)
-                del table_res_dict["table_res"]["cls_label"]
-                del table_res_dict["table_res"]["cls_score"]
-            if wired_table_res_list:
-                for table_res_dict in tqdm(
-                    wired_table_res_list, desc="Table-wired Predict"
-                ):
-                    if not table_res_dict.get("ocr_result", None):
-                        continue
-
-                    wired_table_model = atom_model_manager.get_atom_model(
-                        atom_model_name=AtomicModel.WiredTable,
-                        lang=table_res_dict["lang"],
-                    )
-                    table_res_dict["table_res"]["html"] = wired_table_model.predict(
-                        table_res_dict["wired_table_img"],
-                        table_res_dict["ocr_result"],
-                        table_res_dict["table_res"].get("html", None),
+                routes.append(route_table(table_res_dict, table_routing))
+                table_res_dict["table_res"].pop("cls_label", None)
+                table_res_dict["table_res"].pop("cls_score", None)
+
+            # 无线表格模型，有线表格模型和无线模型结果对比后再决定使用哪个
+            wireless_table_res_list = [
+                table_res_dict
+                for table_res_dict, route in zip(table_res_list_all_page, routes)
+                if route != ROUTE_WIRED
+            ]
+            if wireless_table_res_list:
+                wireless_table_model = atom_model_manager.get_atom_model(
+                    atom_model_name=AtomicModel.WirelessTable,
+                )
+                wireless_table_model.batch_predict(wireless_table_res_list)
+
+            # 单独拿出有线表格进行预测，按语言和路由分组，每组共享同一个有线表格模型做批量推理
+            wired_table_res_groups = defaultdict(list)
+            for table_res_dict, route in zip(table_res_list_all_page, routes):
+                if route != ROUTE_WIRELESS:
+                    wired_table_res_groups[(table_res_dict["lang"], route)].append(
+                        table_res_dict
                     )
+            for (_lang, route), group_table_res_list in wired_table_res_groups.items():
+                wired_table_model = atom_model_manager.get_atom_model(
+                    atom_model_name=AtomicModel.WiredTable,
+                    lang=_lang,
+                )
+                wired_table_model.batch_predict(
+                    group_table_res_list, compare=(route == ROUTE_DUAL)
+                )
+
+            # 只跑了有线模型但没有得到结果的表格，回退到无线模型
+            fallback_table_res_list = [
+                table_res_dict
+                for table_res_dict, route in zip(table_res_list_all_page, routes)
+                if route == ROUTE_WIRED
+                and table_res_dict.get("ocr_result")
+                and not table_res_dict["table_res"].get("html")
+            ]
+            if fallback_table_res_list:
+                wireless_table_model = atom_model_manager.get_atom_model(
+                    atom_model_name=AtomicModel.WirelessTable,
+                )
+                wireless_table_model.batch_predict(fallback_table_res_list)
+            table_route_stats.record(routes, fallbacks=len(fallback_table_res_list))
 
             # 表格格式清理
             for table_res_dict in table_res_list_all_page:
@@ -445,6 +520,9 @@ class BatchAnalyze:
                                 )
 
                                 ocr_res_list_dict["layout_res"].extend(ocr_result_list)
+                                record_furniture_det_boxes(
+                                    ocr_res_list_dict, res, len(ocr_result_list)
+                                )
         else:
             # 原始单张处理模式
             for ocr_res_list_dict in tqdm(
@@ -486,6 +564,9 @@ class BatchAnalyze:
                         )
 
                         ocr_res_list_dict["layout_res"].extend(ocr_result_list)
+                        record_furniture_det_boxes(
+                            ocr_res_list_dict, res, len(ocr_result_list)
+                        )
 
         # OCR rec
         # Create dictionaries to store items by language
@@ -572,3 +653,10 @@ class BatchAnalyze:
                     total_processed += len(img_crop_list)
 
         return images_layout_res
+
+
+def record_furniture_det_boxes(ocr_res_list_dict, res, count):
+    """记录首次出现的页眉页脚区域的检测框数量，用于统计重复区域省去的ocr-rec"""
+    key = ocr_res_list_dict["furniture_keys"].get(id(res))
+    if key is not None:
+        ocr_res_list_dict["furniture_tracker"].record_det_boxes(key, count)
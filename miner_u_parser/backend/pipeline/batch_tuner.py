@@ -0,0 +1,203 @@
+import json
+import math
+import os
+import platform
+import threading
+import time
+
+import psutil
+from loguru import logger
+
+from miner_u_parser.utils.cpu_profile import get_cpu_thread_budget, is_cpu_device
+
+# 候选batch size，cpu上更大的batch基本没有收益
+CPU_CANDIDATES = (1, 2, 4, 8)
+GPU_CANDIDATES = (1, 2, 4, 8, 16, 32)
+# 吞吐提升不足该比例时停止增大batch
+MIN_THROUGHPUT_GAIN = 1.05
+# 峰值显存占比，或cpu上进程常驻内存增量占可用内存的比例超过该值时停止增大batch
+MAX_MEMORY_FRACTION = 0.8
+
+
+def batch_autotune_enabled() -> bool:
+    return os.getenv("MINERU_BATCH_AUTOTUNE", "true").lower() == "true"
+
+
+def get_batch_tune_cache_path() -> str:
+    return os.getenv(
+        "MINERU_BATCH_TUNE_CACHE",
+        os.path.join(os.path.expanduser("~"), ".cache", "mineru", "batch_sizes.json"),
+    )
+
+
+def get_device_signature(device) -> str:
+    """区分不同硬件的缓存key，同一台机器上重复运行可以直接复用调优结果"""
+    device = str(device)
+    if is_cpu_device(device):
+        processor = platform.processor() or platform.machine()
+        return f"cpu|{processor}|{get_cpu_thread_budget()}threads"
+    import torch
+
+    if device.startswith("cuda") and torch.cuda.is_available():
+        props = torch.cuda.get_device_properties(device)
+        return f"cuda|{props.name}|{props.total_memory // 1024**3}GB"
+    if device.startswith("npu"):
+        import torch_npu
+
+        props = torch_npu.npu.get_device_properties(device)
+        return f"npu|{props.name}|{props.total_memory // 1024**3}GB"
+    return device
+
+
+def _reset_peak_memory(device):
+    if is_cpu_device(device):
+        return
+    import torch
+
+    if str(device).startswith("cuda") and torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats(device)
+
+
+def _cpu_memory_budget():
+    """标定开始时的进程常驻内存和可用内存，cpu上按进程自身的内存增量计算占比"""
+    from miner_u_parser.utils.model_utils import get_process_rss
+
+    return get_process_rss(), psutil.virtual_memory().available
+
+
+def _memory_fraction(device, cpu_budget=None) -> float:
+    """本次运行的峰值显存占比，cpu上为进程常驻内存相对标定开始时的增量占可用内存的比例，
+    不受其他进程占用的影响"""
+    if is_cpu_device(device):
+        from miner_u_parser.utils.model_utils import get_process_rss
+
+        rss_baseline, available = cpu_budget
+        return max(get_process_rss() - rss_baseline, 0) / max(available, 1)
+    import torch
+
+    if str(device).startswith("cuda") and torch.cuda.is_available():
+        total = torch.cuda.get_device_properties(device).total_memory
+        return torch.cuda.max_memory_allocated(device) / total
+    return 0.0
+
+
+def _image_size(image):
+    """np数组为(h, w)，PIL图片为(w, h)"""
+    if hasattr(image, "shape"):
+        return tuple(image.shape[:2])
+    return tuple(image.size)[::-1]
+
+
+def largest_size_group(images) -> list:
+    """batch_predict会按图片尺寸重新分组，标定只用同一尺寸的图片，
+    保证batch size为N时模型实际推理的也是N张一批；取图片最多的尺寸"""
+    groups = {}
+    for image in images:
+        groups.setdefault(_image_size(image), []).append(image)
+    return max(groups.values(), key=len)
+
+
+def _is_oom(e: Exception) -> bool:
+    return "out of memory" in str(e).lower()
+
+
+class BatchSizeTuner:
+    """按模型和设备自动选择batch size。
+
+    首次遇到某个(模型, 设备)时用当前批次中同一尺寸的图片做一次简短的标定：从小到大尝试候选
+    batch size，记录吞吐和峰值内存，吞吐不再明显提升、内存接近上限或OOM时停止，
+    取吞吐最高的batch size。结果按设备签名缓存到json文件中，后续运行直接复用。
+
+    MINERU_BATCH_AUTOTUNE=false时关闭调优，使用默认batch size；
+    MINERU_<NAME>_BATCH_SIZE(如MINERU_LAYOUT_BATCH_SIZE)可以直接指定。
+    """
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = cache_path or get_batch_tune_cache_path()
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def _load_cache(self):
+        if self._cache is None:
+            self._cache = {}
+            if os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, "r", encoding="utf-8") as f:
+                        self._cache = json.load(f)
+                except Exception as e:
+                    logger.warning(f"failed to read batch size cache {self.cache_path}: {e}")
+        return self._cache
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f, indent=2)
+        except Exception as e:
+            logger.warning(f"failed to write batch size cache {self.cache_path}: {e}")
+
+    def get_batch_size(self, model_name, predict_fn, sample_images, device, default=1) -> int:
+        """predict_fn(images)对一组图片做一次批量推理，sample_images为标定用的图片"""
+        env_batch_size = os.getenv(f"MINERU_{model_name.upper()}_BATCH_SIZE")
+        if env_batch_size:
+            return max(int(env_batch_size), 1)
+        if not batch_autotune_enabled():
+            return default
+
+        key = f"{model_name}|{get_device_signature(device)}"
+        with self._lock:
+            cache = self._load_cache()
+            if key in cache:
+                return cache[key]["batch_size"]
+            # 图片太少时无法标定，也用不上更大的batch
+            if len(sample_images) < 2:
+                return default
+            result = self._calibrate(model_name, predict_fn, sample_images, device)
+            cache[key] = result
+            self._save_cache()
+        return result["batch_size"]
+
+    def _calibrate(self, model_name, predict_fn, sample_images, device) -> dict:
+        candidates = CPU_CANDIDATES if is_cpu_device(device) else GPU_CANDIDATES
+        sample_images = largest_size_group(sample_images)
+        # 预热，首次推理包含predictor初始化等一次性开销
+        predict_fn(sample_images[:1])
+        cpu_budget = _cpu_memory_budget() if is_cpu_device(device) else None
+
+        best = {"batch_size": 1, "throughput": 0.0, "memory_fraction": 0.0}
+        measurements = []
+        for batch_size in candidates:
+            batch = (sample_images * math.ceil(batch_size / len(sample_images)))[:batch_size]
+            _reset_peak_memory(device)
+            start = time.perf_counter()
+            try:
+                predict_fn(batch)
+            except RuntimeError as e:
+                if not _is_oom(e):
+                    raise
+                from miner_u_parser.utils.model_utils import clean_memory
+
+                clean_memory(device)
+                logger.info(f"{model_name} batch size {batch_size}: out of memory")
+                break
+            throughput = batch_size / max(time.perf_counter() - start, 1e-9)
+            memory_fraction = _memory_fraction(device, cpu_budget)
+            measurements.append((batch_size, round(throughput, 3), round(memory_fraction, 3)))
+            if memory_fraction > MAX_MEMORY_FRACTION:
+                break
+            if throughput < best["throughput"] * MIN_THROUGHPUT_GAIN:
+                break
+            best = {
+                "batch_size": batch_size,
+                "throughput": throughput,
+                "memory_fraction": memory_fraction,
+            }
+
+        logger.info(
+            f"{model_name} batch size calibration on {device}: "
+            f"(batch size, images/s, memory) {measurements}, use {best['batch_size']}"
+        )
+        return best
+
+
+batch_size_tuner = BatchSizeTuner()
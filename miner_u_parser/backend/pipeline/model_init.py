@@ -1,19 +1,20 @@
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
 
-import torch
 from loguru import logger
 
 from .model_list import AtomicModel
-from miner_u_parser.model.layout.doclayoutyolo import DocLayoutYOLOModel
-from miner_u_parser.model.mfd.yolo_v8 import YOLOv8MFDModel
-from miner_u_parser.model.mfr.unimernet.Unimernet import UnimernetModel
-from miner_u_parser.model.ocr.paddleocr2pytorch.pytorch_paddle import PytorchPaddleOCR
-from miner_u_parser.model.ori_cls.paddle_ori_cls import PaddleOrientationClsModel
-from miner_u_parser.model.table.cls.paddle_table_cls import PaddleTableClsModel
-
-from miner_u_parser.model.table.rec.slanet_plus.main import RapidTableModel
-from miner_u_parser.model.table.rec.unet_table.main import UnetTableModel
+from miner_u_parser.utils.config_reader import get_device
+from miner_u_parser.utils.cpu_profile import apply_cpu_thread_budget
 from miner_u_parser.utils.enum_class import ModelPath
+from miner_u_parser.utils.model_utils import (
+    clean_memory,
+    get_allocated_vram,
+    get_process_rss,
+)
 from miner_u_parser.utils.models_download_utils import (
     auto_download_and_get_model_root_path,
 )
@@ -28,11 +29,15 @@ def img_orientation_cls_model_init():
         lang="ch_lite",
         enable_merge_det_boxes=False,
     )
+    from miner_u_parser.model.ori_cls.paddle_ori_cls import PaddleOrientationClsModel
+
     cls_model = PaddleOrientationClsModel(ocr_engine)
     return cls_model
 
 
 def table_cls_model_init():
+    from miner_u_parser.model.table.cls.paddle_table_cls import PaddleTableClsModel
+
     return PaddleTableClsModel()
 
 
@@ -45,6 +50,8 @@ def wired_table_model_init(lang=None):
         lang=lang,
         enable_merge_det_boxes=False,
     )
+    from miner_u_parser.model.table.rec.unet_table.main import UnetTableModel
+
     table_model = UnetTableModel(ocr_engine)
     return table_model
 
@@ -58,11 +65,16 @@ def wireless_table_model_init(lang=None):
         lang=lang,
         enable_merge_det_boxes=False,
     )
+    from miner_u_parser.model.table.rec.slanet_plus.main import RapidTableModel
+
     table_model = RapidTableModel(ocr_engine)
     return table_model
 
 
 def mfd_model_init(weight, device="cpu"):
+    import torch
+    from miner_u_parser.model.mfd.yolo_v8 import YOLOv8MFDModel
+
     if str(device).startswith("npu"):
         device = torch.device(device)
     mfd_model = YOLOv8MFDModel(weight, device)
@@ -70,11 +82,16 @@ def mfd_model_init(weight, device="cpu"):
 
 
 def mfr_model_init(weight_dir, device="cpu"):
+    from miner_u_parser.model.mfr.unimernet.Unimernet import UnimernetModel
+
     mfr_model = UnimernetModel(weight_dir, device)
     return mfr_model
 
 
 def doclayout_yolo_model_init(weight, device="cpu"):
+    import torch
+    from miner_u_parser.model.layout.doclayoutyolo import DocLayoutYOLOModel
+
     if str(device).startswith("npu"):
         device = torch.device(device)
     model = DocLayoutYOLOModel(weight, device)
@@ -87,6 +104,10 @@ def ocr_model_init(
     det_db_unclip_ratio=1.8,
     enable_merge_det_boxes=True,
 ):
+    from miner_u_parser.model.ocr.paddleocr2pytorch.pytorch_paddle import (
+        PytorchPaddleOCR,
+    )
+
     if lang is not None and lang != "":
         model = PytorchPaddleOCR(
             det_db_box_thresh=det_db_box_thresh,
@@ -105,17 +126,44 @@ def ocr_model_init(
     return model
 
 
+def _shared_resources(model):
+    """模型持有的、可能被多个原子模型共享的网络(如不同后处理参数的OCR共用的det/rec网络)"""
+    shared_text_system = getattr(model, "_shared_text_system", None)
+    return [shared_text_system] if shared_text_system is not None else []
+
+
+def _get_budget_bytes(env_name):
+    budget = os.getenv(env_name, None)
+    if budget is None or budget.strip() == "":
+        return None
+    return float(budget) * 1024**3
+
+
 class AtomModelSingleton:
+    """按需加载的原子模型注册表。
+
+    模型在第一次get时才会加载，并记录加载耗时与内存/显存占用。
+    通过环境变量MINERU_MODEL_RAM_BUDGET和MINERU_MODEL_VRAM_BUDGET(单位GB)设置预算，
+    超出预算时按LRU顺序卸载最久未使用、且未被其他已加载模型引用的模型。
+
+    多个模型共享的网络单独记录占用，网络仍存活时一直计入预算；只有卸载后能释放内存的
+    模型(自身占用，或它是共享网络最后一个已加载的持有者)才会被卸载。
+    """
+
     _instance = None
-    _models = {}
+    _models = OrderedDict()
+    _model_stats = {}
+    _resources = {}  # id(共享网络) -> {"ref", "ram", "vram"}
+    _loading_stack = []
+    _lock = threading.RLock()
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def get_atom_model(self, atom_model_name: str, **kwargs):
-
+    @staticmethod
+    def _get_model_key(atom_model_name: str, **kwargs):
         lang = kwargs.get("lang", None)
 
         if atom_model_name in [AtomicModel.WiredTable, AtomicModel.WirelessTable]:
@@ -130,22 +178,198 @@ class AtomModelSingleton:
             )
         else:
             key = atom_model_name
+        return key
 
-        if key not in self._models:
-            self._models[key] = atom_model_init(model_name=atom_model_name, **kwargs)
-        return self._models[key]
+    def get_atom_model(self, atom_model_name: str, **kwargs):
+        key = self._get_model_key(atom_model_name, **kwargs)
+
+        with self._lock:
+            if self._loading_stack:
+                # 记录依赖关系，被依赖的模型在依赖方卸载前不会被淘汰
+                self._loading_stack[-1]["deps"].add(key)
+
+            if key in self._models:
+                self._models.move_to_end(key)
+                stats = self._model_stats[key]
+                stats["hits"] += 1
+                stats["last_used"] = time.time()
+                return self._models[key]
+
+            model = self._load_atom_model(key, atom_model_name, **kwargs)
+            self._evict_if_needed(keep=key)
+            return model
+
+    def _load_atom_model(self, key, atom_model_name: str, **kwargs):
+        device = kwargs.get("device") or get_device()
+        apply_cpu_thread_budget(device)
+        frame = {"deps": set(), "nested_ram": 0, "nested_vram": 0}
+        self._loading_stack.append(frame)
+        ram_before = get_process_rss()
+        vram_before = get_allocated_vram(device)
+        load_start = time.time()
+        try:
+            model = atom_model_init(model_name=atom_model_name, **kwargs)
+        finally:
+            self._loading_stack.pop()
+        load_time = time.time() - load_start
+        ram_total = max(get_process_rss() - ram_before, 0)
+        vram_total = max(get_allocated_vram(device) - vram_before, 0)
+
+        # 嵌套加载的子模型(如表格模型内的OCR)单独计数，这里只记录自身占用
+        if self._loading_stack:
+            self._loading_stack[-1]["nested_ram"] += ram_total
+            self._loading_stack[-1]["nested_vram"] += vram_total
+
+        own_ram = max(ram_total - frame["nested_ram"], 0)
+        own_vram = max(vram_total - frame["nested_vram"], 0)
+        resource_ids = []
+        for resource in _shared_resources(model):
+            entry = self._resources.get(id(resource))
+            if entry is None or entry["ref"]() is not resource:
+                # 本次加载新建的共享网络，占用记在网络上，而不是第一个使用它的模型上
+                self._resources[id(resource)] = {
+                    "ref": weakref.ref(resource),
+                    "ram": own_ram,
+                    "vram": own_vram,
+                }
+                own_ram = own_vram = 0
+            resource_ids.append(id(resource))
+
+        stats = self._model_stats.setdefault(
+            key, {"load_count": 0, "load_time": 0.0, "hits": 0}
+        )
+        stats.update(
+            {
+                "loaded": True,
+                "deps": frame["deps"],
+                "resources": resource_ids,
+                "ram": own_ram,
+                "vram": own_vram,
+                "last_load_time": load_time,
+                "last_used": time.time(),
+            }
+        )
+        stats["load_count"] += 1
+        stats["load_time"] += load_time
+        logger.info(
+            f"atom model {key} loaded in {load_time:.2f}s, "
+            f"ram: {stats['ram'] / 1024**2:.1f}MB, vram: {stats['vram'] / 1024**2:.1f}MB"
+        )
+
+        self._models[key] = model
+        return model
+
+    def _is_pinned(self, key):
+        return any(
+            key in self._model_stats[other]["deps"]
+            for other in self._models
+            if other != key
+        )
+
+    def _alive_resources(self):
+        for resource_id, entry in list(self._resources.items()):
+            if entry["ref"]() is None:
+                del self._resources[resource_id]
+        return self._resources
+
+    def _footprint(self, field):
+        # 共享网络只要还存活(被已加载模型或其他调用方持有)就计入
+        return sum(self._model_stats[key][field] for key in self._models) + sum(
+            entry[field] for entry in self._alive_resources().values()
+        )
+
+    def _freeable(self, key, field):
+        """卸载该模型能释放的占用：自身占用，加上只被它持有的共享网络"""
+        freeable = self._model_stats[key][field]
+        resources = self._alive_resources()
+        for resource_id in self._model_stats[key]["resources"]:
+            if resource_id in resources and not any(
+                resource_id in self._model_stats[other]["resources"]
+                for other in self._models
+                if other != key
+            ):
+                freeable += resources[resource_id][field]
+        return freeable
+
+    def _evict_if_needed(self, keep=None):
+        for field, budget in (
+            ("ram", _get_budget_bytes("MINERU_MODEL_RAM_BUDGET")),
+            ("vram", _get_budget_bytes("MINERU_MODEL_VRAM_BUDGET")),
+        ):
+            if budget is None:
+                continue
+            while self._footprint(field) > budget:
+                victim = next(
+                    (
+                        key
+                        for key in self._models
+                        if key != keep
+                        and key not in self._model_stats[keep]["deps"]
+                        and not self._is_pinned(key)
+                        and self._freeable(key, field) > 0
+                    ),
+                    None,
+                )
+                if victim is None:
+                    logger.warning(
+                        f"model {field} footprint "
+                        f"{self._footprint(field) / 1024**3:.2f}GB exceeds budget "
+                        f"{budget / 1024**3:.2f}GB, but no idle model can be evicted"
+                    )
+                    break
+                self.unload_atom_model(victim)
+
+    def unload_atom_model(self, key):
+        with self._lock:
+            if key not in self._models:
+                return
+            del self._models[key]
+            self._model_stats[key]["loaded"] = False
+            logger.info(f"atom model {key} evicted")
+            clean_memory(get_device())
+
+    def get_model_stats(self):
+        """返回每个模型的加载次数、累计加载耗时、内存/显存占用和命中次数"""
+        with self._lock:
+            return {
+                key: {k: v for k, v in stats.items() if k not in ("deps", "resources")}
+                for key, stats in self._model_stats.items()
+            }
+
+    def log_model_stats(self):
+        for key, stats in self.get_model_stats().items():
+            logger.info(
+                f"{key}: loaded={stats['loaded']}, load_count={stats['load_count']}, "
+                f"load_time={stats['load_time']:.2f}s, hits={stats['hits']}, "
+                f"ram={stats['ram'] / 1024**2:.1f}MB, vram={stats['vram'] / 1024**2:.1f}MB"
+            )
+
+
+def get_model_weight_path(relative_path: str) -> str:
+    return str(
+        os.path.join(auto_download_and_get_model_root_path(relative_path), relative_path)
+    )
 
 
 def atom_model_init(model_name: str, **kwargs):
     atom_model = None
     if model_name == AtomicModel.Layout:
         atom_model = doclayout_yolo_model_init(
-            kwargs.get("doclayout_yolo_weights"), kwargs.get("device")
+            kwargs.get("doclayout_yolo_weights")
+            or get_model_weight_path(ModelPath.doclayout_yolo),
+            kwargs.get("device"),
         )
     elif model_name == AtomicModel.MFD:
-        atom_model = mfd_model_init(kwargs.get("mfd_weights"), kwargs.get("device"))
+        atom_model = mfd_model_init(
+            kwargs.get("mfd_weights") or get_model_weight_path(ModelPath.yolo_v8_mfd),
+            kwargs.get("device"),
+        )
     elif model_name == AtomicModel.MFR:
-        atom_model = mfr_model_init(kwargs.get("mfr_weight_dir"), kwargs.get("device"))
+        atom_model = mfr_model_init(
+            kwargs.get("mfr_weight_dir")
+            or get_model_weight_path(ModelPath.unimernet_small),
+            kwargs.get("device"),
+        )
     elif model_name == AtomicModel.OCR:
         atom_model = ocr_model_init(
             kwargs.get("det_db_box_thresh", 0.3),
@@ -177,6 +401,8 @@ def atom_model_init(model_name: str, **kwargs):
 
 
 class MineruPipelineModel:
+    """流水线模型集合，各原子模型在首次访问时才从AtomModelSingleton加载。"""
+
     def __init__(self, **kwargs):
         self.formula_config = kwargs.get("formula_config")
         self.apply_formula = self.formula_config.get("enable", True)
@@ -184,65 +410,50 @@ class MineruPipelineModel:
         self.apply_table = self.table_config.get("enable", True)
         self.lang = kwargs.get("lang", None)
         self.device = kwargs.get("device", "cpu")
-        logger.info("DocAnalysis init, this may take some times......")
-        atom_model_manager = AtomModelSingleton()
 
+        self._atom_model_kwargs = {
+            # layout模型
+            "layout_model": dict(atom_model_name=AtomicModel.Layout, device=self.device),
+            # ocr
+            "ocr_model": dict(
+                atom_model_name=AtomicModel.OCR, det_db_box_thresh=0.3, lang=self.lang
+            ),
+        }
         if self.apply_formula:
-            # 初始化公式检测模型
-            self.mfd_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.MFD,
-                mfd_weights=str(
-                    os.path.join(
-                        auto_download_and_get_model_root_path(ModelPath.yolo_v8_mfd),
-                        ModelPath.yolo_v8_mfd,
-                    )
-                ),
-                device=self.device,
+            # 公式检测模型和公式解析模型
+            self._atom_model_kwargs["mfd_model"] = dict(
+                atom_model_name=AtomicModel.MFD, device=self.device
             )
-
-            # 初始化公式解析模型
-            mfr_weight_dir = os.path.join(
-                auto_download_and_get_model_root_path(ModelPath.unimernet_small),
-                ModelPath.unimernet_small,
+            self._atom_model_kwargs["mfr_model"] = dict(
+                atom_model_name=AtomicModel.MFR, device=self.device
             )
-
-            self.mfr_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.MFR,
-                mfr_weight_dir=mfr_weight_dir,
-                device=self.device,
-            )
-
-        # 初始化layout模型
-        self.layout_model = atom_model_manager.get_atom_model(
-            atom_model_name=AtomicModel.Layout,
-            doclayout_yolo_weights=str(
-                os.path.join(
-                    auto_download_and_get_model_root_path(ModelPath.doclayout_yolo),
-                    ModelPath.doclayout_yolo,
-                )
-            ),
-            device=self.device,
-        )
-        # 初始化ocr
-        self.ocr_model = atom_model_manager.get_atom_model(
-            atom_model_name=AtomicModel.OCR, det_db_box_thresh=0.3, lang=self.lang
-        )
-        # init table model
         if self.apply_table:
-            self.wired_table_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.WiredTable,
-                lang=self.lang,
+            # table model
+            self._atom_model_kwargs["wired_table_model"] = dict(
+                atom_model_name=AtomicModel.WiredTable, lang=self.lang
             )
-            self.wireless_table_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.WirelessTable,
-                lang=self.lang,
+            self._atom_model_kwargs["wireless_table_model"] = dict(
+                atom_model_name=AtomicModel.WirelessTable, lang=self.lang
             )
-            self.table_cls_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.TableCls,
+            self._atom_model_kwargs["table_cls_model"] = dict(
+                atom_model_name=AtomicModel.TableCls
             )
-            self.img_orientation_cls_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.ImgOrientationCls,
-                lang=self.lang,
+            self._atom_model_kwargs["img_orientation_cls_model"] = dict(
+                atom_model_name=AtomicModel.ImgOrientationCls, lang=self.lang
             )
 
+    def __getattr__(self, name):
+        # 仅在常规属性查找失败时调用，用于按需加载原子模型
+        atom_model_kwargs = self.__dict__.get("_atom_model_kwargs", {})
+        if name not in atom_model_kwargs:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        return AtomModelSingleton().get_atom_model(**atom_model_kwargs[name])
+
+    def preload(self):
+        """预先加载全部已启用的模型，用于需要热启动的场景"""
+        logger.info("DocAnalysis init, this may take some times......")
+        for name in self._atom_model_kwargs:
+            getattr(self, name)
         logger.info("DocAnalysis init done!")
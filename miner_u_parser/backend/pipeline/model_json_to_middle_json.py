@@ -4,15 +4,27 @@ from tqdm import tqdm
 
 from miner_u_parser.utils.config_reader import get_device, get_formula_enable
 from miner_u_parser.backend.pipeline.model_init import AtomModelSingleton
+from miner_u_parser.backend.pipeline.page_detections import unpack_layout_dets
 from miner_u_parser.backend.pipeline.para_split import para_split
 from miner_u_parser.utils.block_pre_proc import prepare_block_bboxes, process_groups
 from miner_u_parser.utils.block_sort import sort_blocks_by_bbox
 from miner_u_parser.utils.boxbase import calculate_overlap_area_in_bbox1_area_ratio
 from miner_u_parser.utils.cut_image import cut_image_and_table
 from miner_u_parser.utils.enum_class import ContentType
-from miner_u_parser.utils.model_utils import clean_memory
+from miner_u_parser.utils.model_utils import maybe_clean_memory
 from miner_u_parser.backend.pipeline.pipeline_magic_model import MagicModel
 from miner_u_parser.utils.ocr_utils import OcrConfidence
+from miner_u_parser.utils.page_furniture import (
+    PageFurnitureTracker,
+    furniture_skip_enabled,
+    get_document_furniture_tracker,
+)
+from miner_u_parser.utils.pdf_text_cache import (
+    PageTextLayer,
+    get_page_text_layer,
+    release_document_text_layer,
+)
+from miner_u_parser.utils.result_cache import log_result_cache_stats
 from miner_u_parser.utils.span_block_fix import (
     fill_spans_in_blocks,
     fix_discarded_block,
@@ -37,9 +49,16 @@ def page_model_info_to_page_info(
     page_index,
     ocr_enable=False,
     formula_enabled=True,
+    furniture_tracker=None,
+    page_text_layer=None,
 ):
     scale = image_dict["scale"]
     page_pil_img = image_dict["img_pil"]
+    # 列式存储的检测结果在这里展开为dict，MagicModel会原地修改它们
+    page_model_info = {
+        **page_model_info,
+        "layout_dets": unpack_layout_dets(page_model_info["layout_dets"]),
+    }
     # page_img_md5 = str_md5(image_dict["img_base64"])
     page_img_md5 = bytes_md5(page_pil_img.tobytes())
     page_w, page_h = map(int, page.get_size())
@@ -160,6 +179,18 @@ def page_model_info_to_page_info(
             page_h,
         )
 
+    """已确认在多页重复出现的页眉页脚直接复用首次处理的结果，跳过span抽取和ocr"""
+    furniture_keys, furniture_placeholders = [], []
+    if furniture_tracker is not None:
+        all_discarded_blocks, furniture_keys, furniture_placeholders = (
+            furniture_tracker.split_repeated(
+                all_discarded_blocks, page_pil_img, scale, page_index
+            )
+        )
+        spans = furniture_tracker.drop_spans_in(
+            spans, furniture_placeholders, calculate_overlap_area_in_bbox1_area_ratio
+        )
+
     """在删除重复span之前，应该通过image_body和table_body的block过滤一下image和table的span"""
     """顺便删除大水印并保留abandon的span"""
     spans = remove_outside_spans(spans, all_bboxes, all_discarded_blocks)
@@ -174,8 +205,10 @@ def page_model_info_to_page_info(
         pass
     else:
         """使用新版本的混合ocr方案."""
+        if page_text_layer is None:
+            page_text_layer = PageTextLayer.from_pdf_page(page)
         spans = txt_spans_extract(
-            page, spans, page_pil_img, scale, all_bboxes, all_discarded_blocks
+            page_text_layer, spans, page_pil_img, scale, all_bboxes, all_discarded_blocks
         )
 
     """先处理不需要排版的discarded_blocks"""
@@ -183,6 +216,11 @@ def page_model_info_to_page_info(
         all_discarded_blocks, spans, 0.4
     )
     fix_discarded_blocks = fix_discarded_block(discarded_block_with_spans)
+    if furniture_tracker is not None:
+        furniture_tracker.register(furniture_keys, fix_discarded_blocks)
+        fix_discarded_blocks = furniture_tracker.restore_order(
+            fix_discarded_blocks, furniture_placeholders
+        )
 
     """如果当前页面没有有效的bbox则跳过"""
     if len(all_bboxes) == 0:
@@ -227,6 +265,10 @@ def result_to_middle_json(
 ):
     middle_json = {"pdf_info": [], "_backend": "pipeline", "_version_name": __version__}
     formula_enabled = get_formula_enable(formula_enabled)
+    # doc_analyze已在ocr-det之前识别了重复的页眉页脚时沿用它的判定
+    furniture_tracker = get_document_furniture_tracker(pdf_doc)
+    if furniture_tracker is None and furniture_skip_enabled():
+        furniture_tracker = PageFurnitureTracker()
     for page_index, page_model_info in tqdm(
         enumerate(model_list), total=len(model_list), desc="Processing pages"
     ):
@@ -240,6 +282,10 @@ def result_to_middle_json(
             page_index,
             ocr_enable=ocr_enable,
             formula_enabled=formula_enabled,
+            furniture_tracker=furniture_tracker,
+            page_text_layer=(
+                None if ocr_enable else get_page_text_layer(pdf_doc, page_index)
+            ),
         )
         if page_info is None:
             page_w, page_h = map(int, page.get_size())
@@ -289,6 +335,12 @@ def result_to_middle_json(
             else:
                 span["content"] = ""
                 span["score"] = 0.0
+        log_result_cache_stats()
+
+    """重复的页眉页脚复制首次出现时的结果(包括后置ocr的结果)"""
+    if furniture_tracker is not None:
+        furniture_tracker.resolve()
+        furniture_tracker.log_stats()
 
     """分段"""
     para_split(middle_json["pdf_info"])
@@ -297,9 +349,10 @@ def result_to_middle_json(
     merge_table(middle_json["pdf_info"])
 
     """清理内存"""
+    release_document_text_layer(pdf_doc)
     pdf_doc.close()
     if os.getenv("MINERU_DONOT_CLEAN_MEM") is None and len(model_list) >= 10:
-        clean_memory(get_device())
+        maybe_clean_memory(get_device(), reason="after middle json")
 
     return middle_json
 
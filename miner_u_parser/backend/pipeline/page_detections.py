@@ -0,0 +1,90 @@
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+# 列式存储的基础字段，其余字段(latex、html、text等)存放在按行索引的附加表中
+BASE_FIELDS = ("category_id", "poly", "score")
+
+
+def columnar_detections_enabled() -> bool:
+    return os.getenv("MINERU_COLUMNAR_DETECTIONS", "true").lower() == "true"
+
+
+class PageDetections(Sequence):
+    """单页模型输出(layout_dets)的列式容器。
+
+    poly、score、category_id分别存为数组，字符串等其他字段存放在只包含相应行的附加表中，
+    用于在模型推理结束到构建middle json之间保存整个文档的检测结果，避免每个检测框一个dict
+    带来的内存开销。按下标访问或迭代时返回与原来一致的dict(每次新建)，to_dicts()转换为
+    原有的list[dict]格式。
+    """
+
+    __slots__ = ("polys", "int_polys", "scores", "category_ids", "extras")
+
+    def __init__(self, polys, int_polys, scores, category_ids, extras):
+        self.polys = polys
+        self.int_polys = int_polys
+        self.scores = scores
+        self.category_ids = category_ids
+        self.extras = extras
+
+    @classmethod
+    def from_dicts(cls, layout_dets):
+        count = len(layout_dets)
+        polys = np.zeros((count, 8), dtype=np.float64)
+        int_polys = np.zeros(count, dtype=bool)
+        scores = np.zeros(count, dtype=np.float64)
+        category_ids = np.zeros(count, dtype=np.int16)
+        extras = {}
+        for i, det in enumerate(layout_dets):
+            poly = det["poly"]
+            polys[i] = poly
+            # poly保持原来的数值类型，layout/mfd为int，ocr-det为float
+            int_polys[i] = all(isinstance(v, (int, np.integer)) for v in poly)
+            scores[i] = det["score"]
+            category_ids[i] = det["category_id"]
+            extra = {key: value for key, value in det.items() if key not in BASE_FIELDS}
+            if extra:
+                extras[i] = extra
+        return cls(polys, int_polys, scores, category_ids, extras)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PageDetections index out of range")
+        poly = self.polys[index].tolist()
+        if self.int_polys[index]:
+            poly = [int(v) for v in poly]
+        det = {
+            "category_id": int(self.category_ids[index]),
+            "poly": poly,
+            "score": float(self.scores[index]),
+        }
+        extra = self.extras.get(index)
+        if extra:
+            det.update(extra)
+        return det
+
+    def to_dicts(self) -> list:
+        return [self[i] for i in range(len(self))]
+
+
+def pack_layout_dets(layout_dets):
+    """按配置将单页的检测结果转为列式容器"""
+    if columnar_detections_enabled():
+        return PageDetections.from_dicts(layout_dets)
+    return layout_dets
+
+
+def unpack_layout_dets(layout_dets) -> list:
+    """转换回list[dict]，后续流程会原地修改这些dict"""
+    if isinstance(layout_dets, PageDetections):
+        return layout_dets.to_dicts()
+    return layout_dets
@@ -1,7 +1,9 @@
 import copy
+import os
+
 from loguru import logger
 from miner_u_parser.utils.enum_class import ContentType, BlockType, SplitFlag
-from miner_u_parser.utils.language import detect_lang
+from miner_u_parser.utils.language import detect_langs
 
 
 LINE_STOP_FLAG = (
@@ -41,7 +43,7 @@ def __process_blocks(blocks):
 
         # 如果当前块是 text 类型
         if current_block["type"] == "text":
-            current_block["bbox_fs"] = copy.deepcopy(current_block["bbox"])
+            current_block["bbox_fs"] = list(current_block["bbox"])
             if "lines" in current_block and len(current_block["lines"]) > 0:
                 current_block["bbox_fs"] = [
                     min([line["bbox"][0] for line in current_block["lines"]]),
@@ -119,7 +121,8 @@ def __is_list_or_index_block(block):
             lines_text_list.append(line_text)
             block_text = "".join(lines_text_list)
 
-        block_lang = detect_lang(block_text)
+        # 只用于区分是否为中日韩语言，不含中日韩字符时不调用语言检测模型
+        block_lang = detect_langs([block_text], cjk_only=True)[0]
         # logger.info(f"block_lang: {block_lang}")
 
         for line in block["lines"]:
@@ -265,6 +268,14 @@ def __is_list_or_index_block(block):
         return BlockType.TEXT
 
 
+def __mark_cross_page(block):
+    # span可能与preproc_blocks共享，替换为带标记的副本而不是原地修改
+    for line in block["lines"]:
+        line["spans"] = [
+            {**span, SplitFlag.CROSS_PAGE: True} for span in line["spans"]
+        ]
+
+
 def __merge_2_text_blocks(block1, block2):
     if len(block1["lines"]) > 0:
         first_line = block1["lines"][0]
@@ -296,9 +307,7 @@ def __merge_2_text_blocks(block1, block2):
                             and not span_start_with_big_char
                         ):
                             if block1["page_num"] != block2["page_num"]:
-                                for line in block1["lines"]:
-                                    for span in line["spans"]:
-                                        span[SplitFlag.CROSS_PAGE] = True
+                                __mark_cross_page(block1)
                             block2["lines"].extend(block1["lines"])
                             block1["lines"] = []
                             block1[SplitFlag.LINES_DELETED] = True
@@ -308,9 +317,7 @@ def __merge_2_text_blocks(block1, block2):
 
 def __merge_2_list_blocks(block1, block2):
     if block1["page_num"] != block2["page_num"]:
-        for line in block1["lines"]:
-            for span in line["spans"]:
-                span[SplitFlag.CROSS_PAGE] = True
+        __mark_cross_page(block1)
     block2["lines"].extend(block1["lines"])
     block1["lines"] = []
     block1[SplitFlag.LINES_DELETED] = True
@@ -368,25 +375,52 @@ def __para_merge_page(blocks):
             continue
 
 
-def para_split(page_info_list):
+def keep_preproc_blocks_enabled() -> bool:
+    """MINERU_KEEP_PREPROC_BLOCKS=false时middle json中只保留para_blocks"""
+    return os.getenv("MINERU_KEEP_PREPROC_BLOCKS", "true").lower() == "true"
+
+
+def __copy_block_for_merge(block):
+    """para_blocks与preproc_blocks共享未被修改的部分，只复制段落合并会修改的层级。
+
+    text block的类型、lines和line上的list标记会被修改，复制block和各line的dict；
+    跨页合并时span在__mark_cross_page中替换为副本；表格会被merge_table修改内部的
+    blocks、lines和span，整体复制；其他block只复制一层dict。
+    """
+    if block["type"] == BlockType.TEXT:
+        return {**block, "lines": [{**line} for line in block["lines"]]}
+    if block["type"] == BlockType.TABLE:
+        return copy.deepcopy(block)
+    return {**block}
+
+
+def para_split(page_info_list, keep_preproc_blocks=None):
+    if keep_preproc_blocks is None:
+        keep_preproc_blocks = keep_preproc_blocks_enabled()
     all_blocks = []
     for page_info in page_info_list:
-        blocks = copy.deepcopy(page_info["preproc_blocks"])
+        if keep_preproc_blocks:
+            blocks = [
+                __copy_block_for_merge(block) for block in page_info["preproc_blocks"]
+            ]
+        else:
+            # 不保留preproc_blocks时直接在原block上合并
+            blocks = page_info.pop("preproc_blocks")
         for block in blocks:
             block["page_num"] = page_info["page_idx"]
             block["page_size"] = page_info["page_size"]
         all_blocks.extend(blocks)
 
     __para_merge_page(all_blocks)
+    para_blocks_by_page = {}
     for page_info in page_info_list:
-        page_info["para_blocks"] = []
-        for block in all_blocks:
-            if "page_num" in block:
-                if block["page_num"] == page_info["page_idx"]:
-                    page_info["para_blocks"].append(block)
-                    # 从block中删除不需要的page_num和page_size字段
-                    del block["page_num"]
-                    del block["page_size"]
+        page_info["para_blocks"] = para_blocks_by_page.setdefault(
+            page_info["page_idx"], []
+        )
+    for block in all_blocks:
+        # 从block中删除不需要的page_num和page_size字段
+        para_blocks_by_page[block.pop("page_num")].append(block)
+        del block["page_size"]
 
 
 if __name__ == "__main__":
@@ -4,12 +4,30 @@ from typing import List, Tuple
 from PIL import Image
 from loguru import logger
 
-from .model_init import MineruPipelineModel
+from .model_init import AtomModelSingleton, MineruPipelineModel
+from .page_detections import pack_layout_dets
+from .table_routing import table_route_stats
 from miner_u_parser.utils.config_reader import get_device
 from miner_u_parser.utils.enum_class import ImageType
-from miner_u_parser.utils.pdf_classify import classify
+from miner_u_parser.utils.pdf_classify import classify, sample_page_indices
+from miner_u_parser.utils.page_furniture import (
+    PageFurnitureTracker,
+    furniture_skip_enabled,
+    set_document_furniture_tracker,
+)
 from miner_u_parser.utils.pdf_image_tools import load_images_from_pdf
-from miner_u_parser.utils.model_utils import get_vram, clean_memory
+from miner_u_parser.utils.pdf_text_cache import (
+    DocumentTextLayer,
+    get_page_text_layer,
+    set_document_text_layer,
+)
+from miner_u_parser.utils.model_utils import (
+    get_vram,
+    maybe_clean_memory,
+    memory_cleanup_policy,
+)
+from miner_u_parser.utils.models_download_utils import ensure_model_weights
+from miner_u_parser.utils.result_cache import log_result_cache_stats
 
 
 os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"  # 让mps可以fallback
@@ -83,6 +101,14 @@ def doc_analyze(
         os.environ.get("MINERU_MIN_BATCH_INFERENCE_SIZE", 384)
     )
 
+    # 处理任何页面前先确认所需模型权重齐全
+    ensure_model_weights(formula_enable, table_enable, lang_list)
+
+    from miner_u_parser.utils.text_layer import (
+        get_page_text_lines,
+        text_layer_fast_path_enabled,
+    )
+
     # 收集所有页面信息
     all_pages_info = (
         []
@@ -91,15 +117,38 @@ def doc_analyze(
     all_image_lists = []
     all_pdf_docs = []
     ocr_enabled_list = []
+    all_text_layers = []
+    all_furniture_pages = []
     for pdf_idx, pdf_bytes in enumerate(pdf_bytes_list):
-        # 确定OCR设置
+        # 文档的文本层只提取一次，供分类、文本层快速路径和span字符填充共用；
+        # 分类只需要抽样页，其余页面确定为txt模式后再提取，需要ocr的文档不提取全文
+        doc_text_layer = None
         _ocr_enable = False
         if parse_method == "auto":
-            if classify(pdf_bytes) == "ocr":
+            sample_indices = sample_page_indices(pdf_bytes)
+            try:
+                doc_text_layer = DocumentTextLayer.extract(pdf_bytes, sample_indices)
+            except Exception as e:
+                logger.warning(f"failed to extract text layer of pdf {pdf_idx}: {e}")
+            if (
+                classify(
+                    pdf_bytes, text_layer=doc_text_layer, page_indices=sample_indices
+                )
+                == "ocr"
+            ):
                 _ocr_enable = True
         elif parse_method == "ocr":
             _ocr_enable = True
 
+        if not _ocr_enable:
+            try:
+                if doc_text_layer is None:
+                    doc_text_layer = DocumentTextLayer.extract(pdf_bytes)
+                else:
+                    doc_text_layer.extract_missing(pdf_bytes)
+            except Exception as e:
+                logger.warning(f"failed to extract text layer of pdf {pdf_idx}: {e}")
+
         ocr_enabled_list.append(_ocr_enable)
         _lang = lang_list[pdf_idx]
 
@@ -107,6 +156,13 @@ def doc_analyze(
         images_list, pdf_doc = load_images_from_pdf(pdf_bytes, image_type=ImageType.PIL)
         all_image_lists.append(images_list)
         all_pdf_docs.append(pdf_doc)
+        if not _ocr_enable and doc_text_layer is not None:
+            set_document_text_layer(pdf_doc, doc_text_layer)
+        # 重复的页眉页脚在ocr-det之前识别，判定结果随pdf_doc带到构建middle json阶段
+        furniture_tracker = None
+        if furniture_skip_enabled():
+            furniture_tracker = PageFurnitureTracker()
+            set_document_furniture_tracker(pdf_doc, furniture_tracker)
         for page_idx in range(len(images_list)):
             img_dict = images_list[page_idx]
             all_pages_info.append(
@@ -118,6 +174,19 @@ def doc_analyze(
                     _lang,
                 )
             )
+            # txt模式下提取文本层的行框，文本层完整的区域不再做ocr-det
+            text_lines = None
+            if not _ocr_enable and text_layer_fast_path_enabled():
+                try:
+                    text_lines = get_page_text_lines(
+                        get_page_text_layer(pdf_doc, page_idx), img_dict["scale"]
+                    )
+                except Exception as e:
+                    logger.warning(f"failed to read text layer of page {page_idx}: {e}")
+            all_text_layers.append(text_lines)
+            all_furniture_pages.append(
+                (furniture_tracker, page_idx) if furniture_tracker is not None else None
+            )
 
     # 准备批处理
     images_with_extra_info = [(info[2], info[3], info[4]) for info in all_pages_info]
@@ -126,6 +195,14 @@ def doc_analyze(
         images_with_extra_info[i : i + batch_size]
         for i in range(0, len(images_with_extra_info), batch_size)
     ]
+    batch_text_layers = [
+        all_text_layers[i : i + batch_size]
+        for i in range(0, len(all_text_layers), batch_size)
+    ]
+    batch_furniture_pages = [
+        all_furniture_pages[i : i + batch_size]
+        for i in range(0, len(all_furniture_pages), batch_size)
+    ]
 
     # 执行批处理
     results = []
@@ -136,8 +213,15 @@ def doc_analyze(
             f"Batch {index + 1}/{len(batch_images)}: "
             f"{processed_images_count} pages/{len(images_with_extra_info)} pages"
         )
-        batch_results = batch_image_analyze(batch_image, formula_enable, table_enable)
-        results.extend(batch_results)
+        batch_results = batch_image_analyze(
+            batch_image,
+            formula_enable,
+            table_enable,
+            batch_text_layers[index],
+            batch_furniture_pages[index],
+        )
+        # 整个文档的检测结果要保留到构建middle json时，按页转为列式存储
+        results.extend(pack_layout_dets(layout_dets) for layout_dets in batch_results)
 
     # 构建返回结果
     infer_results = []
@@ -158,6 +242,11 @@ def doc_analyze(
 
         infer_results[pdf_idx].append(page_dict)
 
+    AtomModelSingleton().log_model_stats()
+    table_route_stats.log()
+    log_result_cache_stats()
+    memory_cleanup_policy.log_stats()
+
     return infer_results, all_image_lists, all_pdf_docs, lang_list, ocr_enabled_list
 
 
@@ -165,6 +254,8 @@ def batch_image_analyze(
     images_with_extra_info: List[Tuple[Image.Image, bool, str]],
     formula_enable=True,
     table_enable=True,
+    text_layers=None,
+    furniture_pages=None,
 ):
 
     from .batch_analyze import BatchAnalyze
@@ -222,8 +313,8 @@ def batch_image_analyze(
     batch_model = BatchAnalyze(
         model_manager, batch_ratio, formula_enable, table_enable, enable_ocr_det_batch
     )
-    results = batch_model(images_with_extra_info)
+    results = batch_model(images_with_extra_info, text_layers, furniture_pages)
 
-    clean_memory(get_device())
+    maybe_clean_memory(get_device(), reason="after batch")
 
     return results
@@ -1,8 +1,9 @@
 import re
 from miner_u_parser.utils.config_reader import get_latex_delimiter_config
 from miner_u_parser.backend.pipeline.para_split import ListLineTag
+from miner_u_parser.backend.pipeline.pipeline_result_store import PageStore
 from miner_u_parser.utils.enum_class import BlockType, ContentType
-from miner_u_parser.utils.language import detect_lang
+from miner_u_parser.utils.language import CJK_LANGS, detect_langs
 
 
 def __is_hyphen_at_line_end(line):
@@ -21,16 +22,18 @@ def __is_hyphen_at_line_end(line):
 def make_blocks_to_markdown(
     paras_of_layout,
     img_buket_path="",
+    block_langs=None,
 ):
     page_markdown = []
     for para_block in paras_of_layout:
         para_text = ""
         para_type = para_block["type"]
         if para_type in [BlockType.TEXT, BlockType.LIST, BlockType.INDEX]:
-            para_text = merge_para_with_text(para_block)
+            para_text = merge_para_with_text(para_block, block_langs)
         elif para_type == BlockType.TITLE:
             title_level = get_title_level(para_block)
-            para_text = f'{"#" * title_level} {merge_para_with_text(para_block)}'
+            title_text = merge_para_with_text(para_block, block_langs)
+            para_text = f'{"#" * title_level} {title_text}'
         elif para_type == BlockType.INTERLINE_EQUATION:
             if (
                 len(para_block["lines"]) == 0
@@ -38,7 +41,7 @@ def make_blocks_to_markdown(
             ):
                 continue
             if para_block["lines"][0]["spans"][0].get("content", ""):
-                para_text = merge_para_with_text(para_block)
+                para_text = merge_para_with_text(para_block, block_langs)
             else:
                 para_text += f"![]({img_buket_path}/{para_block['lines'][0]['spans'][0]['image_path']})"
         elif para_type == BlockType.IMAGE:
@@ -52,7 +55,7 @@ def make_blocks_to_markdown(
             if has_image_footnote:
                 for block in para_block["blocks"]:  # 1st.拼image_caption
                     if block["type"] == BlockType.IMAGE_CAPTION:
-                        para_text += merge_para_with_text(block) + "  \n"
+                        para_text += merge_para_with_text(block, block_langs) + "  \n"
                 for block in para_block["blocks"]:  # 2nd.拼image_body
                     if block["type"] == BlockType.IMAGE_BODY:
                         for line in block["lines"]:
@@ -62,7 +65,7 @@ def make_blocks_to_markdown(
                                         para_text += f"![]({img_buket_path}/{span['image_path']})"
                 for block in para_block["blocks"]:  # 3rd.拼image_footnote
                     if block["type"] == BlockType.IMAGE_FOOTNOTE:
-                        para_text += "  \n" + merge_para_with_text(block)
+                        para_text += "  \n" + merge_para_with_text(block, block_langs)
             else:
                 for block in para_block["blocks"]:  # 1st.拼image_body
                     if block["type"] == BlockType.IMAGE_BODY:
@@ -73,12 +76,12 @@ def make_blocks_to_markdown(
                                         para_text += f"![]({img_buket_path}/{span['image_path']})"
                 for block in para_block["blocks"]:  # 2nd.拼image_caption
                     if block["type"] == BlockType.IMAGE_CAPTION:
-                        para_text += "  \n" + merge_para_with_text(block)
+                        para_text += "  \n" + merge_para_with_text(block, block_langs)
         elif para_type == BlockType.TABLE:
 
             for block in para_block["blocks"]:  # 1st.拼table_caption
                 if block["type"] == BlockType.TABLE_CAPTION:
-                    para_text += merge_para_with_text(block) + "  \n"
+                    para_text += merge_para_with_text(block, block_langs) + "  \n"
             for block in para_block["blocks"]:  # 2nd.拼table_body
                 if block["type"] == BlockType.TABLE_BODY:
                     for line in block["lines"]:
@@ -93,7 +96,7 @@ def make_blocks_to_markdown(
                                     )
             for block in para_block["blocks"]:  # 3rd.拼table_footnote
                 if block["type"] == BlockType.TABLE_FOOTNOTE:
-                    para_text += "\n" + merge_para_with_text(block) + "  "
+                    para_text += "\n" + merge_para_with_text(block, block_langs) + "  "
 
         if para_text.strip() == "":
             continue
@@ -104,8 +107,16 @@ def make_blocks_to_markdown(
     return page_markdown
 
 
+# 全角字母和数字(FF21-FF3A为A-Z，FF41-FF5A为a-z，FF10-FF19为0-9)到半角的映射
+FULL_TO_HALF_TABLE = {
+    code: code - 0xFEE0
+    for start, end in ((0xFF10, 0xFF19), (0xFF21, 0xFF3A), (0xFF41, 0xFF5A))
+    for code in range(start, end + 1)
+}
+
+
 def full_to_half(text: str) -> str:
-    """Convert full-width characters to half-width characters using code point manipulation.
+    """Convert full-width letters and digits to half-width characters.
 
     Args:
         text: String containing full-width characters
@@ -113,19 +124,36 @@ def full_to_half(text: str) -> str:
     Returns:
         String with full-width characters converted to half-width
     """
-    result = []
-    for char in text:
-        code = ord(char)
-        # Full-width letters and numbers (FF21-FF3A for A-Z, FF41-FF5A for a-z, FF10-FF19 for 0-9)
-        if (
-            (0xFF21 <= code <= 0xFF3A)
-            or (0xFF41 <= code <= 0xFF5A)
-            or (0xFF10 <= code <= 0xFF19)
-        ):
-            result.append(chr(code - 0xFEE0))  # Shift to ASCII range
-        else:
-            result.append(char)
-    return "".join(result)
+    return text.translate(FULL_TO_HALF_TABLE)
+
+
+def get_para_block_text(para_block) -> str:
+    """段落中文本span的内容(全角转半角)，用于判断段落语言"""
+    return "".join(
+        full_to_half(span["content"])
+        for line in para_block.get("lines", [])
+        for span in line["spans"]
+        if span["type"] == ContentType.TEXT
+    )
+
+
+def detect_para_block_langs(pdf_info_dict) -> dict:
+    """整个文档(或给定页面)的段落一次性判断语言，返回id(block)到语言的映射，
+    block在使用结果期间需保持存活。
+
+    拼接markdown时只需要区分是否为中日韩语境，不含中日韩字符的段落不调用语言检测模型。
+    """
+    blocks = []
+    for page_info in pdf_info_dict:
+        for para_block in page_info.get("para_blocks") or []:
+            if "blocks" in para_block:
+                blocks.extend(para_block["blocks"])
+            else:
+                blocks.append(para_block)
+    langs = detect_langs(
+        [get_para_block_text(block) for block in blocks], cjk_only=True
+    )
+    return {id(block): lang for block, lang in zip(blocks, langs)}
 
 
 latex_delimiters_config = get_latex_delimiter_config()
@@ -143,14 +171,11 @@ inline_left_delimiter = delimiters["inline"]["left"]
 inline_right_delimiter = delimiters["inline"]["right"]
 
 
-def merge_para_with_text(para_block):
-    block_text = ""
-    for line in para_block["lines"]:
-        for span in line["spans"]:
-            if span["type"] in [ContentType.TEXT]:
-                span["content"] = full_to_half(span["content"])
-                block_text += span["content"]
-    block_lang = detect_lang(block_text)
+def merge_para_with_text(para_block, block_langs=None):
+    if block_langs is not None and id(para_block) in block_langs:
+        block_lang = block_langs[id(para_block)]
+    else:
+        block_lang = detect_langs([get_para_block_text(para_block)], cjk_only=True)[0]
 
     para_text = ""
     for i, line in enumerate(para_block["lines"]):
@@ -163,7 +188,7 @@ def merge_para_with_text(para_block):
             span_type = span["type"]
             content = ""
             if span_type == ContentType.TEXT:
-                content = escape_special_markdown_char(span["content"])
+                content = escape_special_markdown_char(full_to_half(span["content"]))
             elif span_type == ContentType.INLINE_EQUATION:
                 if span.get("content", ""):
                     content = f"{inline_left_delimiter}{span['content']}{inline_right_delimiter}"
@@ -174,10 +199,9 @@ def merge_para_with_text(para_block):
             content = content.strip()
 
             if content:
-                langs = ["zh", "ja", "ko"]
                 # logger.info(f'block_lang: {block_lang}, content: {content}')
                 if (
-                    block_lang in langs
+                    block_lang in CJK_LANGS
                 ):  # 中文/日语/韩文语境下，换行不需要空格分隔,但是如果是行内公式结尾，还是要加空格
                     if j == len(line["spans"]) - 1 and span_type not in [
                         ContentType.INLINE_EQUATION
@@ -204,20 +228,41 @@ def merge_para_with_text(para_block):
     return para_text
 
 
-def union_make(
+def iter_union_make(
     pdf_info_dict: list,
     img_buket_path: str = "",
 ):
-    output_content = []
+    """逐页生成markdown片段，拼接结果与union_make完全一致，用于边生成边写文件。
+
+    内存中的pdf_info整个文档一次性判断段落语言；按页延迟解码的PageStore每次访问
+    都会重新解码，只遍历一次，逐页判断语言。
+    """
+    lazy_pages = isinstance(pdf_info_dict, PageStore)
+    block_langs = None if lazy_pages else detect_para_block_langs(pdf_info_dict)
+    is_first = True
     for page_info in pdf_info_dict:
         paras_of_layout = page_info.get("para_blocks")
         if not paras_of_layout:
             continue
 
-        page_markdown = make_blocks_to_markdown(paras_of_layout, img_buket_path)
-        output_content.extend(page_markdown)
+        page_markdown = make_blocks_to_markdown(
+            paras_of_layout,
+            img_buket_path,
+            detect_para_block_langs([page_info]) if lazy_pages else block_langs,
+        )
+        if not page_markdown:
+            continue
+        if not is_first:
+            yield "\n\n"
+        yield "\n\n".join(page_markdown)
+        is_first = False
+
 
-    return "\n\n".join(output_content)
+def union_make(
+    pdf_info_dict: list,
+    img_buket_path: str = "",
+):
+    return "".join(iter_union_make(pdf_info_dict, img_buket_path))
 
 
 def get_title_level(block):
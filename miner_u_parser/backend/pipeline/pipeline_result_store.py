@@ -0,0 +1,134 @@
+import json
+import os
+import struct
+from collections.abc import Sequence
+
+from miner_u_parser.backend.pipeline.page_detections import PageDetections
+
+# 文件格式：MAGIC | 逐页的zstd(json) | zstd(json索引) | 索引偏移和长度 | MAGIC
+# 每页单独压缩，读取时只解码用到的页
+MAGIC = b"MNRUPGS1"
+FOOTER = struct.Struct("<QQ")
+ZSTD_LEVEL = 3
+
+MODEL_JSON_SUFFIX = "_model.mjz"
+MIDDLE_JSON_SUFFIX = "_middle.mjz"
+
+
+def result_dump_enabled() -> bool:
+    """MINERU_DUMP_RESULTS=true时在markdown旁保存model json和middle json，可用于调试和重新生成markdown"""
+    return os.getenv("MINERU_DUMP_RESULTS", "false").lower() == "true"
+
+
+def _default(obj):
+    if isinstance(obj, PageDetections):
+        return obj.to_dicts()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _encode(obj) -> bytes:
+    import orjson
+
+    try:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    except TypeError:
+        # orjson不接受孤立的代理字符(部分pdf的文本层中存在)，退回标准库并转义
+        return json.dumps(obj, default=_default).encode("ascii")
+
+
+def _decode(data: bytes):
+    import orjson
+
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def encode_pages(pages, meta: dict = None) -> bytes:
+    """将逐页的数据和文档级的meta编码为可按页读取的压缩格式"""
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    chunks = [MAGIC]
+    offset = len(MAGIC)
+    page_offsets = []
+    for page in pages:
+        blob = compressor.compress(_encode(page))
+        chunks.append(blob)
+        page_offsets.append((offset, len(blob)))
+        offset += len(blob)
+    index = compressor.compress(_encode({"meta": meta or {}, "pages": page_offsets}))
+    chunks.append(index)
+    chunks.append(FOOTER.pack(offset, len(index)))
+    chunks.append(MAGIC)
+    return b"".join(chunks)
+
+
+class PageStore(Sequence):
+    """按页延迟解码encode_pages生成的数据，source为文件路径或bytes。
+
+    文件只在打开时读取索引，访问某一页时才读取并解码该页，每次访问返回新解码的对象。
+    """
+
+    def __init__(self, source):
+        import zstandard
+
+        self._decompressor = zstandard.ZstdDecompressor()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._path = None
+            self._data = memoryview(source)
+            size = len(self._data)
+        else:
+            self._path = str(source)
+            self._data = None
+            size = os.path.getsize(self._path)
+
+        tail_size = FOOTER.size + len(MAGIC)
+        if size < len(MAGIC) + tail_size or self._read(0, len(MAGIC)) != MAGIC:
+            raise ValueError(f"not a page store: {source if self._path else 'bytes'}")
+        tail = self._read(size - tail_size, tail_size)
+        if tail[FOOTER.size:] != MAGIC:
+            raise ValueError(f"truncated page store: {source if self._path else 'bytes'}")
+        index_offset, index_length = FOOTER.unpack(tail[: FOOTER.size])
+        index = self._load(index_offset, index_length)
+        self.meta = index["meta"]
+        self._pages = index["pages"]
+
+    def _read(self, offset, length) -> bytes:
+        if self._data is not None:
+            return bytes(self._data[offset : offset + length])
+        with open(self._path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _load(self, offset, length):
+        return _decode(self._decompressor.decompress(self._read(offset, length)))
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        offset, length = self._pages[index]
+        return self._load(offset, length)
+
+
+def dump_model_json(model_list) -> bytes:
+    return encode_pages(model_list)
+
+
+def dump_middle_json(middle_json) -> bytes:
+    meta = {key: value for key, value in middle_json.items() if key != "pdf_info"}
+    return encode_pages(middle_json["pdf_info"], meta)
+
+
+def load_model_json(source) -> PageStore:
+    return PageStore(source)
+
+
+def load_middle_json(source) -> dict:
+    """middle json的pdf_info为按页延迟解码的PageStore，可以直接传给union_make"""
+    store = PageStore(source)
+    return {"pdf_info": store, **store.meta}
@@ -0,0 +1,154 @@
+import threading
+from collections import Counter
+
+import numpy as np
+from loguru import logger
+
+from .model_list import AtomicModel
+
+# 分类置信度不低于该值的无线表格只走无线模型(两种策略一致)
+WIRELESS_EXIT_SCORE = 0.9
+# early_exit策略下，分类为有线且置信度和线密度都足够高时只走有线模型
+WIRED_EXIT_SCORE = 0.9
+WIRED_MIN_LINE_DENSITY = 0.01
+# early_exit策略下，低置信度的无线表格若几乎没有竖线/横线，只走无线模型
+WIRELESS_MAX_LINE_DENSITY = 0.002
+# 计算线密度前将图像长边缩放到该尺寸以内
+LINE_DENSITY_MAX_SIDE = 1024
+
+ROUTE_WIRELESS = "wireless"
+ROUTE_WIRED = "wired"
+ROUTE_DUAL = "dual"
+# 每种路由需要调用的表格结构模型次数
+ROUTE_INVOCATIONS = {ROUTE_WIRELESS: 1, ROUTE_WIRED: 1, ROUTE_DUAL: 2}
+
+
+def compute_line_density(img, max_side=LINE_DENSITY_MAX_SIDE) -> float:
+    """估计表格框线密度。
+
+    分别用横向和纵向的长条核做开运算提取横线和竖线，返回两个方向中较稀疏一侧的
+    线像素占比；三线表等只有横线的表格结果接近0。
+    """
+    import cv2
+
+    img = np.asarray(img)
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) if img.ndim == 3 else img
+    h, w = gray.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        gray = cv2.resize(
+            gray,
+            (max(round(w * scale), 1), max(round(h * scale), 1)),
+            interpolation=cv2.INTER_AREA,
+        )
+        h, w = gray.shape[:2]
+    binary = cv2.adaptiveThreshold(
+        cv2.bitwise_not(gray), 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 15, -2
+    )
+    horizontal = cv2.morphologyEx(
+        binary,
+        cv2.MORPH_OPEN,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 20, 1), 1)),
+    )
+    vertical = cv2.morphologyEx(
+        binary,
+        cv2.MORPH_OPEN,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 20, 1))),
+    )
+    area = float(h * w)
+    return min(cv2.countNonZero(horizontal), cv2.countNonZero(vertical)) / area
+
+
+def route_table(table_res_dict, policy="dual") -> str:
+    """根据分类结果(和early_exit策略下的线密度)决定表格需要跑哪些结构模型"""
+    table_res = table_res_dict["table_res"]
+    cls_label = table_res.get("cls_label", AtomicModel.WirelessTable)
+    cls_score = table_res.get("cls_score", 0.0)
+
+    if cls_label == AtomicModel.WirelessTable and cls_score >= WIRELESS_EXIT_SCORE:
+        return ROUTE_WIRELESS
+    if policy != "early_exit":
+        return ROUTE_DUAL
+
+    line_density = compute_line_density(table_res_dict["wired_table_img"])
+    table_res_dict["line_density"] = line_density
+    if (
+        cls_label == AtomicModel.WiredTable
+        and cls_score >= WIRED_EXIT_SCORE
+        and line_density >= WIRED_MIN_LINE_DENSITY
+    ):
+        return ROUTE_WIRED
+    if (
+        cls_label == AtomicModel.WirelessTable
+        and line_density <= WIRELESS_MAX_LINE_DENSITY
+    ):
+        return ROUTE_WIRELESS
+    return ROUTE_DUAL
+
+
+class TableRouteStats:
+    """统计表格路由结果和结构模型调用次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_summary = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset_locked()
+
+    def _reset_locked(self):
+        self.routes = Counter()
+        self.fallbacks = 0
+
+    def record(self, routes, fallbacks=0):
+        with self._lock:
+            self.routes.update(routes)
+            self.fallbacks += fallbacks
+
+    @property
+    def table_count(self) -> int:
+        return sum(self.routes.values())
+
+    @property
+    def invocations(self) -> int:
+        return (
+            sum(ROUTE_INVOCATIONS[route] * n for route, n in self.routes.items())
+            + self.fallbacks
+        )
+
+    def _summary_locked(self) -> dict:
+        table_count = self.table_count
+        return {
+            "tables": table_count,
+            "routes": dict(self.routes),
+            "fallbacks": self.fallbacks,
+            "invocations": self.invocations,
+            "invocations_per_table": (
+                self.invocations / table_count if table_count else 0.0
+            ),
+        }
+
+    def summary(self) -> dict:
+        with self._lock:
+            return self._summary_locked()
+
+    def log(self, reset=True) -> dict:
+        """输出本轮统计并返回快照，reset时在同一把锁内清零，快照保存在last_summary"""
+        with self._lock:
+            summary = self._summary_locked()
+            # 统计按每次doc_analyze输出，长期运行的进程中不跨文档累计
+            if reset:
+                self._reset_locked()
+            self.last_summary = summary
+        if summary["tables"]:
+            logger.info(
+                f"table routing: {summary['tables']} tables, routes {summary['routes']}, "
+                f"{summary['fallbacks']} wired->wireless fallbacks, "
+                f"{summary['invocations_per_table']:.2f} structure model invocations per table"
+            )
+        return summary
+
+
+table_route_stats = TableRouteStats()
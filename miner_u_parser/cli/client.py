@@ -6,7 +6,15 @@ from loguru import logger
 from miner_u_parser.utils.config_reader import get_device
 from miner_u_parser.utils.guess_suffix_or_lang import guess_suffix_by_path
 from miner_u_parser.utils.model_utils import get_vram
-from .common import aio_do_parse, read_fn, pdf_suffixes, image_suffixes
+from .common import (
+    aio_do_parse,
+    remake_markdown,
+    read_fn,
+    read_urls_fn,
+    is_url,
+    pdf_suffixes,
+    image_suffixes,
+)
 
 
 class PDFConverter:
@@ -65,15 +73,18 @@ class PDFConverter:
         os.makedirs(output_dir, exist_ok=True)
 
         # Determine list of files to process
-        path_obj = Path(input_path)
         doc_path_list = []
 
-        if path_obj.is_dir():
-            for doc_path in path_obj.glob("*"):
+        if isinstance(input_path, (list, tuple)):
+            doc_path_list.extend(input_path)
+        elif is_url(input_path):
+            doc_path_list.append(input_path)
+        elif Path(input_path).is_dir():
+            for doc_path in Path(input_path).glob("*"):
                 if guess_suffix_by_path(doc_path) in pdf_suffixes + image_suffixes:
                     doc_path_list.append(doc_path)
         else:
-            doc_path_list.append(path_obj)
+            doc_path_list.append(Path(input_path))
 
         if not doc_path_list:
             logger.warning(f"No valid files found at {input_path}")
@@ -82,6 +93,16 @@ class PDFConverter:
         # Run the async process
         asyncio.run(self._process_batch(doc_path_list, output_dir))
 
+    def remake(self, middle_json_path, output_md_path=None):
+        """
+        Regenerate markdown from a middle json saved with MINERU_DUMP_RESULTS=true,
+        without parsing the document again or loading any model.
+        Returns the path of the written markdown file.
+        """
+        output_md_path = remake_markdown(middle_json_path, output_md_path)
+        logger.info(f"Remade markdown to {output_md_path}")
+        return output_md_path
+
     async def _process_batch(self, path_list: list[Path], output_dir):
         """Internal async worker to handle the parsing logic."""
         try:
@@ -89,14 +110,25 @@ class PDFConverter:
             pdf_bytes_list = []
             lang_list = []
 
+            # Remote files are downloaded concurrently over pooled connections,
+            # the downloads run in the background while local files are read
+            url_list = [path for path in path_list if is_url(path)]
+            remote_docs = read_urls_fn(url_list) if url_list else iter(())
+
             for path in path_list:
-                file_name = str(Path(path).stem)
-                pdf_bytes = read_fn(path)
+                if is_url(path):
+                    # read_urls_fn yields in input order
+                    url, pdf_bytes = next(remote_docs)
+                    file_name = str(Path(url.split("?", 1)[0]).stem)
+                else:
+                    file_name = str(Path(path).stem)
+                    pdf_bytes = read_fn(path)
 
                 file_name_list.append(file_name)
                 pdf_bytes_list.append(pdf_bytes)
                 lang_list.append(self.lang)
 
+            # All documents are parsed as one batch so pages are batched across documents
             await aio_do_parse(
                 output_dir=output_dir,
                 pdf_file_names=file_name_list,
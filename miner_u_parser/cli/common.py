@@ -7,6 +7,7 @@ import pypdfium2 as pdfium
 from loguru import logger
 
 from miner_u_parser.data.data_reader_writer import FileBasedDataWriter
+from miner_u_parser.data.io import HttpReader
 from miner_u_parser.utils.guess_suffix_or_lang import guess_suffix_by_bytes
 from miner_u_parser.utils.pdf_image_tools import images_bytes_to_pdf_bytes
 
@@ -14,18 +15,48 @@ pdf_suffixes = ["pdf"]
 image_suffixes = ["png", "jpeg", "jp2", "webp", "gif", "bmp", "jpg"]
 
 
+_http_reader = None
+
+
+def get_http_reader():
+    """进程内共享一个带连接池的HttpReader，避免每个文件新建连接"""
+    global _http_reader
+    if _http_reader is None:
+        _http_reader = HttpReader(
+            pool_size=int(os.getenv("MINERU_HTTP_POOL_SIZE", 16)),
+            max_retries=int(os.getenv("MINERU_HTTP_MAX_RETRIES", 3)),
+        )
+    return _http_reader
+
+
+def is_url(path):
+    return str(path).startswith(("http://", "https://"))
+
+
+def to_pdf_bytes(file_bytes, path=None):
+    file_suffix = guess_suffix_by_bytes(file_bytes, path)
+    if file_suffix in image_suffixes:
+        return images_bytes_to_pdf_bytes(file_bytes)
+    elif file_suffix in pdf_suffixes:
+        return file_bytes
+    else:
+        raise Exception(f"Unknown file suffix: {file_suffix}")
+
+
 def read_fn(path):
+    if is_url(path):
+        return to_pdf_bytes(get_http_reader().read(str(path)), str(path))
     if not isinstance(path, Path):
         path = Path(path)
     with open(str(path), "rb") as input_file:
         file_bytes = input_file.read()
-        file_suffix = guess_suffix_by_bytes(file_bytes, path)
-        if file_suffix in image_suffixes:
-            return images_bytes_to_pdf_bytes(file_bytes)
-        elif file_suffix in pdf_suffixes:
-            return file_bytes
-        else:
-            raise Exception(f"Unknown file suffix: {file_suffix}")
+        return to_pdf_bytes(file_bytes, path)
+
+
+def read_urls_fn(urls, max_workers=None):
+    """并发下载远程文件，调用时即开始下载，按输入顺序逐个产出(url, pdf_bytes)"""
+    results = get_http_reader().read_many(urls, max_workers=max_workers)
+    return ((url, to_pdf_bytes(file_bytes, url)) for url, file_bytes in results)
 
 
 def prepare_env(output_dir, pdf_file_name, parse_method):
@@ -92,15 +123,15 @@ def _process_output(
     md_writer,
 ):
     from miner_u_parser.backend.pipeline.pipeline_middle_json_mkcontent import (
-        union_make as pipeline_union_make,
+        iter_union_make as pipeline_iter_union_make,
     )
 
     image_dir = str(os.path.basename(local_image_dir))
 
-    md_content_str = pipeline_union_make(pdf_info, image_dir)
-    md_writer.write_string(
+    # 逐页写入markdown，不在内存中拼接整个文档
+    md_writer.write_string_stream(
         f"{pdf_file_name}.md",
-        md_content_str,
+        pipeline_iter_union_make(pdf_info, image_dir),
     )
     logger.info(f"local output dir is {local_md_dir}")
 
@@ -121,6 +152,13 @@ def _process_pipeline(
     from miner_u_parser.backend.pipeline.pipeline_analyze import (
         doc_analyze as pipeline_doc_analyze,
     )
+    from miner_u_parser.backend.pipeline.pipeline_result_store import (
+        MIDDLE_JSON_SUFFIX,
+        MODEL_JSON_SUFFIX,
+        dump_middle_json,
+        dump_model_json,
+        result_dump_enabled,
+    )
 
     infer_results, all_image_lists, all_pdf_docs, lang_list, ocr_enabled_list = (
         pipeline_doc_analyze(
@@ -132,6 +170,7 @@ def _process_pipeline(
         )
     )
 
+    dump_results = result_dump_enabled()
     for idx, model_list in enumerate(infer_results):
 
         pdf_file_name = pdf_file_names[idx]
@@ -147,6 +186,12 @@ def _process_pipeline(
         _lang = lang_list[idx]
         _ocr_enable = ocr_enabled_list[idx]
 
+        # model json在构建middle json前保存，构建过程会修改其中的数据
+        if dump_results:
+            md_writer.write(
+                f"{pdf_file_name}{MODEL_JSON_SUFFIX}", dump_model_json(model_list)
+            )
+
         middle_json = pipeline_result_to_middle_json(
             model_list,
             images_list,
@@ -156,6 +201,10 @@ def _process_pipeline(
             _ocr_enable,
             p_formula_enable,
         )
+        if dump_results:
+            md_writer.write(
+                f"{pdf_file_name}{MIDDLE_JSON_SUFFIX}", dump_middle_json(middle_json)
+            )
 
         pdf_info = middle_json["pdf_info"]
         _process_output(
@@ -167,6 +216,31 @@ def _process_pipeline(
         )
 
 
+def remake_markdown(middle_json_path, output_md_path=None, img_buket_path="images"):
+    """由MINERU_DUMP_RESULTS保存的middle json重新生成markdown，不需要加载模型"""
+    from miner_u_parser.backend.pipeline.pipeline_middle_json_mkcontent import (
+        iter_union_make as pipeline_iter_union_make,
+    )
+    from miner_u_parser.backend.pipeline.pipeline_result_store import (
+        MIDDLE_JSON_SUFFIX,
+        load_middle_json,
+    )
+
+    middle_json_path = str(middle_json_path)
+    if output_md_path is None:
+        base_path = middle_json_path
+        if base_path.endswith(MIDDLE_JSON_SUFFIX):
+            base_path = base_path[: -len(MIDDLE_JSON_SUFFIX)]
+        output_md_path = f"{base_path}.md"
+
+    middle_json = load_middle_json(middle_json_path)
+    FileBasedDataWriter().write_string_stream(
+        output_md_path,
+        pipeline_iter_union_make(middle_json["pdf_info"], img_buket_path),
+    )
+    return output_md_path
+
+
 async def aio_do_parse(
     output_dir,
     pdf_file_names: list[str],
@@ -1,5 +1,6 @@
 
 from abc import ABC, abstractmethod
+from typing import Iterable
 
 
 class DataReader(ABC):
@@ -61,3 +62,16 @@ class DataWriter(ABC):
             if flag:
                 self.write(path, bit_data)
                 break
+
+    def write_string_stream(self, path: str, chunks: Iterable[str]) -> None:
+        """Write a sequence of string chunks to one file, the result is the same as
+        write_string with the concatenated string.
+
+        Subclasses that can append to an open file should override this to avoid
+        holding the whole content in memory.
+
+        Args:
+            path (str): the target file where to write
+            chunks (Iterable[str]): the string chunks in order
+        """
+        self.write_string(path, "".join(chunks))
@@ -9,3 +9,7 @@ class DummyDataWriter(DataWriter):
     def write_string(self, path: str, data: str) -> None:
         """Dummy write_string method that does nothing."""
         pass
+
+    def write_string_stream(self, path: str, chunks) -> None:
+        """Dummy write_string_stream method that does nothing."""
+        pass
@@ -51,12 +51,28 @@ class FileBasedDataWriter(DataWriter):
             path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
             data (bytes): the data want to write
         """
+        fn_path = self._prepare_path(path)
+        with open(fn_path, 'wb') as f:
+            f.write(data)
+
+    def write_string_stream(self, path: str, chunks) -> None:
+        """Write string chunks to the file one by one through a buffered file
+        handle, the output is byte-identical to write_string.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+            chunks (Iterable[str]): the string chunks in order
+        """
+        fn_path = self._prepare_path(path)
+        with open(fn_path, 'wb', buffering=1024 * 1024) as f:
+            for chunk in chunks:
+                f.write(chunk.encode(encoding='utf-8', errors='replace'))
+
+    def _prepare_path(self, path: str) -> str:
         fn_path = path
         if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
             fn_path = os.path.join(self._parent_dir, path)
 
         if not os.path.exists(os.path.dirname(fn_path)) and os.path.dirname(fn_path) != "":
             os.makedirs(os.path.dirname(fn_path), exist_ok=True)
-
-        with open(fn_path, 'wb') as f:
-            f.write(data)
+        return fn_path
@@ -1,11 +1,80 @@
 import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .base import IOReader, IOWriter
 
+DEFAULT_POOL_SIZE = 16
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_TIMEOUT = (10, 60)
+RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
 
-class HttpReader(IOReader):
+
+def _build_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+    """Build a keep-alive session whose connection pool and retry policy are
+    shared by every request issued through it.
+
+    Only idempotent methods are retried automatically, a failed upload is
+    surfaced to the caller instead of being sent twice."""
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_FORCELIST,
+        allowed_methods=frozenset(["HEAD", "GET", "PUT"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class _PooledHttpClient:
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        """Initialized with the connection pool and retry settings.
+
+        Args:
+            pool_size (int, optional): the number of keep-alive connections kept per host,
+                also the default concurrency of the batch helpers. Defaults to 16.
+            max_retries (int, optional): retries on connection errors and 429/5xx responses. Defaults to 3.
+            backoff_factor (float, optional): exponential backoff factor between retries. Defaults to 0.5.
+            timeout (tuple, optional): (connect, read) timeout in seconds. Defaults to (10, 60).
+        """
+        self._pool_size = pool_size
+        self._timeout = timeout
+        # urllib3 connection pools are thread safe, so a single session with a
+        # pool sized for the batch helpers is shared by every worker thread.
+        self.session = _build_session(pool_size, max_retries, backoff_factor)
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HttpReader(_PooledHttpClient, IOReader):
 
     def read(self, url: str) -> bytes:
         """Read the file.
@@ -16,14 +85,67 @@ class HttpReader(IOReader):
         Returns:
             bytes: the content of the file
         """
-        return requests.get(url).content
+        return self.read_at(url)
 
     def read_at(self, path: str, offset: int = 0, limit: int = -1) -> bytes:
-        """Not Implemented."""
-        raise NotImplementedError
+        """Read at offset and limit with a HTTP range request.
+
+        Args:
+            path (str): the url of the file
+            offset (int, optional): the number of bytes skipped. Defaults to 0.
+            limit (int, optional): the length of bytes want to read. Defaults to -1.
+
+        Returns:
+            bytes: the content of file
+        """
+        if limit == 0:
+            return b""
+        headers = {}
+        if offset > 0 or limit > 0:
+            end = "" if limit < 0 else str(offset + limit - 1)
+            headers["Range"] = f"bytes={offset}-{end}"
+
+        response = self.session.get(url=path, headers=headers, timeout=self._timeout)
+        response.raise_for_status()
+        data = response.content
+        if headers and response.status_code != 206:
+            # server ignored the Range header and sent the whole body
+            data = data[offset:] if limit < 0 else data[offset : offset + limit]
+        return data
+
+    def read_many(self, urls: Iterable[str], max_workers: int = None) -> Iterator[Tuple[str, bytes]]:
+        """Download several files concurrently over the pooled connections.
+
+        The downloads start when this method is called. Results are yielded in
+        input order as soon as they are available, so the consumer can start
+        parsing the first document while the rest are still downloading.
+
+        Args:
+            urls (Iterable[str]): the urls to download
+            max_workers (int, optional): the number of concurrent downloads. Defaults to the pool size.
+
+        Returns:
+            Iterator[Tuple[str, bytes]]: the url and its content
+        """
+        urls = list(urls)
+        executor = ThreadPoolExecutor(max_workers=max_workers or self._pool_size)
+        futures = [executor.submit(self.read, url) for url in urls]
+        # worker threads exit once the submitted downloads are done
+        executor.shutdown(wait=False)
+        return self._iter_results(urls, futures)
+
+    @staticmethod
+    def _iter_results(urls, futures):
+        try:
+            for url, future in zip(urls, futures):
+                yield url, future.result()
+        finally:
+            # the consumer stopped early or a download failed
+            for future in futures:
+                future.cancel()
 
 
-class HttpWriter(IOWriter):
+class HttpWriter(_PooledHttpClient, IOWriter):
     def write(self, url: str, data: bytes) -> None:
         """Write file with data.
 
@@ -32,5 +154,5 @@ class HttpWriter(IOWriter):
             data (bytes): the data want to write
         """
         files = {"file": io.BytesIO(data)}
-        response = requests.post(url, files=files)
+        response = self.session.post(url, files=files, timeout=self._timeout)
         assert 300 > response.status_code and response.status_code > 199
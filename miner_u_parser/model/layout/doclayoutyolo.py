@@ -5,6 +5,9 @@ from tqdm import tqdm
 import numpy as np
 from PIL import Image, ImageDraw
 
+from miner_u_parser.utils.cpu_profile import use_channels_last
+from miner_u_parser.utils.model_utils import group_batches_by_size
+
 
 class DocLayoutYOLOModel:
     def __init__(
@@ -12,10 +15,12 @@ class DocLayoutYOLOModel:
         weight: str,
         device: str = "cuda",
         imgsz: int = 1280,
-        conf: float = 0.1,
+        # 与此前流水线按batch size 1推理时实际使用的阈值(0.9*0.1)一致，不再随batch size变化
+        conf: float = 0.09,
         iou: float = 0.45,
     ):
         self.model = YOLOv10(weight).to(device)
+        use_channels_last(self.model.model, device)
         self.device = device
         self.imgsz = imgsz
         self.conf = conf
@@ -53,23 +58,20 @@ class DocLayoutYOLOModel:
     def batch_predict(
         self, images: List[Union[np.ndarray, Image.Image]], batch_size: int = 4
     ) -> List[List[Dict]]:
-        results = []
+        results = [None] * len(images)
         with tqdm(total=len(images), desc="Layout Predict") as pbar:
-            for idx in range(0, len(images), batch_size):
-                batch = images[idx : idx + batch_size]
-                if batch_size == 1:
-                    conf = 0.9 * self.conf
-                else:
-                    conf = self.conf
+            # 同尺寸的图片组成batch，结果与batch size无关
+            for indices in group_batches_by_size(images, batch_size):
+                batch = [images[i] for i in indices]
                 predictions = self.model.predict(
                     batch,
                     imgsz=self.imgsz,
-                    conf=conf,
+                    conf=self.conf,
                     iou=self.iou,
                     verbose=False,
                 )
-                for pred in predictions:
-                    results.append(self._parse_prediction(pred))
+                for i, pred in zip(indices, predictions):
+                    results[i] = self._parse_prediction(pred)
                 pbar.update(len(batch))
         return results
 
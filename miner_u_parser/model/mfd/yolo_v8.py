@@ -5,7 +5,9 @@ from ultralytics import YOLO
 import numpy as np
 from PIL import Image, ImageDraw
 
+from miner_u_parser.utils.cpu_profile import use_channels_last
 from miner_u_parser.utils.enum_class import ModelPath
+from miner_u_parser.utils.model_utils import group_batches_by_size
 from miner_u_parser.utils.models_download_utils import (
     auto_download_and_get_model_root_path,
 )
@@ -21,6 +23,7 @@ class YOLOv8MFDModel:
         iou: float = 0.45,
     ):
         self.model = YOLO(weight).to(device)
+        use_channels_last(self.model.model, device)
         self.device = device
         self.imgsz = imgsz
         self.conf = conf
@@ -45,12 +48,14 @@ class YOLOv8MFDModel:
     def batch_predict(
         self, images: List[Union[np.ndarray, Image.Image]], batch_size: int = 4
     ) -> List:
-        results = []
+        results = [None] * len(images)
         with tqdm(total=len(images), desc="MFD Predict") as pbar:
-            for idx in range(0, len(images), batch_size):
-                batch = images[idx : idx + batch_size]
+            # 同尺寸的图片组成batch，结果与batch size无关
+            for indices in group_batches_by_size(images, batch_size):
+                batch = [images[i] for i in indices]
                 batch_preds = self._run_predict(batch, is_batch=True)
-                results.extend(batch_preds)
+                for i, pred in zip(indices, batch_preds):
+                    results[i] = pred
                 pbar.update(len(batch))
         return results
 
@@ -1,7 +1,15 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import torch
-from torch.utils.data import DataLoader, Dataset
+from loguru import logger
+from torch.utils.data import Dataset
 from tqdm import tqdm
 
+from miner_u_parser.utils.cpu_profile import int8_active, quantize_linear_int8
+from miner_u_parser.utils.result_cache import get_result_cache, hash_array
+
 
 class MathDataset(Dataset):
     def __init__(self, image_paths, transform=None):
@@ -18,6 +26,85 @@ class MathDataset(Dataset):
             return image
 
 
+def get_formula_cache():
+    """公式识别结果缓存，key为裁边、缩放、padding后的公式图片hash。
+
+    MINERU_MFR_CACHE_SIZE控制内存中的条目数(默认10000，0为禁用)，
+    设置MINERU_MFR_CACHE_PATH时额外持久化到该sqlite文件，跨进程/跨文档复用。
+    """
+    return get_result_cache(
+        "formula",
+        int(os.getenv("MINERU_MFR_CACHE_SIZE", 10000)),
+        os.getenv("MINERU_MFR_CACHE_PATH"),
+    )
+
+
+def get_preprocess_workers() -> int:
+    """公式图片预处理线程数，可通过环境变量MINERU_MFR_PREPROCESS_WORKERS设置"""
+    workers = os.getenv("MINERU_MFR_PREPROCESS_WORKERS")
+    if workers is not None:
+        return max(1, int(workers))
+    return min(4, os.cpu_count() or 1)
+
+
+class FormulaPreprocessor:
+    """在线程池中预处理公式截图，并在模型解码当前batch时预取下一个batch。
+
+    crop_margin、resize、copyMakeBorder和normalize主要在cv2/numpy中执行，会释放GIL，
+    线程池即可并行，无需进程间拷贝图片。
+    """
+
+    def __init__(self, transform, num_workers=None):
+        self.transform = transform
+        self.num_workers = num_workers or get_preprocess_workers()
+        self.reset_timing()
+
+    def reset_timing(self):
+        self.preprocess_time = 0.0
+        self.wait_time = 0.0
+
+    def _preprocess_batch(self, executor, transform, images):
+        tensors = list(executor.map(transform, images))
+        return torch.stack(tensors)
+
+    def _run_stage(self, stage, executor, images):
+        start = time.perf_counter()
+        result = stage(executor, images)
+        return result, time.perf_counter() - start
+
+    def iter_prefetched(self, images, batch_size, stage):
+        """按batch_size切分images，依次产出stage(executor, batch_images)的结果，
+        产出当前结果前已提交下一个batch的stage，使其与当前batch的解码并行"""
+        if not images:
+            return
+        batches = [images[i : i + batch_size] for i in range(0, len(images), batch_size)]
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            # 单独的调度线程按顺序执行各batch的stage
+            with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                future = prefetcher.submit(self._run_stage, stage, executor, batches[0])
+                for next_images in batches[1:] + [None]:
+                    start = time.perf_counter()
+                    result, cost = future.result()
+                    self.wait_time += time.perf_counter() - start
+                    self.preprocess_time += cost
+                    if next_images is not None:
+                        future = prefetcher.submit(
+                            self._run_stage, stage, executor, next_images
+                        )
+                    yield result
+
+    def iter_batches(self, images, batch_size, transform=None):
+        """按顺序产出预处理好的batch，产出当前batch前已提交下一个batch的预处理"""
+        transform = transform or self.transform
+        yield from self.iter_prefetched(
+            images,
+            batch_size,
+            lambda executor, batch_images: self._preprocess_batch(
+                executor, transform, batch_images
+            ),
+        )
+
+
 class UnimernetModel(object):
     def __init__(self, weight_dir, _device_="cpu"):
         from .unimernet_hf import UnimernetModel
@@ -30,6 +117,16 @@ class UnimernetModel(object):
         if not _device_.startswith("cpu"):
             self.model = self.model.to(dtype=torch.float16)
         self.model.eval()
+        # cpu上可选对decoder做int8动态量化，量化后的结果单独缓存
+        self.model.decoder = quantize_linear_int8(self.model.decoder, _device_)
+        # 缓存key包含模型权重和精度，更换权重后不会命中旧模型的结果
+        self.cache_namespace = (
+            f"{os.path.basename(os.path.normpath(str(weight_dir)))}|{self.model.dtype}"
+        )
+        if int8_active(_device_):
+            self.cache_namespace += "|int8"
+        self.preprocessor = FormulaPreprocessor(self.model.transform)
+        self.cache = get_formula_cache()
 
     def predict(self, mfd_res, image):
         formula_list = []
@@ -48,10 +145,8 @@ class UnimernetModel(object):
             bbox_img = image[ymin:ymax, xmin:xmax]
             mf_image_list.append(bbox_img)
 
-        dataset = MathDataset(mf_image_list, transform=self.model.transform)
-        dataloader = DataLoader(dataset, batch_size=32, num_workers=0)
         mfr_res = []
-        for mf_img in dataloader:
+        for mf_img in self.preprocessor.iter_batches(mf_image_list, batch_size=32):
             mf_img = mf_img.to(dtype=self.model.dtype)
             mf_img = mf_img.to(self.device)
             with torch.no_grad():
@@ -61,6 +156,11 @@ class UnimernetModel(object):
             res["latex"] = latex
         return formula_list
 
+    def cache_key(self, prepared_image):
+        if prepared_image is None:
+            return None
+        return hash_array(prepared_image, self.cache_namespace)
+
     def batch_predict(self, images_mfd_res: list, images: list, batch_size: int = 64) -> list:
         images_formula_list = []
         mf_image_list = []
@@ -102,29 +202,86 @@ class UnimernetModel(object):
         # Create mapping for results
         index_mapping = {new_idx: old_idx for new_idx, old_idx in enumerate(sorted_indices)}
 
-        # Create dataset with sorted images
-        dataset = MathDataset(sorted_images, transform=self.model.transform)
+        self.preprocessor.reset_timing()
+        transform = self.model.transform
+        # 已安排解码的key，只在按顺序执行的预取阶段中访问
+        scheduled_keys = set()
+
+        def prepare_batch(executor, batch_images):
+            """预取阶段：裁边、缩放和padding，得到的图片即模型看到的内容，用它的hash查询缓存；
+            未命中且之前未安排解码的公式再做normalize，同一文档中重复的公式只解码一次"""
+            prepared = list(executor.map(transform.prepare_input, batch_images))
+            keys = list(executor.map(self.cache_key, prepared))
+            cached = self.cache.get_many(keys) if self.cache else [None] * len(keys)
+            decode_indices = []
+            for i, (key, latex) in enumerate(zip(keys, cached)):
+                if latex is not None:
+                    continue
+                if key is None:
+                    # 预处理失败(key为None)的公式不参与去重
+                    decode_indices.append(i)
+                elif key not in scheduled_keys:
+                    scheduled_keys.add(key)
+                    decode_indices.append(i)
+            tensors = list(
+                executor.map(transform.normalize, [prepared[i] for i in decode_indices])
+            )
+            batch = torch.stack(tensors) if tensors else None
+            return keys, cached, decode_indices, batch
 
         # 如果batch_size > len(sorted_images)，则设置为不超过len(sorted_images)的2的幂
         batch_size = min(batch_size, max(1, 2 ** (len(sorted_images).bit_length() - 1))) if sorted_images else 1
 
-        dataloader = DataLoader(dataset, batch_size=batch_size, num_workers=0)
-
-        # Process batches and store results
-        mfr_res = []
-        # for mf_img in dataloader:
+        # Process batches and store results, the next batch is prepared while the current one decodes
+        mfr_res = [None] * len(sorted_images)
+        all_keys = []
+        results_by_key = {}
+        new_entries = []
+        decode_count = 0
+        decode_time = 0.0
 
         with tqdm(total=len(sorted_images), desc="MFR Predict") as pbar:
-            for index, mf_img in enumerate(dataloader):
-                mf_img = mf_img.to(dtype=self.model.dtype)
-                mf_img = mf_img.to(self.device)
-                with torch.no_grad():
-                    output = self.model.generate({"image": mf_img}, batch_size=batch_size)
-                mfr_res.extend(output["fixed_str"])
-
-                # 更新进度条，每次增加batch_size，但要注意最后一个batch可能不足batch_size
-                current_batch_size = min(batch_size, len(sorted_images) - index * batch_size)
-                pbar.update(current_batch_size)
+            for keys, cached, decode_indices, mf_img in self.preprocessor.iter_prefetched(
+                sorted_images, batch_size, prepare_batch
+            ):
+                offset = len(all_keys)
+                all_keys.extend(keys)
+                for i, (key, latex) in enumerate(zip(keys, cached)):
+                    if latex is not None:
+                        mfr_res[offset + i] = latex
+                        results_by_key[key] = latex
+
+                if mf_img is not None:
+                    decode_start = time.perf_counter()
+                    mf_img = mf_img.to(dtype=self.model.dtype)
+                    mf_img = mf_img.to(self.device)
+                    with torch.no_grad():
+                        output = self.model.generate({"image": mf_img}, batch_size=batch_size)
+                    decode_time += time.perf_counter() - decode_start
+                    decode_count += len(decode_indices)
+                    for i, latex in zip(decode_indices, output["fixed_str"]):
+                        mfr_res[offset + i] = latex
+                        key = keys[i]
+                        if key is not None:
+                            results_by_key[key] = latex
+                            new_entries.append((key, latex))
+
+                pbar.update(len(keys))
+
+        # 与之前出现过的公式重复的位置直接使用其结果
+        for i, key in enumerate(all_keys):
+            if mfr_res[i] is None:
+                mfr_res[i] = results_by_key[key]
+        if self.cache:
+            self.cache.put_many(new_entries)
+
+        if sorted_images:
+            logger.debug(
+                f"MFR {len(sorted_images)} formulas, {decode_count} decoded: "
+                f"preprocess {self.preprocessor.preprocess_time:.2f}s "
+                f"({self.preprocessor.wait_time:.2f}s not overlapped with decode), "
+                f"decode {decode_time:.2f}s"
+            )
 
         # Restore original order
         unsorted_results = [""] * len(mfr_res)
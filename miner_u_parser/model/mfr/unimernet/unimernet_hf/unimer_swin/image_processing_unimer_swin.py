@@ -27,6 +27,10 @@ class UnimerSwinImageProcessor(BaseImageProcessor):
 
     def __call__(self, item):
         image = self.prepare_input(item)
+        return self.normalize(image)
+
+    def normalize(self, image):
+        """Normalize an image returned by prepare_input into the model input tensor"""
         return self.transform(image=image)['image'][:1]
 
     @staticmethod
@@ -1,7 +1,9 @@
 # Copyright (c) Opendatalab. All rights reserved.
 import copy
 import os
+import threading
 import warnings
+import weakref
 from pathlib import Path
 
 import cv2
@@ -22,6 +24,8 @@ from miner_u_parser.utils.ocr_utils import (
     update_det_boxes,
     get_rotate_crop_image,
 )
+from miner_u_parser.utils.cpu_profile import int8_active
+from miner_u_parser.utils.result_cache import get_result_cache, hash_array
 from .tools.infer.predict_system import TextSystem
 from .tools.infer import pytorchocr_utility as utility
 import argparse
@@ -119,6 +123,89 @@ def get_model_params(lang, config):
 root_dir = Path(__file__).resolve().parent
 
 
+def get_ocr_lang(lang, device):
+    """将用户传入的语言映射为models_config.yml中的模型语言"""
+    if device == "cpu" and lang in ["ch", "ch_server", "japan", "chinese_cht"]:
+        # logger.warning("The current device in use is CPU. To ensure the speed of parsing, the language is automatically switched to ch_lite.")
+        lang = "ch_lite"
+
+    if lang in latin_lang:
+        lang = "latin"
+    elif lang in arabic_lang:
+        lang = "arabic"
+    elif lang in cyrillic_lang:
+        lang = "cyrillic"
+    elif lang in devanagari_lang:
+        lang = "devanagari"
+    elif lang in east_slavic_lang:
+        lang = "east_slavic"
+    return lang
+
+
+def get_ocr_model_relative_paths(lang, device):
+    """返回(det相对路径, rec相对路径, 字典文件名)"""
+    models_config_path = os.path.join(
+        root_dir, "pytorchocr", "utils", "resources", "models_config.yml"
+    )
+    with open(models_config_path) as file:
+        config = yaml.safe_load(file)
+        det, rec, dict_file = get_model_params(get_ocr_lang(lang, device), config)
+    ocr_models_dir = ModelPath.pytorch_paddle
+    return f"{ocr_models_dir}/{det}", f"{ocr_models_dir}/{rec}", dict_file
+
+# 同一语言的det/rec网络在不同后处理参数的OCR实例间共享，
+# 所有引用它的PytorchPaddleOCR释放后网络随之释放
+_shared_text_systems = weakref.WeakValueDictionary()
+_shared_text_systems_lock = threading.Lock()
+
+
+def get_shared_text_system(args):
+    key = (
+        args.det_model_path,
+        args.rec_model_path,
+        args.rec_char_dict_path,
+        args.rec_batch_num,
+        args.use_angle_cls,
+        str(args.device),
+    )
+    with _shared_text_systems_lock:
+        text_system = _shared_text_systems.get(key)
+        if text_system is None:
+            text_system = TextSystem(args)
+            _shared_text_systems[key] = text_system
+    return text_system
+
+
+# 识别结果缓存key使用的归一化高度，与rec模型输入高度一致
+REC_CACHE_NORM_HEIGHT = 48
+
+
+def get_ocr_rec_cache():
+    """文本行识别结果缓存，所有语言共用，key中包含rec模型以区分不同语言。
+
+    MINERU_OCR_REC_CACHE_SIZE控制内存中的条目数(默认20000，0为禁用)，
+    设置MINERU_OCR_REC_CACHE_PATH时额外持久化到该sqlite文件。
+    """
+    return get_result_cache(
+        "ocr_rec",
+        int(os.getenv("MINERU_OCR_REC_CACHE_SIZE", 20000)),
+        os.getenv("MINERU_OCR_REC_CACHE_PATH"),
+    )
+
+
+def get_rec_cache_key(img, namespace):
+    """将文本行截图转灰度并缩放到固定高度(宽度按比例取整)后计算hash"""
+    h, w = img.shape[:2]
+    if h == 0 or w == 0:
+        return None
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    width = max(1, round(w * REC_CACHE_NORM_HEIGHT / h))
+    normalized = cv2.resize(
+        gray, (width, REC_CACHE_NORM_HEIGHT), interpolation=cv2.INTER_AREA
+    )
+    return hash_array(normalized, namespace)
+
+
 class PytorchPaddleOCR(TextSystem):
     def __init__(self, *args, **kwargs):
         parser = utility.init_args()
@@ -128,36 +215,14 @@ class PytorchPaddleOCR(TextSystem):
         self.enable_merge_det_boxes = kwargs.get("enable_merge_det_boxes", True)
 
         device = get_device()
-        if device == "cpu" and self.lang in ["ch", "ch_server", "japan", "chinese_cht"]:
-            # logger.warning("The current device in use is CPU. To ensure the speed of parsing, the language is automatically switched to ch_lite.")
-            self.lang = "ch_lite"
-
-        if self.lang in latin_lang:
-            self.lang = "latin"
-        elif self.lang in arabic_lang:
-            self.lang = "arabic"
-        elif self.lang in cyrillic_lang:
-            self.lang = "cyrillic"
-        elif self.lang in devanagari_lang:
-            self.lang = "devanagari"
-        elif self.lang in east_slavic_lang:
-            self.lang = "east_slavic"
-        else:
-            pass
-
-        models_config_path = os.path.join(
-            root_dir, "pytorchocr", "utils", "resources", "models_config.yml"
+        det_model_path, rec_model_path, dict_file = get_ocr_model_relative_paths(
+            self.lang, device
         )
-        with open(models_config_path) as file:
-            config = yaml.safe_load(file)
-            det, rec, dict_file = get_model_params(self.lang, config)
-        ocr_models_dir = ModelPath.pytorch_paddle
+        self.lang = get_ocr_lang(self.lang, device)
 
-        det_model_path = f"{ocr_models_dir}/{det}"
         det_model_path = os.path.join(
             auto_download_and_get_model_root_path(det_model_path), det_model_path
         )
-        rec_model_path = f"{ocr_models_dir}/{rec}"
         rec_model_path = os.path.join(
             auto_download_and_get_model_root_path(rec_model_path), rec_model_path
         )
@@ -174,7 +239,21 @@ class PytorchPaddleOCR(TextSystem):
         default_args.update(kwargs)
         args = argparse.Namespace(**default_args)
 
-        super().__init__(args)
+        # 只持有共享网络的引用，检测后处理参数按当前实例的配置单独构建
+        self._shared_text_system = get_shared_text_system(args)
+        self.text_detector = self._shared_text_system.text_detector.with_postprocess(
+            args
+        )
+        self.text_recognizer = self._shared_text_system.text_recognizer
+        self.use_angle_cls = self._shared_text_system.use_angle_cls
+        if self.use_angle_cls:
+            self.text_classifier = self._shared_text_system.text_classifier
+        self.drop_score = args.drop_score
+        self.rec_cache = get_ocr_rec_cache()
+        self.rec_cache_namespace = f"{os.path.basename(rec_model_path)}|{dict_file}"
+        if int8_active(args.device):
+            # int8量化后的识别结果与fp32可能略有差异，分开缓存
+            self.rec_cache_namespace += "|int8"
 
     def ocr(
         self,
@@ -230,13 +309,49 @@ class PytorchPaddleOCR(TextSystem):
                     if not isinstance(img, list):
                         img = preprocess_image(img)
                         img = [img]
-                    rec_res, elapse = self.text_recognizer(
+                    rec_res = self.recognize_with_cache(
                         img, tqdm_enable=tqdm_enable, tqdm_desc=tqdm_desc
                     )
-                    # logger.debug("rec_res num  : {}, elapsed : {}".format(len(rec_res), elapse))
                     ocr_res.append(rec_res)
                 return ocr_res
 
+    def recognize_with_cache(
+        self, img_list, tqdm_enable=False, tqdm_desc="OCR-rec Predict"
+    ):
+        """识别文本行截图，完全相同(归一化后)的截图直接使用缓存结果，同一批中的重复截图只识别一次"""
+        if self.rec_cache is None:
+            rec_res, elapse = self.text_recognizer(
+                img_list, tqdm_enable=tqdm_enable, tqdm_desc=tqdm_desc
+            )
+            return rec_res
+
+        keys = [get_rec_cache_key(img, self.rec_cache_namespace) for img in img_list]
+        rec_res = self.rec_cache.get_many(keys)
+        rec_positions = {}
+        for i, (key, res) in enumerate(zip(keys, rec_res)):
+            if res is None:
+                rec_key = key if key is not None else ("uncached", i)
+                rec_positions.setdefault(rec_key, []).append(i)
+            else:
+                # 持久化层读出的是list
+                rec_res[i] = tuple(res)
+
+        if rec_positions:
+            rec_img_list = [img_list[positions[0]] for positions in rec_positions.values()]
+            new_rec_res, elapse = self.text_recognizer(
+                rec_img_list, tqdm_enable=tqdm_enable, tqdm_desc=tqdm_desc
+            )
+            new_rec_res = [(text, float(score)) for text, score in new_rec_res]
+            for positions, res in zip(rec_positions.values(), new_rec_res):
+                for i in positions:
+                    rec_res[i] = res
+            self.rec_cache.put_many(
+                (key, res)
+                for key, res in zip(rec_positions.keys(), new_rec_res)
+                if isinstance(key, str)
+            )
+        return rec_res
+
     def __call__(self, img, mfd_res=None):
 
         if img is None:
@@ -1,8 +1,10 @@
+import copy
 import sys
 
 import numpy as np
 import time
 import torch
+from miner_u_parser.utils.cpu_profile import use_channels_last
 from ...pytorchocr.base_ocr_v20 import BaseOCRV20
 from . import pytorchocr_utility as utility
 from ...pytorchocr.data import create_operators, transform
@@ -107,6 +109,7 @@ class TextDetector(BaseOCRV20):
             sys.exit(0)
 
         self.preprocess_op = create_operators(pre_process_list)
+        self.postprocess_params = postprocess_params
         self.postprocess_op = build_post_process(postprocess_params)
 
         self.weights_path = args.det_model_path
@@ -116,6 +119,31 @@ class TextDetector(BaseOCRV20):
         self.load_pytorch_weights(self.weights_path)
         self.net.eval()
         self.net.to(self.device)
+        use_channels_last(self.net, self.device)
+
+    def with_postprocess(self, args):
+        """
+            创建一个与当前检测器共享网络权重、仅后处理参数不同的检测器
+
+            Args:
+                args: 提供新的后处理参数(det_db_box_thresh, det_db_unclip_ratio等)
+
+            Returns:
+                detector: 共享self.net的轻量检测器
+            """
+        postprocess_params = dict(self.postprocess_params)
+        if self.det_algorithm in ["DB", "DB++"]:
+            postprocess_params["thresh"] = args.det_db_thresh
+            postprocess_params["box_thresh"] = args.det_db_box_thresh
+            postprocess_params["unclip_ratio"] = args.det_db_unclip_ratio
+            postprocess_params["use_dilation"] = args.use_dilation
+            postprocess_params["score_mode"] = args.det_db_score_mode
+
+        detector = copy.copy(self)
+        detector.args = args
+        detector.postprocess_params = postprocess_params
+        detector.postprocess_op = build_post_process(postprocess_params)
+        return detector
 
     def _batch_process_same_size(self, img_list):
         """
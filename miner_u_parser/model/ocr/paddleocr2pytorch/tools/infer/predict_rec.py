@@ -6,6 +6,7 @@ import time
 import torch
 from tqdm import tqdm
 
+from miner_u_parser.utils.cpu_profile import quantize_linear_int8
 from ...pytorchocr.base_ocr_v20 import BaseOCRV20
 from . import pytorchocr_utility as utility
 from ...pytorchocr.postprocess import build_post_process
@@ -93,6 +94,7 @@ class TextRecognizer(BaseOCRV20):
         self.load_state_dict(weights)
         self.net.eval()
         self.net.to(self.device)
+        self.net = quantize_linear_int8(self.net, self.device)
 
     def resize_norm_img(self, img, max_wh_ratio):
         imgC, imgH, imgW = self.rec_image_shape
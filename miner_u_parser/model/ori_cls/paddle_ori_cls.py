@@ -9,6 +9,8 @@ import cv2
 import numpy as np
 import onnxruntime
 
+from miner_u_parser.utils.config_reader import get_device
+from miner_u_parser.utils.cpu_profile import configure_ort_session_options
 from miner_u_parser.utils.enum_class import ModelPath
 from miner_u_parser.utils.models_download_utils import (
     auto_download_and_get_model_root_path,
@@ -23,7 +25,10 @@ class PaddleOrientationClsModel:
                     ModelPath.paddle_orientation_classification
                 ),
                 ModelPath.paddle_orientation_classification,
-            )
+            ),
+            sess_options=configure_ort_session_options(
+                onnxruntime.SessionOptions(), get_device()
+            ),
         )
         self.ocr_engine = ocr_engine
         self.less_length = 256
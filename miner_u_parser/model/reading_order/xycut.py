@@ -1,5 +1,4 @@
 from typing import List
-import cv2
 import numpy as np
 
 
@@ -17,11 +16,14 @@ def projection_by_bboxes(boxes: np.array, axis: int) -> np.ndarray:
     """
     assert axis in [0, 1]
     length = np.max(boxes[:, axis::2])
-    res = np.zeros(length, dtype=int)
-    # TODO: how to remove for loop?
-    for start, end in boxes[:, axis::2]:
-        res[start:end] += 1
-    return res
+    starts = boxes[:, axis]
+    ends = boxes[:, axis + 2]
+    # 差分数组上每个区间起点+1、终点-1，累加得到覆盖计数；坐标为非负整数
+    valid = ends > starts
+    diff = np.zeros(length + 1, dtype=int)
+    np.add.at(diff, starts[valid], 1)
+    np.add.at(diff, ends[valid], -1)
+    return np.cumsum(diff[:length])
 
 
 # from: https://dothinking.github.io/2021-06-19-%E9%80%92%E5%BD%92%E6%8A%95%E5%BD%B1%E5%88%86%E5%89%B2%E7%AE%97%E6%B3%95/#:~:text=%E9%80%92%E5%BD%92%E6%8A%95%E5%BD%B1%E5%88%86%E5%89%B2%EF%BC%88Recursive%20XY,%EF%BC%8C%E5%8F%AF%E4%BB%A5%E5%88%92%E5%88%86%E6%AE%B5%E8%90%BD%E3%80%81%E8%A1%8C%E3%80%82
@@ -61,8 +63,8 @@ def split_projection_profile(arr_values: np.array, min_value: float, min_gap: fl
 
     # convert to index of projection range:
     # the start index of zero interval is the end index of projection
-    arr_start = np.insert(arr_zero_intvl_end, 0, arr_index[0])
-    arr_end = np.append(arr_zero_intvl_start, arr_index[-1])
+    arr_start = np.concatenate((arr_index[:1], arr_zero_intvl_end))
+    arr_end = np.concatenate((arr_zero_intvl_start, arr_index[-1:]))
     arr_end += 1  # end index will be excluded as index slice
 
     return arr_start, arr_end
@@ -80,7 +82,14 @@ def recursive_xy_cut(boxes: np.ndarray, indices: List[int], res: List[int]):
     # 向 y 轴投影
     assert len(boxes) == len(indices)
 
-    _indices = boxes[:, 1].argsort()
+    # 单个box无需再切分，密集页面上大部分递归都会走到这里
+    if len(boxes) == 1:
+        if boxes[0, 3] > boxes[0, 1] and boxes[0, 2] > boxes[0, 0]:
+            res.append(indices[0])
+        return
+
+    # 使用稳定排序，坐标相同的box保持输入顺序，结果可复现
+    _indices = boxes[:, 1].argsort(kind="stable")
     y_sorted_boxes = boxes[_indices]
     y_sorted_indices = indices[_indices]
 
@@ -99,7 +108,7 @@ def recursive_xy_cut(boxes: np.ndarray, indices: List[int], res: List[int]):
         y_sorted_boxes_chunk = y_sorted_boxes[_indices]
         y_sorted_indices_chunk = y_sorted_indices[_indices]
 
-        _indices = y_sorted_boxes_chunk[:, 0].argsort()
+        _indices = y_sorted_boxes_chunk[:, 0].argsort(kind="stable")
         x_sorted_boxes_chunk = y_sorted_boxes_chunk[_indices]
         x_sorted_indices_chunk = y_sorted_indices_chunk[_indices]
 
@@ -147,6 +156,8 @@ def bbox2points(bbox):
 
 
 def vis_polygon(img, points, thickness=2, color=None):
+    import cv2
+
     br2bl_color = color
     tl2tr_color = color
     tr2br_color = color
@@ -199,6 +210,8 @@ def vis_points(
     Returns:
 
     """
+    import cv2
+
     points = np.array(points)
     if texts is not None:
         assert len(texts) == points.shape[0]
@@ -8,6 +8,8 @@ from loguru import logger
 from tqdm import tqdm
 
 from miner_u_parser.backend.pipeline.model_list import AtomicModel
+from miner_u_parser.utils.config_reader import get_device
+from miner_u_parser.utils.cpu_profile import configure_ort_session_options
 from miner_u_parser.utils.enum_class import ModelPath
 from miner_u_parser.utils.models_download_utils import (
     auto_download_and_get_model_root_path,
@@ -20,7 +22,10 @@ class PaddleTableClsModel:
             os.path.join(
                 auto_download_and_get_model_root_path(ModelPath.paddle_table_cls),
                 ModelPath.paddle_table_cls,
-            )
+            ),
+            sess_options=configure_ort_session_options(
+                onnxruntime.SessionOptions(), get_device()
+            ),
         )
         self.less_length = 256
         self.cw, self.ch = 224, 224
@@ -13,7 +13,7 @@
 # limitations under the License.
 import numpy as np
 
-from .matcher_utils import compute_iou, distance
+from .matcher_utils import box_distance_matrix, box_iou_matrix
 
 
 class TableMatch:
@@ -29,33 +29,40 @@ class TableMatch:
         return pred_html
 
     def match_result(self, dt_boxes, cell_bboxes, min_iou=0.1**8):
+        """为每个ocr框匹配单元格，一次性计算ocr框×单元格的iou和l1距离矩阵。
+
+        按(1 - iou, l1距离)的字典序选择单元格，并列时取下标最小的单元格，
+        与逐对计算compute_iou/distance后排序的结果一致。
+        """
         matched = {}
-        for i, gt_box in enumerate(dt_boxes):
-            distances = []
-            for j, pred_box in enumerate(cell_bboxes):
-                if len(pred_box) == 8:
-                    pred_box = [
-                        np.min(pred_box[0::2]),
-                        np.min(pred_box[1::2]),
-                        np.max(pred_box[0::2]),
-                        np.max(pred_box[1::2]),
-                    ]
-                distances.append(
-                    (distance(gt_box, pred_box), 1.0 - compute_iou(gt_box, pred_box))
-                )  # compute iou and l1 distance
-            sorted_distances = distances.copy()
-            # select det box by iou and l1 distance
-            sorted_distances = sorted(
-                sorted_distances, key=lambda item: (item[1], item[0])
+        if len(dt_boxes) == 0 or len(cell_bboxes) == 0:
+            return matched
+        gt_boxes = np.asarray(dt_boxes)
+        pred_boxes = np.asarray(cell_bboxes)
+        if pred_boxes.shape[1] == 8:
+            pred_boxes = np.stack(
+                [
+                    pred_boxes[:, 0::2].min(axis=1),
+                    pred_boxes[:, 1::2].min(axis=1),
+                    pred_boxes[:, 0::2].max(axis=1),
+                    pred_boxes[:, 1::2].max(axis=1),
+                ],
+                axis=1,
             )
+        distances = box_distance_matrix(gt_boxes, pred_boxes)
+        iou_costs = 1.0 - box_iou_matrix(gt_boxes, pred_boxes)
+
+        # select det box by iou and l1 distance
+        min_costs = iou_costs.min(axis=1)
+        tie_distances = np.where(
+            iou_costs == min_costs[:, None], distances, np.inf
+        )
+        best_cells = tie_distances.argmin(axis=1)
+        for i, (min_cost, best_cell) in enumerate(zip(min_costs, best_cells)):
             # must > min_iou
-            if sorted_distances[0][1] >= 1 - min_iou:
+            if min_cost >= 1 - min_iou:
                 continue
-
-            if distances.index(sorted_distances[0]) not in matched:
-                matched[distances.index(sorted_distances[0])] = [i]
-            else:
-                matched[distances.index(sorted_distances[0])].append(i)
+            matched.setdefault(int(best_cell), []).append(i)
         return matched
 
     def get_pred_html(self, pred_structures, matched_index, ocr_contents):
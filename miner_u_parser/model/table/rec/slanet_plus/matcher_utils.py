@@ -14,6 +14,8 @@
 import copy
 import re
 
+import numpy as np
+
 
 def deal_isolate_span(thead_part):
     """
@@ -244,3 +246,38 @@ def compute_iou(rec1, rec2):
 
     intersect = (right_line - left_line) * (bottom_line - top_line)
     return (intersect / (sum_area - intersect)) * 1.0
+
+
+def box_distance_matrix(boxes_1, boxes_2):
+    """distance的矩阵版本，返回shape为(len(boxes_1), len(boxes_2))的距离矩阵"""
+    b1 = boxes_1[:, None, :]
+    b2 = boxes_2[None, :, :]
+    dx1 = np.abs(b2[..., 0] - b1[..., 0])
+    dy1 = np.abs(b2[..., 1] - b1[..., 1])
+    dx2 = np.abs(b2[..., 2] - b1[..., 2])
+    dy2 = np.abs(b2[..., 3] - b1[..., 3])
+    # 与distance保持相同的累加顺序，保证浮点结果一致
+    dis = dx1 + dy1 + dx2 + dy2
+    dis_2 = dx1 + dy1
+    dis_3 = dx2 + dy2
+    return dis + np.minimum(dis_2, dis_3)
+
+
+def box_iou_matrix(rec_1, rec_2):
+    """compute_iou的矩阵版本，返回shape为(len(rec_1), len(rec_2))的iou矩阵"""
+    r1 = rec_1[:, None, :]
+    r2 = rec_2[None, :, :]
+    S_rec1 = (r1[..., 2] - r1[..., 0]) * (r1[..., 3] - r1[..., 1])
+    S_rec2 = (r2[..., 2] - r2[..., 0]) * (r2[..., 3] - r2[..., 1])
+    sum_area = S_rec1 + S_rec2
+
+    left_line = np.maximum(r1[..., 1], r2[..., 1])
+    right_line = np.minimum(r1[..., 3], r2[..., 3])
+    top_line = np.maximum(r1[..., 0], r2[..., 0])
+    bottom_line = np.minimum(r1[..., 2], r2[..., 2])
+
+    intersect = (right_line - left_line) * (bottom_line - top_line)
+    overlap = (left_line < right_line) & (top_line < bottom_line)
+    iou = np.zeros(intersect.shape, dtype=np.result_type(intersect, np.float32))
+    np.divide(intersect, sum_area - intersect, out=iou, where=overlap)
+    return iou
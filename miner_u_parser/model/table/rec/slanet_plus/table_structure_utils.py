@@ -30,6 +30,9 @@ from onnxruntime import (
 
 from loguru import logger
 
+from miner_u_parser.utils.config_reader import get_device as get_mineru_device
+from miner_u_parser.utils.cpu_profile import configure_ort_session_options
+
 
 class EP(Enum):
     CPU_EP = "CPUExecutionProvider"
@@ -65,6 +68,9 @@ class OrtInferSession:
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
 
+        # 未单独配置线程数时，cpu推理沿用统一的线程预算
+        configure_ort_session_options(sess_opt, get_mineru_device())
+
         cpu_nums = os.cpu_count()
         intra_op_num_threads = config.get("intra_op_num_threads", -1)
         if intra_op_num_threads != -1 and 1 <= intra_op_num_threads <= cpu_nums:
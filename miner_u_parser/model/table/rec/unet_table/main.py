@@ -3,6 +3,8 @@ import logging
 import os
 import time
 import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 
 from typing import List, Optional, Union, Dict, Any
@@ -11,6 +13,7 @@ import cv2
 from PIL import Image
 from loguru import logger
 from bs4 import BeautifulSoup
+from tqdm import tqdm
 
 from miner_u_parser.utils.span_pre_proc import calculate_contrast
 from .table_structure_unet import TSRUnet
@@ -72,13 +75,8 @@ class WiredTableRecognition:
             return WiredTableOutput("", None, None, 0.0)
 
         try:
-            table_res, logi_points = self.table_recover(
-                rotated_polygons, row_threshold, col_threshold
-            )
-            # 将坐标由逆时针转为顺时针方向，后续处理与无线表格对齐
-            polygons[:, 1, :], polygons[:, 3, :] = (
-                polygons[:, 3, :].copy(),
-                polygons[:, 1, :].copy(),
+            polygons, logi_points = self.recover_logic_points(
+                polygons, rotated_polygons, row_threshold, col_threshold
             )
             if not need_ocr:
                 sorted_polygons, idx_list = sorted_ocr_boxes(
@@ -93,19 +91,9 @@ class WiredTableRecognition:
             cell_box_det_map, not_match_orc_boxes = match_ocr_cell(ocr_result, polygons)
             # 如果有识别框没有ocr结果，直接进行rec补充
             cell_box_det_map = self.fill_blank_rec(img, polygons, cell_box_det_map)
-            # 转换为中间格式，修正识别框坐标,将物理识别框，逻辑识别框，ocr识别框整合为dict，方便后续处理
-            t_rec_ocr_list = self.transform_res(cell_box_det_map, polygons, logi_points)
-            # 将每个单元格中的ocr识别结果排序和同行合并，输出的html能完整保留文字的换行格式
-            t_rec_ocr_list = self.sort_and_gather_ocr_res(t_rec_ocr_list)
-
-            logi_points = [t_box_ocr["t_logic_box"] for t_box_ocr in t_rec_ocr_list]
-            cell_box_det_map = {
-                i: [ocr_box_and_text[1] for ocr_box_and_text in t_box_ocr["t_ocr_res"]]
-                for i, t_box_ocr in enumerate(t_rec_ocr_list)
-            }
-            pred_html = plot_html_table(logi_points, cell_box_det_map)
-            polygons = np.array(polygons).reshape(-1, 8)
-            logi_points = np.array(logi_points)
+            pred_html, polygons, logi_points = self.build_html(
+                polygons, logi_points, cell_box_det_map
+            )
             elapse = time.perf_counter() - s
 
         except Exception:
@@ -113,6 +101,121 @@ class WiredTableRecognition:
             return WiredTableOutput("", None, None, 0.0)
         return WiredTableOutput(pred_html, polygons, logi_points, elapse)
 
+    def recover_logic_points(
+        self, polygons, rotated_polygons, row_threshold=10, col_threshold=15
+    ):
+        table_res, logi_points = self.table_recover(
+            rotated_polygons, row_threshold, col_threshold
+        )
+        # 将坐标由逆时针转为顺时针方向，后续处理与无线表格对齐
+        polygons[:, 1, :], polygons[:, 3, :] = (
+            polygons[:, 3, :].copy(),
+            polygons[:, 1, :].copy(),
+        )
+        return polygons, logi_points
+
+    def build_html(self, polygons, logi_points, cell_box_det_map):
+        # 转换为中间格式，修正识别框坐标,将物理识别框，逻辑识别框，ocr识别框整合为dict，方便后续处理
+        t_rec_ocr_list = self.transform_res(cell_box_det_map, polygons, logi_points)
+        # 将每个单元格中的ocr识别结果排序和同行合并，输出的html能完整保留文字的换行格式
+        t_rec_ocr_list = self.sort_and_gather_ocr_res(t_rec_ocr_list)
+
+        logi_points = [t_box_ocr["t_logic_box"] for t_box_ocr in t_rec_ocr_list]
+        cell_box_det_map = {
+            i: [ocr_box_and_text[1] for ocr_box_and_text in t_box_ocr["t_ocr_res"]]
+            for i, t_box_ocr in enumerate(t_rec_ocr_list)
+        }
+        pred_html = plot_html_table(logi_points, cell_box_det_map)
+        polygons = np.array(polygons).reshape(-1, 8)
+        logi_points = np.array(logi_points)
+        return pred_html, polygons, logi_points
+
+    def batch_call(
+        self,
+        img_list: List[InputType],
+        ocr_results: List[List[Union[List[List[float]], str, str]]],
+        batch_size: int = 4,
+        max_workers: Optional[int] = None,
+        **kwargs,
+    ) -> List[WiredTableOutput]:
+        """批量识别有线表格
+
+        1. TSRUnet对整批图像做批量推理；
+        2. 线段后处理、逻辑坐标恢复和ocr匹配在线程池中并行；
+        3. 所有表格的空白单元格合并为一次ocr rec调用；
+        4. 生成html同样在线程池中并行。
+        """
+        s = time.perf_counter()
+        col_threshold = kwargs.get("col_threshold", 15)
+        row_threshold = kwargs.get("row_threshold", 10)
+        max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+        img_list = [self.load_img(img) for img in img_list]
+        preds = self.table_structure.batch_infer(img_list, batch_size)
+
+        def match_cells(args):
+            img, pred, ocr_result = args
+            try:
+                polygons, rotated_polygons = self.table_structure.decode(
+                    img, pred, **kwargs
+                )
+                if polygons is None:
+                    return None
+                polygons, logi_points = self.recover_logic_points(
+                    polygons, rotated_polygons, row_threshold, col_threshold
+                )
+                cell_box_det_map, _ = match_ocr_cell(ocr_result, polygons)
+                return polygons, logi_points, cell_box_det_map
+            except Exception:
+                logging.warning(traceback.format_exc())
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            states = list(
+                executor.map(match_cells, zip(img_list, preds, ocr_results))
+            )
+
+            # 汇总所有表格的空白单元格，一次性送入ocr rec
+            all_crop_list = []
+            crop_owners = []
+            for idx, state in enumerate(states):
+                if state is None:
+                    continue
+                polygons, _, cell_box_det_map = state
+                img_crop_list, img_crop_info_list = self.collect_blank_crops(
+                    img_list[idx], polygons, cell_box_det_map
+                )
+                all_crop_list.extend(img_crop_list)
+                crop_owners.extend((idx, info) for info in img_crop_info_list)
+
+            if all_crop_list:
+                ocr_res_list = self.recognize_blank_crops(all_crop_list)
+                blank_rec_by_table = defaultdict(list)
+                if ocr_res_list is not None:
+                    for (idx, info), ocr_res in zip(crop_owners, ocr_res_list):
+                        blank_rec_by_table[idx].append(info + [ocr_res])
+                for idx, img_crop_info_list in blank_rec_by_table.items():
+                    polygons, _, cell_box_det_map = states[idx]
+                    self.apply_blank_rec(polygons, cell_box_det_map, img_crop_info_list)
+
+            def build(state):
+                if state is None:
+                    return WiredTableOutput("", None, None, 0.0)
+                try:
+                    pred_html, polygons, logi_points = self.build_html(*state)
+                    return WiredTableOutput(pred_html, polygons, logi_points, 0.0)
+                except Exception:
+                    logging.warning(traceback.format_exc())
+                    return WiredTableOutput("", None, None, 0.0)
+
+            outputs = list(executor.map(build, states))
+
+        elapse = (time.perf_counter() - s) / max(len(outputs), 1)
+        for output in outputs:
+            if output.pred_html:
+                output.elapse = elapse
+        return outputs
+
     def transform_res(
         self,
         cell_box_det_map: Dict[int, List[any]],
@@ -174,6 +277,27 @@ class WiredTableRecognition:
         cell_box_map: Dict[int, List[str]],
     ) -> Dict[int, List[Any]]:
         """找到poly对应为空的框，尝试将直接将poly框直接送到识别中"""
+        img_crop_list, img_crop_info_list = self.collect_blank_crops(
+            img, sorted_polygons, cell_box_map
+        )
+        if len(img_crop_list) > 0:
+            # 进行ocr识别
+            ocr_res_list = self.recognize_blank_crops(img_crop_list)
+            if ocr_res_list is None:
+                return cell_box_map
+            for j, ocr_res in enumerate(ocr_res_list):
+                img_crop_info_list[j].append(ocr_res)
+            self.apply_blank_rec(sorted_polygons, cell_box_map, img_crop_info_list)
+
+        return cell_box_map
+
+    def collect_blank_crops(
+        self,
+        img: np.ndarray,
+        sorted_polygons: np.ndarray,
+        cell_box_map: Dict[int, List[str]],
+    ):
+        """收集没有ocr结果的单元格截图，低对比度的单元格直接填空"""
         bgr_img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
         img_crop_info_list = []
         img_crop_list = []
@@ -209,58 +333,49 @@ class WiredTableRecognition:
             img_crop_list.append(img_crop)
             img_crop_info_list.append([i, box])
 
-        if len(img_crop_list) > 0:
-            # 进行ocr识别
-            ocr_result = self.ocr_engine.ocr(img_crop_list, det=False)
-            # ocr_result = [[]]
-            # for crop_img in img_crop_list:
-            #     tmp_ocr_result = self.ocr_engine.ocr(crop_img)
-            #     if tmp_ocr_result[0] and len(tmp_ocr_result[0]) > 0 and isinstance(tmp_ocr_result[0], list) and len(tmp_ocr_result[0][0]) == 2:
-            #         ocr_result[0].append(tmp_ocr_result[0][0][1])
-            #     else:
-            #         ocr_result[0].append(("", 0.0))
-
-            if (
-                not ocr_result
-                or not isinstance(ocr_result, list)
-                or len(ocr_result) == 0
-            ):
-                logger.warning(
-                    "OCR engine returned no results or invalid result for image crops."
-                )
-                return cell_box_map
-            ocr_res_list = ocr_result[0]
-            if not isinstance(ocr_res_list, list) or len(ocr_res_list) != len(
-                img_crop_list
-            ):
-                logger.warning(
-                    "OCR result list length does not match image crop list length."
-                )
-                return cell_box_map
-            for j, ocr_res in enumerate(ocr_res_list):
-                img_crop_info_list[j].append(ocr_res)
+        return img_crop_list, img_crop_info_list
 
-            for i, box, ocr_res in img_crop_info_list:
-                # 处理ocr结果
-                ocr_text, ocr_score = ocr_res
-                # logger.debug(f"OCR result for box {i}: {ocr_text} with score {ocr_score}")
-                if ocr_score < 0.6 or ocr_text in [
-                    "1",
-                    "口",
-                    "■",
-                    "（204号",
-                    "（20",
-                    "（2",
-                    "（2号",
-                    "（20号",
-                    "号",
-                    "（204",
-                ]:
-                    # logger.warning(f"Low confidence OCR result for box {i}: {ocr_text} with score {ocr_score}")
-                    box = sorted_polygons[i]
-                    cell_box_map[i] = [[box, "", 0.1]]
-                    continue
-                cell_box_map[i] = [[box, ocr_text, ocr_score]]
+    def recognize_blank_crops(self, img_crop_list):
+        """对空白单元格截图做ocr rec，结果异常时返回None"""
+        ocr_result = self.ocr_engine.ocr(img_crop_list, det=False)
+        if not ocr_result or not isinstance(ocr_result, list) or len(ocr_result) == 0:
+            logger.warning(
+                "OCR engine returned no results or invalid result for image crops."
+            )
+            return None
+        ocr_res_list = ocr_result[0]
+        if not isinstance(ocr_res_list, list) or len(ocr_res_list) != len(
+            img_crop_list
+        ):
+            logger.warning(
+                "OCR result list length does not match image crop list length."
+            )
+            return None
+        return ocr_res_list
+
+    def apply_blank_rec(self, sorted_polygons, cell_box_map, img_crop_info_list):
+        """将空白单元格的rec结果回填到cell_box_map"""
+        for i, box, ocr_res in img_crop_info_list:
+            # 处理ocr结果
+            ocr_text, ocr_score = ocr_res
+            # logger.debug(f"OCR result for box {i}: {ocr_text} with score {ocr_score}")
+            if ocr_score < 0.6 or ocr_text in [
+                "1",
+                "口",
+                "■",
+                "（204号",
+                "（20",
+                "（2",
+                "（2号",
+                "（20号",
+                "号",
+                "（204",
+            ]:
+                # logger.warning(f"Low confidence OCR result for box {i}: {ocr_text} with score {ocr_score}")
+                box = sorted_polygons[i]
+                cell_box_map[i] = [[box, "", 0.1]]
+                continue
+            cell_box_map[i] = [[box, ocr_text, ocr_score]]
 
         return cell_box_map
 
@@ -323,85 +438,143 @@ class UnetTableModel:
             # )
 
             wired_html_code = wired_table_results.pred_html
-            wired_len = count_table_cells_physical(wired_html_code)
-            wireless_len = count_table_cells_physical(wireless_html_code)
-            # 计算两种模型检测的单元格数量差异
-            gap_of_len = wireless_len - wired_len
-            # logger.debug(f"wired table cell bboxes: {wired_len}, wireless table cell bboxes: {wireless_len}")
-
-            # 使用OCR结果计算两种模型填入的文字数量
-            wireless_text_count = 0
-            wired_text_count = 0
-            for ocr_res in ocr_result:
-                if ocr_res[1] in wireless_html_code:
-                    wireless_text_count += 1
-                if ocr_res[1] in wired_html_code:
-                    wired_text_count += 1
-            # logger.debug(f"wireless table ocr text count: {wireless_text_count}, wired table ocr text count: {wired_text_count}")
-
-            # 使用HTML解析器计算空单元格数量
-            wireless_soup = (
-                BeautifulSoup(wireless_html_code, "html.parser")
-                if wireless_html_code
-                else BeautifulSoup("", "html.parser")
-            )
-            wired_soup = (
-                BeautifulSoup(wired_html_code, "html.parser")
-                if wired_html_code
-                else BeautifulSoup("", "html.parser")
-            )
-            # 计算空单元格数量(没有文本内容或只有空白字符)
-            wireless_blank_count = sum(
-                1
-                for cell in wireless_soup.find_all(["td", "th"])
-                if not cell.text.strip()
+            return self.select_html(ocr_result, wired_html_code, wireless_html_code)
+        except Exception as e:
+            logger.warning(e)
+            return wireless_html_code
+
+    def batch_predict(
+        self, table_res_list: List[Dict], batch_size: int = 4, compare: bool = True
+    ) -> None:
+        """对传入的字典列表进行批量预测，无返回值，结果写回table_res["html"]
+
+        compare为False时表格没有跑无线模型，直接使用有线模型的非空结果。
+        """
+
+        not_none_table_res_list = []
+        for table_res in table_res_list:
+            if table_res.get("ocr_result", None):
+                not_none_table_res_list.append(table_res)
+
+        with tqdm(
+            total=len(not_none_table_res_list), desc="Table-wired Predict"
+        ) as pbar:
+            for index in range(0, len(not_none_table_res_list), batch_size):
+                batch_table_res = not_none_table_res_list[index : index + batch_size]
+                batch_imgs = [
+                    np.asarray(table_res["wired_table_img"])
+                    for table_res in batch_table_res
+                ]
+                batch_ocr_results = [
+                    table_res["ocr_result"] for table_res in batch_table_res
+                ]
+                try:
+                    wired_results = self.wired_table_model.batch_call(
+                        batch_imgs, batch_ocr_results, batch_size=batch_size
+                    )
+                except Exception as e:
+                    logger.warning(e)
+                    wired_results = [None] * len(batch_table_res)
+
+                for table_res, ocr_result, wired_result in zip(
+                    batch_table_res, batch_ocr_results, wired_results
+                ):
+                    wireless_html_code = table_res["table_res"].get("html", None)
+                    if wired_result is None:
+                        continue
+                    if not compare:
+                        if wired_result.pred_html:
+                            table_res["table_res"]["html"] = wired_result.pred_html
+                        continue
+                    try:
+                        html_code = self.select_html(
+                            ocr_result, wired_result.pred_html, wireless_html_code
+                        )
+                    except Exception as e:
+                        logger.warning(e)
+                        html_code = wireless_html_code
+                    table_res["table_res"]["html"] = html_code
+                pbar.update(len(batch_table_res))
+
+    @staticmethod
+    def select_html(ocr_result, wired_html_code, wireless_html_code):
+        """对比有线和无线表格模型的结果，选择更可信的html"""
+        wired_len = count_table_cells_physical(wired_html_code)
+        wireless_len = count_table_cells_physical(wireless_html_code)
+        # 计算两种模型检测的单元格数量差异
+        gap_of_len = wireless_len - wired_len
+        # logger.debug(f"wired table cell bboxes: {wired_len}, wireless table cell bboxes: {wireless_len}")
+
+        # 使用OCR结果计算两种模型填入的文字数量
+        wireless_text_count = 0
+        wired_text_count = 0
+        for ocr_res in ocr_result:
+            if ocr_res[1] in wireless_html_code:
+                wireless_text_count += 1
+            if ocr_res[1] in wired_html_code:
+                wired_text_count += 1
+        # logger.debug(f"wireless table ocr text count: {wireless_text_count}, wired table ocr text count: {wired_text_count}")
+
+        # 使用HTML解析器计算空单元格数量
+        wireless_soup = (
+            BeautifulSoup(wireless_html_code, "html.parser")
+            if wireless_html_code
+            else BeautifulSoup("", "html.parser")
+        )
+        wired_soup = (
+            BeautifulSoup(wired_html_code, "html.parser")
+            if wired_html_code
+            else BeautifulSoup("", "html.parser")
+        )
+        # 计算空单元格数量(没有文本内容或只有空白字符)
+        wireless_blank_count = sum(
+            1
+            for cell in wireless_soup.find_all(["td", "th"])
+            if not cell.text.strip()
+        )
+        wired_blank_count = sum(
+            1 for cell in wired_soup.find_all(["td", "th"]) if not cell.text.strip()
+        )
+        # logger.debug(f"wireless table blank cell count: {wireless_blank_count}, wired table blank cell count: {wired_blank_count}")
+
+        # 计算非空单元格数量
+        wireless_non_blank_count = wireless_len - wireless_blank_count
+        wired_non_blank_count = wired_len - wired_blank_count
+        # 无线表非空格数量大于有线表非空格数量时，才考虑切换
+        switch_flag = False
+        if wireless_non_blank_count > wired_non_blank_count:
+            # 假设非空表格是接近正方表，使用非空单元格数量开平方作为表格规模的估计
+            wired_table_scale = round(wired_non_blank_count**0.5)
+            # logger.debug(f"wireless non-blank cell count: {wireless_non_blank_count}, wired non-blank cell count: {wired_non_blank_count}, wired table scale: {wired_table_scale}")
+            # 如果无线表非空格的数量比有线表多一列或以上，需要切换到无线表
+            wired_scale_plus_2_cols = wired_non_blank_count + (
+                wired_table_scale * 2
             )
-            wired_blank_count = sum(
-                1 for cell in wired_soup.find_all(["td", "th"]) if not cell.text.strip()
+            wired_scale_squared_plus_2_rows = wired_table_scale * (
+                wired_table_scale + 2
             )
-            # logger.debug(f"wireless table blank cell count: {wireless_blank_count}, wired table blank cell count: {wired_blank_count}")
-
-            # 计算非空单元格数量
-            wireless_non_blank_count = wireless_len - wireless_blank_count
-            wired_non_blank_count = wired_len - wired_blank_count
-            # 无线表非空格数量大于有线表非空格数量时，才考虑切换
-            switch_flag = False
-            if wireless_non_blank_count > wired_non_blank_count:
-                # 假设非空表格是接近正方表，使用非空单元格数量开平方作为表格规模的估计
-                wired_table_scale = round(wired_non_blank_count**0.5)
-                # logger.debug(f"wireless non-blank cell count: {wireless_non_blank_count}, wired non-blank cell count: {wired_non_blank_count}, wired table scale: {wired_table_scale}")
-                # 如果无线表非空格的数量比有线表多一列或以上，需要切换到无线表
-                wired_scale_plus_2_cols = wired_non_blank_count + (
-                    wired_table_scale * 2
-                )
-                wired_scale_squared_plus_2_rows = wired_table_scale * (
-                    wired_table_scale + 2
-                )
-                if (wireless_non_blank_count + 3) >= max(
-                    wired_scale_plus_2_cols, wired_scale_squared_plus_2_rows
-                ):
-                    switch_flag = True
-
-            # 判断是否使用无线表格模型的结果
-            if (
-                switch_flag
-                or (
-                    0 <= gap_of_len <= 5 and wired_len <= round(wireless_len * 0.75)
-                )  # 两者相差不大但有线模型结果较少
-                or (
-                    gap_of_len == 0 and wired_len <= 4
-                )  # 单元格数量完全相等且总量小于等于4
-                or (
-                    wired_text_count <= wireless_text_count * 0.6
-                    and wireless_text_count >= 10
-                )  # 有线模型填入的文字明显少于无线模型
+            if (wireless_non_blank_count + 3) >= max(
+                wired_scale_plus_2_cols, wired_scale_squared_plus_2_rows
             ):
-                # logger.debug("fall back to wireless table model")
-                html_code = wireless_html_code
-            else:
-                html_code = wired_html_code
+                switch_flag = True
+
+        # 判断是否使用无线表格模型的结果
+        if (
+            switch_flag
+            or (
+                0 <= gap_of_len <= 5 and wired_len <= round(wireless_len * 0.75)
+            )  # 两者相差不大但有线模型结果较少
+            or (
+                gap_of_len == 0 and wired_len <= 4
+            )  # 单元格数量完全相等且总量小于等于4
+            or (
+                wired_text_count <= wireless_text_count * 0.6
+                and wireless_text_count >= 10
+            )  # 有线模型填入的文字明显少于无线模型
+        ):
+            # logger.debug("fall back to wireless table model")
+            html_code = wireless_html_code
+        else:
+            html_code = wired_html_code
 
-            return html_code
-        except Exception as e:
-            logger.warning(e)
-            return wireless_html_code
+        return html_code
@@ -1,11 +1,12 @@
 import copy
 import math
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Tuple
 
 import cv2
 import numpy as np
+from loguru import logger
 from skimage import measure
-from .utils import OrtInferSession, resize_img
+from .utils import OrtInferSession, ONNXRuntimeError, resize_img
 from .utils_table_line_rec import (
     get_table_line,
     final_adjust_lines,
@@ -27,6 +28,9 @@ class TSRUnet:
         self.std = np.array([58.395, 57.12, 57.375], dtype=np.float32)
         self.inp_height = 1024
         self.inp_width = 1024
+        # 输入统一padding到inp_height x inp_width(右侧和下方，归一化后的白色)，
+        # 逐张推理与批量推理的输入完全相同，任意尺寸的表格都能组成batch
+        self.pad_value = ((255 - self.mean) / self.std).astype(np.float32)
 
         self.session = OrtInferSession(config)
 
@@ -35,6 +39,11 @@ class TSRUnet:
     ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         img_info = self.preprocess(img)
         pred = self.infer(img_info)
+        return self.decode(img, pred, **kwargs)
+
+    def decode(
+        self, img: np.ndarray, pred: np.ndarray, **kwargs
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         polygons, rotated_polygons = self.postprocess(img, pred, **kwargs)
         if polygons.size == 0:
             return None, None
@@ -67,13 +76,50 @@ class TSRUnet:
         cv2.subtract(img, mean, img)  # inplace
         cv2.multiply(img, stdinv, img)  # inplace
         img = img.transpose(2, 0, 1)
-        images = img[None, :]
-        return {"img": images}
+        _, h, w = img.shape
+        padded = np.empty((3, self.inp_height, self.inp_width), dtype=np.float32)
+        padded[:] = self.pad_value[:, None, None]
+        padded[:, :h, :w] = img
+        images = padded[None, :]
+        return {"img": images, "valid_shape": (h, w)}
+
+    def crop_pred(self, pred, valid_shape):
+        """将padding后输入的预测结果裁剪回有效区域"""
+        h, w = valid_shape
+        out_h, out_w = pred.shape[-2:]
+        valid_h = round(h * out_h / self.inp_height)
+        valid_w = round(w * out_w / self.inp_width)
+        return pred[:valid_h, :valid_w].astype(np.uint8)
 
     def infer(self, input):
         result = self.session(input["img"][None, ...])[0][0]
-        result = result[0].astype(np.uint8)
-        return result
+        return self.crop_pred(result[0], input["valid_shape"])
+
+    def batch_infer(self, img_list: List[np.ndarray], batch_size: int = 4) -> List[np.ndarray]:
+        """批量推理，返回与infer一致的逐张预测结果
+
+        所有输入都padding到相同的固定尺寸，按batch_size堆叠推理，
+        预测结果再裁剪回各自的有效区域。
+        """
+        inputs = [self.preprocess(img) for img in img_list]
+        preds = [None] * len(inputs)
+        batch_count = 0
+        for start in range(0, len(inputs), batch_size):
+            chunk = inputs[start : start + batch_size]
+            batch = np.concatenate([inp["img"] for inp in chunk])
+            try:
+                outputs = self.session([batch])[0]
+            except ONNXRuntimeError:
+                # 模型不支持动态batch时退化为逐张推理
+                outputs = np.concatenate(
+                    [self.session([batch[j : j + 1]])[0] for j in range(len(chunk))]
+                )
+            batch_count += 1
+            for j, inp in enumerate(chunk):
+                preds[start + j] = self.crop_pred(outputs[j][0], inp["valid_shape"])
+        if inputs:
+            logger.debug(f"wired table unet: {len(inputs)} tables in {batch_count} batches")
+        return preds
 
     def postprocess(self, img, pred, **kwargs):
         row = kwargs.get("row", 50) if kwargs else 50
@@ -16,6 +16,9 @@ from onnxruntime import (
 )
 from PIL import Image, UnidentifiedImageError
 
+from miner_u_parser.utils.config_reader import get_device
+from miner_u_parser.utils.cpu_profile import configure_ort_session_options
+
 
 root_dir = Path(__file__).resolve().parent
 InputType = Union[str, np.ndarray, bytes, Path]
@@ -48,6 +51,9 @@ class OrtInferSession:
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
 
+        # 未单独配置线程数时，cpu推理沿用统一的线程预算
+        configure_ort_session_options(sess_opt, get_device())
+
         cpu_nums = os.cpu_count()
         intra_op_num_threads = config.get("intra_op_num_threads", -1)
         if intra_op_num_threads != -1 and 1 <= intra_op_num_threads <= cpu_nums:
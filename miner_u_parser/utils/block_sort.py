@@ -1,13 +1,13 @@
 # Copyright (c) Opendatalab. All rights reserved.
-import copy
+import collections
 import os
 import statistics
 import warnings
 from typing import List
-import torch
 from loguru import logger
 
 from miner_u_parser.utils.config_reader import get_device
+from miner_u_parser.utils.cpu_profile import apply_cpu_thread_budget, quantize_linear_int8
 from miner_u_parser.utils.enum_class import BlockType, ModelPath
 from miner_u_parser.utils.models_download_utils import (
     auto_download_and_get_model_root_path,
@@ -63,6 +63,7 @@ def get_line_height(blocks):
 def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks):
     page_line_list = []
 
+    # add_lines_to_block会为block新建lines列表，原来的lines直接作为real_lines保存，无需复制
     def add_lines_to_block(b):
         line_bboxes = insert_lines_into_block(b["bbox"], line_height, page_w, page_h)
         b["lines"] = []
@@ -86,7 +87,7 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks
                 and len(block["lines"]) == 1
                 and (block["bbox"][3] - block["bbox"][1]) > line_height * 2
             ):
-                block["real_lines"] = copy.deepcopy(block["lines"])
+                block["real_lines"] = block["lines"]
                 add_lines_to_block(block)
             else:
                 for line in block["lines"]:
@@ -97,7 +98,7 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks
             BlockType.TABLE_BODY,
             BlockType.INTERLINE_EQUATION,
         ]:
-            block["real_lines"] = copy.deepcopy(block["lines"])
+            block["real_lines"] = block["lines"]
             add_lines_to_block(block)
 
     for block in footnote_blocks:
@@ -142,6 +143,8 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks
             1000 >= right >= left >= 0 and 1000 >= bottom >= top >= 0
         ), f"Invalid box. right: {right}, left: {left}, bottom: {bottom}, top: {top}"  # noqa: E126, E121
         boxes.append([left, top, right, bottom])
+    import torch
+
     model_manager = ModelSingleton()
     model = model_manager.get_model("layoutreader")
     with torch.no_grad():
@@ -194,6 +197,7 @@ def insert_lines_into_block(block_bbox, line_height, page_w, page_h):
 
 
 def model_init(model_name: str):
+    import torch
     from transformers import LayoutLMv3ForTokenClassification
 
     device_name = get_device()
@@ -225,6 +229,8 @@ def model_init(model_name: str):
             model.to(device).eval().bfloat16()
         else:
             model.to(device).eval()
+            apply_cpu_thread_budget(device_name)
+            model = quantize_linear_int8(model, device_name)
     else:
         logger.error("model name not allow")
         exit(1)
@@ -262,17 +268,31 @@ def do_predict(boxes: List[List[int]], model) -> List[int]:
     return parse_logits(logits, len(boxes))
 
 
+def build_bbox_rank_map(sorted_bboxes) -> dict:
+    """bbox到其在排序结果中位置的映射，重复出现的bbox按先后顺序对应多个位置"""
+    rank_map = {}
+    for rank, bbox in enumerate(sorted_bboxes):
+        rank_map.setdefault(tuple(bbox), []).append(rank)
+    return rank_map
+
+
 def cal_block_index(fix_blocks, sorted_bboxes):
 
     if sorted_bboxes is not None:
         # 使用layoutreader排序
+        rank_map = build_bbox_rank_map(sorted_bboxes)
+        rank_used = collections.Counter()
         for block in fix_blocks:
             line_index_list = []
             if len(block["lines"]) == 0:
-                block["index"] = sorted_bboxes.index(block["bbox"])
+                block["index"] = rank_map[tuple(block["bbox"])][0]
             else:
                 for line in block["lines"]:
-                    line["index"] = sorted_bboxes.index(line["bbox"])
+                    # bbox相同的多个line依次取不同的位置
+                    key = tuple(line["bbox"])
+                    ranks = rank_map[key]
+                    line["index"] = ranks[min(rank_used[key], len(ranks) - 1)]
+                    rank_used[key] += 1
                     line_index_list.append(line["index"])
                 median_value = statistics.median(line_index_list)
                 block["index"] = median_value
@@ -285,9 +305,8 @@ def cal_block_index(fix_blocks, sorted_bboxes):
                 BlockType.INTERLINE_EQUATION,
             ]:
                 if "real_lines" in block:
-                    block["virtual_lines"] = copy.deepcopy(block["lines"])
-                    block["lines"] = copy.deepcopy(block["real_lines"])
-                    del block["real_lines"]
+                    block["virtual_lines"] = block["lines"]
+                    block["lines"] = block.pop("real_lines")
     else:
         # 使用xycut排序
         block_bboxes = []
@@ -304,24 +323,23 @@ def cal_block_index(fix_blocks, sorted_bboxes):
                 BlockType.INTERLINE_EQUATION,
             ]:
                 if "real_lines" in block:
-                    block["virtual_lines"] = copy.deepcopy(block["lines"])
-                    block["lines"] = copy.deepcopy(block["real_lines"])
-                    del block["real_lines"]
+                    block["virtual_lines"] = block["lines"]
+                    block["lines"] = block.pop("real_lines")
 
         import numpy as np
         from miner_u_parser.model.reading_order.xycut import recursive_xy_cut
 
-        random_boxes = np.array(block_bboxes)
-        np.random.shuffle(random_boxes)
         res = []
         recursive_xy_cut(
-            np.asarray(random_boxes).astype(int), np.arange(len(block_bboxes)), res
+            np.asarray(block_bboxes).astype(int), np.arange(len(block_bboxes)), res
         )
         assert len(res) == len(block_bboxes)
-        sorted_boxes = random_boxes[np.array(res)].tolist()
 
-        for i, block in enumerate(fix_blocks):
-            block["index"] = sorted_boxes.index(block["bbox"])
+        # res为按阅读顺序排列的block下标，取逆排列得到每个block的位置，bbox重复的block位置各不相同
+        block_ranks = np.empty(len(res), dtype=int)
+        block_ranks[np.asarray(res, dtype=int)] = np.arange(len(res))
+        for block, rank in zip(fix_blocks, block_ranks.tolist()):
+            block["index"] = rank
 
         # 生成line index
         sorted_blocks = sorted(fix_blocks, key=lambda b: b["index"])
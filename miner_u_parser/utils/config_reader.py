@@ -3,12 +3,6 @@ import json
 import os
 from loguru import logger
 
-try:
-    import torch
-    import torch_npu
-except ImportError:
-    pass
-
 
 # 定义配置文件名常量
 CONFIG_FILE_NAME = os.getenv("MINERU_TOOLS_CONFIG_JSON", "mineru.json")
@@ -35,12 +29,17 @@ def get_device():
     if device_mode is not None:
         return device_mode
     else:
+        # torch只在真正需要探测设备时才导入，避免拖慢启动
+        import torch
+
         if torch.cuda.is_available():
             return "cuda"
         elif torch.backends.mps.is_available():
             return "mps"
         else:
             try:
+                import torch_npu
+
                 if torch_npu.npu.is_available():
                     return "npu"
             except Exception as e:
@@ -66,6 +65,11 @@ def get_table_enable(table_enable):
     return table_enable
 
 
+def get_table_routing():
+    """表格结构模型路由策略，dual(默认，有歧义的表格同时跑有线和无线模型)或early_exit"""
+    return os.getenv("MINERU_TABLE_ROUTING", "dual").lower()
+
+
 def get_latex_delimiter_config():
     config = read_config()
     if config is None:
@@ -0,0 +1,118 @@
+import os
+import threading
+
+from loguru import logger
+
+_thread_budget_lock = threading.Lock()
+_thread_budget_applied = False
+
+
+def is_cpu_device(device) -> bool:
+    return str(device).startswith("cpu")
+
+
+def get_available_cpus() -> int:
+    # 容器中按cpu亲和性统计可用核数
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_cpu_thread_budget() -> int:
+    """torch和onnxruntime共用的intra-op线程数。
+
+    MINERU_CPU_THREADS设置线程数，默认为可用核数；设置为0时不做控制，保持各运行时的默认线程池。
+    """
+    threads = int(os.getenv("MINERU_CPU_THREADS", get_available_cpus()))
+    return min(max(threads, 0), get_available_cpus())
+
+
+def cpu_int8_enabled() -> bool:
+    """MINERU_CPU_INT8=true时对以Linear为主的模型做int8动态量化(默认关闭，会带来少量精度变化)"""
+    return os.getenv("MINERU_CPU_INT8", "false").lower() == "true"
+
+
+def cpu_channels_last_enabled() -> bool:
+    """MINERU_CPU_CHANNELS_LAST=true时卷积网络以channels-last内存布局推理"""
+    return os.getenv("MINERU_CPU_CHANNELS_LAST", "false").lower() == "true"
+
+
+def int8_active(device) -> bool:
+    return is_cpu_device(device) and cpu_int8_enabled()
+
+
+def apply_cpu_thread_budget(device):
+    """cpu推理时设置一次torch的线程数，各模型串行执行，共用同一个线程预算"""
+    global _thread_budget_applied
+    if not is_cpu_device(device):
+        return
+    budget = get_cpu_thread_budget()
+    if budget <= 0:
+        return
+    with _thread_budget_lock:
+        if _thread_budget_applied:
+            return
+        import torch
+
+        torch.set_num_threads(budget)
+        try:
+            # 模型内部的算子串行执行，inter-op线程池只会与intra-op线程争抢核心
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # inter-op线程池在已经执行过并行任务后不能再修改
+            pass
+        _thread_budget_applied = True
+        logger.info(f"cpu thread budget: {budget} intra-op threads")
+
+
+def configure_ort_session_options(sess_opt, device):
+    """cpu推理时onnxruntime session使用与torch相同的线程预算，并关闭线程池的空转等待，
+    避免session空闲时占用torch需要的核心"""
+    if not is_cpu_device(device):
+        return sess_opt
+    budget = get_cpu_thread_budget()
+    if budget <= 0:
+        return sess_opt
+    sess_opt.intra_op_num_threads = budget
+    sess_opt.inter_op_num_threads = 1
+    sess_opt.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return sess_opt
+
+
+def quantize_linear_int8(module, device):
+    """cpu上开启MINERU_CPU_INT8时，将模块中的nn.Linear替换为int8动态量化版本"""
+    if not int8_active(device):
+        return module
+    import torch
+
+    try:
+        return torch.ao.quantization.quantize_dynamic(
+            module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    except Exception as e:
+        logger.warning(f"int8 dynamic quantization of {type(module).__name__} failed: {e}")
+        return module
+
+
+def _channels_last_inputs(module, args):
+    if args and hasattr(args[0], "dim") and args[0].dim() == 4:
+        import torch
+
+        return (args[0].contiguous(memory_format=torch.channels_last),) + tuple(args[1:])
+    return None
+
+
+def use_channels_last(module, device):
+    """cpu上开启MINERU_CPU_CHANNELS_LAST时，将卷积网络的权重和4维输入转为channels-last布局。
+
+    输入在forward前由hook转换，兼容由第三方predictor(如ultralytics)构造输入的模型；
+    后续卷积的输出沿用输入的布局。
+    """
+    if not (is_cpu_device(device) and cpu_channels_last_enabled()):
+        return module
+    import torch
+
+    module.to(memory_format=torch.channels_last)
+    module.register_forward_pre_hook(_channels_last_inputs)
+    return module
@@ -1,5 +1,7 @@
 import os
+import re
 import unicodedata
+from functools import lru_cache
 
 if not os.getenv("FTLANG_CACHE"):
     current_file_path = os.path.abspath(__file__)
@@ -9,12 +11,32 @@ if not os.getenv("FTLANG_CACHE"):
     os.environ["FTLANG_CACHE"] = str(ftlang_cache_dir)
     # print(os.getenv("FTLANG_CACHE"))
 
-from fast_langdetect import detect_language
+
+
+def detect_language(text):
+    # fast_langdetect导入时会加载fasttext，延迟到第一次检测时
+    from fast_langdetect import detect_language as _detect_language
+
+    return _detect_language(text)
+
+
+CJK_LANGS = ("zh", "ja", "ko")
+
+# 中日韩文字及标点：CJK符号标点、假名、注音、谚文、汉字(含扩展区)、兼容汉字、半角片假名
+_CJK_CHAR_PATTERN = re.compile(
+    "[\u1100-\u11ff\u3000-\u30ff\u3100-\u318f\u31f0-\u31ff\u3400-\u4dbf"
+    "\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff66-\uff9f\U00020000-\U0003134f]"
+)
+_SURROGATE_PATTERN = re.compile("[\ud800-\udfff]")
 
 
 def remove_invalid_surrogates(text):
     # 移除无效的 UTF-16 代理对
-    return "".join(c for c in text if not (0xD800 <= ord(c) <= 0xDFFF))
+    return _SURROGATE_PATTERN.sub("", text)
+
+
+def contains_cjk(text: str) -> bool:
+    return _CJK_CHAR_PATTERN.search(text) is not None
 
 
 def detect_lang(text: str) -> str:
@@ -48,6 +70,27 @@ def detect_lang(text: str) -> str:
     return lang
 
 
+@lru_cache(maxsize=4096)
+def _detect_lang_cached(text: str) -> str:
+    return detect_lang(text)
+
+
+def detect_langs(texts, cjk_only: bool = False) -> list:
+    """批量检测一组文本的语言，相同文本只检测一次，结果在进程内缓存。
+
+    cjk_only=True用于只关心是否为中日韩语言的场景：不含中日韩字符的文本不调用模型，直接返回""。
+    """
+    results = {}
+    for text in texts:
+        if text in results:
+            continue
+        if cjk_only and not contains_cjk(text):
+            results[text] = ""
+        else:
+            results[text] = _detect_lang_cached(text)
+    return [results[text] for text in texts]
+
+
 if __name__ == "__main__":
     print(os.getenv("FTLANG_CACHE"))
     print(detect_lang("This is a test."))
@@ -1,17 +1,24 @@
 import os
+import threading
 import time
 import gc
+import psutil
 from PIL import Image
 from loguru import logger
 import numpy as np
 
 from miner_u_parser.utils.boxbase import get_minbox_if_overlap_by_ratio
 
-try:
+
+def _import_torch():
+    """延迟导入torch和torch_npu，未安装torch_npu时返回None"""
     import torch
-    import torch_npu
-except ImportError:
-    pass
+
+    try:
+        import torch_npu
+    except ImportError:
+        torch_npu = None
+    return torch, torch_npu
 
 
 def crop_img(input_res, input_img, crop_paste_x=0, crop_paste_y=0):
@@ -497,7 +504,25 @@ def get_res_list_from_layout_res(
     return ocr_res_list, filtered_table_res_list, single_page_mfdetrec_res
 
 
+def group_batches_by_size(images, batch_size):
+    """按图片尺寸分组后切分batch，返回每个batch中图片的下标。
+
+    同一batch内的图片尺寸一致时，yolo的letterbox与逐张推理完全相同，
+    检测结果不随batch size变化。
+    """
+    groups = {}
+    for idx, image in enumerate(images):
+        size = image.size if isinstance(image, Image.Image) else image.shape[:2]
+        groups.setdefault(tuple(size), []).append(idx)
+    batches = []
+    for indices in groups.values():
+        for start in range(0, len(indices), batch_size):
+            batches.append(indices[start : start + batch_size])
+    return batches
+
+
 def clean_memory(device="cuda"):
+    torch, torch_npu = _import_torch()
     if device == "cuda":
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
@@ -519,7 +544,133 @@ def clean_vram(device, vram_threshold=8):
         clean_memory(device)
 
 
+def get_reserved_vram(device):
+    """当前进程在device上缓存分配器保留的显存(字节)，empty_cache可以释放其中未使用的部分"""
+    torch, torch_npu = _import_torch()
+    try:
+        if str(device).startswith("cuda") and torch.cuda.is_available():
+            return torch.cuda.memory_reserved(device)
+        elif str(device).startswith("npu") and torch_npu.npu.is_available():
+            return torch_npu.npu.memory_reserved(device)
+    except Exception:
+        pass
+    return 0
+
+
+class MemoryCleanupPolicy:
+    """按内存压力触发的清理策略，代替每个batch都做的gc.collect和empty_cache。
+
+    只有当前进程的常驻内存超过MINERU_CLEAN_RSS_WATERMARK(单位GB，默认为总内存的一半)，
+    或保留显存超过MINERU_CLEAN_VRAM_WATERMARK(占显存的比例，默认0.85，
+    显存大小可由MINERU_VIRTUAL_VRAM_SIZE指定)时才执行clean_memory，
+    并统计检查次数、清理次数和清理耗时。
+
+    设置MINERU_CLEAN_RAM_WATERMARK(占总内存的比例)时，系统整体内存占用超过该比例也会触发清理，
+    共享机器上其他进程的内存占用会影响该判断，默认不启用。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vram_totals = {}
+        self._default_rss_watermark = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.checks = 0
+        self.cleanups = 0
+        self.cleanup_time = 0.0
+        self.cleanups_by_reason = {}
+
+    def _vram_total(self, device):
+        if device not in self._vram_totals:
+            total = get_vram(device)
+            if total is not None:
+                total = float(os.getenv("MINERU_VIRTUAL_VRAM_SIZE", total))
+            self._vram_totals[device] = total * 1024**3 if total else None
+        return self._vram_totals[device]
+
+    def _rss_watermark(self):
+        rss_watermark = os.getenv("MINERU_CLEAN_RSS_WATERMARK")
+        if rss_watermark is not None:
+            return float(rss_watermark) * 1024**3
+        if self._default_rss_watermark is None:
+            self._default_rss_watermark = psutil.virtual_memory().total / 2
+        return self._default_rss_watermark
+
+    def under_pressure(self, device) -> bool:
+        if get_process_rss() > self._rss_watermark():
+            return True
+        ram_watermark = os.getenv("MINERU_CLEAN_RAM_WATERMARK")
+        if ram_watermark is not None and psutil.virtual_memory().percent / 100 > float(
+            ram_watermark
+        ):
+            return True
+        device = str(device)
+        if device.startswith("cuda") or device.startswith("npu"):
+            vram_total = self._vram_total(device)
+            vram_watermark = float(os.getenv("MINERU_CLEAN_VRAM_WATERMARK", 0.85))
+            if vram_total and get_reserved_vram(device) / vram_total > vram_watermark:
+                return True
+        return False
+
+    def maybe_clean(self, device, reason="") -> bool:
+        """内存压力超过水位线时清理，返回是否执行了清理"""
+        with self._lock:
+            self.checks += 1
+            if not self.under_pressure(device):
+                return False
+            start = time.perf_counter()
+            clean_memory(str(device))
+            self.cleanups += 1
+            self.cleanup_time += time.perf_counter() - start
+            self.cleanups_by_reason[reason] = self.cleanups_by_reason.get(reason, 0) + 1
+            return True
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "cleanups": self.cleanups,
+            "cleanup_time": self.cleanup_time,
+            "cleanups_by_reason": dict(self.cleanups_by_reason),
+        }
+
+    def log_stats(self, reset=True):
+        if self.checks:
+            logger.info(
+                f"memory cleanup: {self.cleanups}/{self.checks} checks triggered, "
+                f"{self.cleanup_time:.2f}s spent, by reason: {self.cleanups_by_reason}"
+            )
+        if reset:
+            self.reset_stats()
+
+
+memory_cleanup_policy = MemoryCleanupPolicy()
+
+
+def maybe_clean_memory(device, reason=""):
+    return memory_cleanup_policy.maybe_clean(device, reason)
+
+
+def get_process_rss():
+    """当前进程常驻内存(字节)"""
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def get_allocated_vram(device):
+    """当前进程在device上已分配的显存(字节)，非GPU设备返回0"""
+    torch, torch_npu = _import_torch()
+    try:
+        if str(device).startswith("cuda") and torch.cuda.is_available():
+            return torch.cuda.memory_allocated(device)
+        elif str(device).startswith("npu") and torch_npu.npu.is_available():
+            return torch_npu.npu.memory_allocated(device)
+    except Exception:
+        pass
+    return 0
+
+
 def get_vram(device):
+    torch, torch_npu = _import_torch()
     if torch.cuda.is_available() and str(device).startswith("cuda"):
         total_memory = torch.cuda.get_device_properties(device).total_memory / (
             1024**3
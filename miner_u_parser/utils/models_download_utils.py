@@ -1,22 +1,169 @@
+import hashlib
+import json
 import os
-from huggingface_hub import snapshot_download as hf_snapshot_download
+import threading
 
+from loguru import logger
+
+from miner_u_parser.utils.config_reader import get_local_models_dir
 from miner_u_parser.utils.enum_class import ModelPath
 
+# 已解析的模型清单(根目录 + 每个文件的大小和sha256)，进程内只解析一次，
+# 并持久化到磁盘，下次启动时本地文件完整即不再访问huggingface_hub
+MODEL_PATH_MANIFEST = os.getenv(
+    "MINERU_MODEL_PATH_MANIFEST",
+    os.path.join(os.path.expanduser("~"), ".cache", "mineru", "model_paths.json"),
+)
+
+_manifest = None
+_resolved_model_roots = {}
+_manifest_lock = threading.RLock()
+
+
+def get_model_source() -> str:
+    """模型来源，huggingface(默认)或local；local模式下只使用本地模型目录，从不访问网络"""
+    return os.getenv("MINERU_MODEL_SOURCE", "huggingface").lower()
+
+
+def get_local_pipeline_models_dir():
+    models_dir = os.getenv("MINERU_MODELS_DIR") or get_local_models_dir()
+    if isinstance(models_dir, dict):
+        models_dir = models_dir.get("pipeline")
+    return models_dir
+
+
+def _iter_model_files(root: str, relative_path: str):
+    model_path = os.path.join(root, relative_path)
+    if os.path.isfile(model_path):
+        yield relative_path
+    elif os.path.isdir(model_path):
+        for dir_path, _, file_names in os.walk(model_path):
+            for file_name in sorted(file_names):
+                yield os.path.relpath(os.path.join(dir_path, file_name), root)
+
+
+def _sha256(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_manifest_entry(root: str, relative_path: str) -> dict:
+    files = {}
+    for file_rel_path in _iter_model_files(root, relative_path):
+        file_path = os.path.join(root, file_rel_path)
+        files[file_rel_path] = {
+            "size": os.path.getsize(file_path),
+            "sha256": _sha256(file_path),
+        }
+    return {"root": root, "files": files}
+
+
+def verify_manifest_entry(entry: dict, checksum: bool = False) -> list:
+    """校验清单条目，返回有问题的文件列表[(文件路径, 原因)]。
+
+    默认只比较文件是否存在及大小，checksum=True时额外校验sha256。
+    """
+    problems = []
+    root = entry.get("root", "")
+    files = entry.get("files", {})
+    if not files:
+        return [(root, "no files recorded")]
+    for file_rel_path, file_info in files.items():
+        file_path = os.path.join(root, file_rel_path)
+        if not os.path.isfile(file_path):
+            problems.append((file_path, "missing"))
+        elif os.path.getsize(file_path) != file_info["size"]:
+            problems.append((file_path, "size mismatch"))
+        elif checksum and _sha256(file_path) != file_info["sha256"]:
+            problems.append((file_path, "checksum mismatch"))
+    return problems
+
+
+def _load_manifest() -> dict:
+    global _manifest
+    if _manifest is None:
+        _manifest = {}
+        if os.path.exists(MODEL_PATH_MANIFEST):
+            try:
+                with open(MODEL_PATH_MANIFEST, "r", encoding="utf-8") as f:
+                    _manifest = json.load(f)
+            except Exception as e:
+                logger.warning(f"failed to read model manifest {MODEL_PATH_MANIFEST}: {e}")
+    return _manifest
+
+
+def _save_manifest(manifest: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(MODEL_PATH_MANIFEST), exist_ok=True)
+        tmp_path = f"{MODEL_PATH_MANIFEST}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, MODEL_PATH_MANIFEST)
+    except Exception as e:
+        logger.warning(f"failed to write model manifest {MODEL_PATH_MANIFEST}: {e}")
+
+
+def _get_manifest_root(relative_path: str):
+    entry = _load_manifest().get(relative_path)
+    if not isinstance(entry, dict):
+        return None
+    checksum = os.getenv("MINERU_MODEL_VERIFY_CHECKSUM", "false").lower() == "true"
+    problems = verify_manifest_entry(entry, checksum=checksum)
+    if problems:
+        logger.warning(f"model manifest entry for {relative_path} is stale: {problems}")
+        return None
+    return entry["root"]
+
+
+def _get_local_root(relative_path: str) -> str:
+    models_dir = get_local_pipeline_models_dir()
+    if not models_dir:
+        raise FileNotFoundError(
+            "MINERU_MODEL_SOURCE is 'local' but no local models dir is configured, "
+            "set MINERU_MODELS_DIR or 'models-dir' in the config file"
+        )
+    if not os.path.exists(os.path.join(models_dir, relative_path)):
+        raise FileNotFoundError(
+            f"model {relative_path} not found in local models dir {models_dir}"
+        )
+    return models_dir
+
 
 def auto_download_and_get_model_root_path(relative_path: str) -> str:
     """
     Reliably downloads files or directories from Hugging Face for the pipeline.
     - If input is a file: returns the absolute path to the local file.
     - If input is a directory: returns the path to the directory in the local cache.
+    Each path is resolved once per process. In local mode only the local models
+    dir is used; otherwise paths recorded in the manifest whose files are still
+    intact are served without contacting the hub.
     :param relative_path: The relative path of the file or directory in the repository.
     :return: The absolute path to the cached model/file.
     """
     repo = ModelPath.pipeline_root_hf
+    relative_path = relative_path.strip("/")
+
+    with _manifest_lock:
+        if relative_path in _resolved_model_roots:
+            return _resolved_model_roots[relative_path]
+
+        if get_model_source() == "local":
+            cache_dir = _get_local_root(relative_path)
+            _resolved_model_roots[relative_path] = cache_dir
+            return cache_dir
+
+        cache_dir = _get_manifest_root(relative_path)
+        if cache_dir is not None:
+            _resolved_model_roots[relative_path] = cache_dir
+            return cache_dir
+
+    from huggingface_hub import snapshot_download as hf_snapshot_download
 
     snapshot_download = hf_snapshot_download
 
-    relative_path = relative_path.strip("/")
     cache_dir = snapshot_download(
         repo, allow_patterns=[relative_path, relative_path + "/*"]
     )
@@ -26,4 +173,71 @@ def auto_download_and_get_model_root_path(relative_path: str) -> str:
             f"Failed to download model: {relative_path} from {repo}"
         )
 
+    with _manifest_lock:
+        manifest = _load_manifest()
+        manifest[relative_path] = build_manifest_entry(cache_dir, relative_path)
+        _save_manifest(manifest)
+        _resolved_model_roots[relative_path] = cache_dir
+
     return cache_dir
+
+
+def get_required_model_paths(formula_enable=True, table_enable=True, lang_list=None):
+    """列出按当前配置解析文档需要的全部模型相对路径"""
+    from miner_u_parser.model.ocr.paddleocr2pytorch.pytorch_paddle import (
+        get_ocr_model_relative_paths,
+    )
+    from miner_u_parser.utils.config_reader import get_device
+
+    required = [ModelPath.doclayout_yolo, ModelPath.layout_reader]
+    if formula_enable:
+        required += [ModelPath.yolo_v8_mfd, ModelPath.unimernet_small]
+    if table_enable:
+        required += [
+            ModelPath.slanet_plus,
+            ModelPath.unet_structure,
+            ModelPath.paddle_table_cls,
+            ModelPath.paddle_orientation_classification,
+        ]
+
+    device = get_device()
+    # 表格方向分类固定使用ch_lite，lang为None时使用默认的ch
+    ocr_langs = {lang or "ch" for lang in (lang_list or [None])}
+    if table_enable:
+        ocr_langs.update(["ch", "ch_lite"])
+    for lang in sorted(ocr_langs):
+        det_path, rec_path, _ = get_ocr_model_relative_paths(lang, device)
+        required += [det_path, rec_path]
+    return list(dict.fromkeys(required))
+
+
+def check_model_weights(relative_paths) -> list:
+    """在处理任何页面前解析全部模型路径，返回缺失的模型及原因[(相对路径, 原因)]"""
+    missing = []
+    for relative_path in relative_paths:
+        try:
+            root = auto_download_and_get_model_root_path(relative_path)
+        except Exception as e:
+            missing.append((relative_path, str(e)))
+            continue
+        if not os.path.exists(os.path.join(root, relative_path.strip("/"))):
+            missing.append((relative_path, f"not found under {root}"))
+    return missing
+
+
+_checked_model_configs = set()
+
+
+def ensure_model_weights(formula_enable=True, table_enable=True, lang_list=None):
+    """检查模型权重是否齐全，缺失时输出完整报告并抛出FileNotFoundError"""
+    config_key = (formula_enable, table_enable, tuple(sorted(set(lang_list or []))))
+    if config_key in _checked_model_configs:
+        return
+    required = get_required_model_paths(formula_enable, table_enable, lang_list)
+    missing = check_model_weights(required)
+    if missing:
+        report = "\n".join(f"  {path}: {reason}" for path, reason in missing)
+        logger.error(f"{len(missing)}/{len(required)} model weights missing:\n{report}")
+        raise FileNotFoundError(f"missing model weights:\n{report}")
+    logger.info(f"all {len(required)} model weights resolved")
+    _checked_model_configs.add(config_key)
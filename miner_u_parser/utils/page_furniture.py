@@ -0,0 +1,221 @@
+import copy
+import os
+import weakref
+
+import numpy as np
+from loguru import logger
+
+from miner_u_parser.utils.enum_class import BlockType
+from miner_u_parser.utils.result_cache import hash_array
+
+
+class PageFurnitureTracker:
+    """文档级的页眉页脚(重复出现的discarded块)识别。
+
+    按页序处理discarded块，以块在页面中的相对位置和块内墨迹像素的hash作为key。
+    同一个key在前面的页面中出现次数达到min_repeats后，后续页面的该块视为已确认的
+    重复内容。doc_analyze为每个文档创建tracker，在BatchAnalyze的ocr-det之前通过
+    skip_repeated_regions剔除这些区域，不再做ocr-det和ocr-rec；构建middle json时
+    split_repeated沿用同一份判定，不再参与span抽取、字符填充和fix_discarded_block，
+    在文档的后置ocr完成后直接复制首次出现时的处理结果。
+
+    页码等每页不同的内容像素不同，不会被跳过。
+    """
+
+    def __init__(self, min_repeats=2, position_grid=0.01, ink_threshold=200):
+        self.min_repeats = min_repeats
+        self.position_grid = position_grid
+        self.ink_threshold = ink_threshold
+        self._seen_counts = {}
+        # 模型阶段每页判定为重复的key，没有记录的页面在middle json阶段自行计数判定
+        self._page_repeats = {}
+        self._det_box_counts = {}
+        self._sources = {}
+        self._source_ocr_counts = {}
+        self._placeholders = []
+        self.skipped_det_regions = 0
+        self.skipped_rec_crops = 0
+        self.skipped_blocks = 0
+        self.skipped_spans = 0
+        self.skipped_ocr_spans = 0
+
+    def block_key(self, bbox, page_pil_img, scale=1):
+        """bbox为页面坐标，乘以scale后对应page_pil_img中的像素坐标"""
+        x0, y0, x1, y1 = [int(round(v * scale)) for v in bbox]
+        crop = np.asarray(page_pil_img.crop((x0, y0, x1, y1)).convert("L"))
+        ink = crop < self.ink_threshold
+        if not ink.any():
+            return None
+        # 按墨迹的外接框裁剪，消除layout框的抖动
+        rows = np.flatnonzero(ink.any(axis=1))
+        cols = np.flatnonzero(ink.any(axis=0))
+        ink = np.ascontiguousarray(ink[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1])
+        position = (
+            round((x0 + cols[0]) / page_pil_img.width / self.position_grid),
+            round((y0 + rows[0]) / page_pil_img.height / self.position_grid),
+        )
+        return hash_array(ink, position)
+
+    def _safe_key(self, bbox, page_pil_img, scale=1):
+        try:
+            return self.block_key(bbox, page_pil_img, scale)
+        except Exception as e:
+            logger.debug(f"failed to hash discarded block {bbox}: {e}")
+            return None
+
+    def _is_repeated(self, key):
+        return key is not None and self._seen_counts.get(key, 0) >= self.min_repeats
+
+    def _count_page(self, keys):
+        for key in set(keys) - {None}:
+            self._seen_counts[key] = self._seen_counts.get(key, 0) + 1
+
+    def skip_repeated_regions(self, ocr_res_list, page_pil_img, page_index, ocr_enable):
+        """模型阶段：从需要ocr-det的区域中剔除已确认重复的discarded区域(category_id为2)。
+
+        返回(剩余区域, {id(区域): key})。后者只包含还没有记录检测框数量的区域，ocr-det后
+        通过record_det_boxes记录，用于统计后续重复区域省去的ocr-rec次数。
+        """
+        remaining, page_keys, repeated, region_keys = [], [], set(), {}
+        for res in ocr_res_list:
+            if int(res["category_id"]) != 2:
+                remaining.append(res)
+                continue
+            poly = res["poly"]
+            key = self._safe_key((poly[0], poly[1], poly[4], poly[5]), page_pil_img)
+            if self._is_repeated(key):
+                repeated.add(key)
+                self.skipped_det_regions += 1
+                if ocr_enable:
+                    self.skipped_rec_crops += self._det_box_counts.get(key, 0)
+                continue
+            if key is not None and key not in self._det_box_counts:
+                region_keys[id(res)] = key
+            remaining.append(res)
+            page_keys.append(key)
+        self._count_page(page_keys)
+        self._page_repeats[page_index] = repeated
+        return remaining, region_keys
+
+    def record_det_boxes(self, key, count):
+        self._det_box_counts.setdefault(key, count)
+
+    def split_repeated(self, discarded_blocks, page_pil_img, scale, page_index):
+        """将页面的discarded块分为需要正常处理的块和已确认重复的块。
+
+        返回(需要处理的块, 对应的key列表, 重复块的(原位置, 占位dict)列表)。
+        """
+        page_repeats = self._page_repeats.get(page_index)
+        remaining_blocks, remaining_keys, placeholders = [], [], []
+        for index, block in enumerate(discarded_blocks):
+            key = None
+            if block[7] == BlockType.DISCARDED:
+                key = self._safe_key(block[0:4], page_pil_img, scale)
+            if page_repeats is None:
+                repeated = self._is_repeated(key)
+            else:
+                repeated = key is not None and key in page_repeats
+            if repeated:
+                placeholder = {"type": BlockType.DISCARDED, "bbox": block[0:4], "lines": []}
+                self._placeholders.append((placeholder, key))
+                placeholders.append((index, placeholder))
+                continue
+            remaining_blocks.append(block)
+            remaining_keys.append(key)
+        if page_repeats is None:
+            self._count_page(remaining_keys)
+        return remaining_blocks, remaining_keys, placeholders
+
+    def drop_spans_in(self, spans, placeholders, overlap_fn, ratio=0.8):
+        """删除基本落在已确认重复块中的span(与块重叠的面积占span自身面积的比例不低于ratio)，
+        它们不再需要字符填充和ocr；与重复块只有部分重叠的正文span保留"""
+        if not placeholders:
+            return spans
+        return [
+            span
+            for span in spans
+            if not any(
+                overlap_fn(span["bbox"], placeholder["bbox"]) >= ratio
+                for _, placeholder in placeholders
+            )
+        ]
+
+    @staticmethod
+    def restore_order(fixed_blocks, placeholders):
+        """将占位dict插回discarded块原来的位置，保持discarded_blocks的顺序不变"""
+        if not placeholders:
+            return fixed_blocks
+        blocks = []
+        remaining = iter(fixed_blocks)
+        for index, placeholder in placeholders:
+            while len(blocks) < index:
+                blocks.append(next(remaining))
+            blocks.append(placeholder)
+        blocks.extend(remaining)
+        return blocks
+
+    def register(self, keys, fixed_blocks):
+        """记录每个key首次处理得到的block，作为后续重复块的复制来源"""
+        for key, block in zip(keys, fixed_blocks):
+            if key is not None and key not in self._sources:
+                self._sources[key] = block
+                # 此时需要后置ocr的span还带着截图
+                self._source_ocr_counts[key] = sum(
+                    1
+                    for line in block.get("lines", [])
+                    for span in line["spans"]
+                    if "np_img" in span
+                )
+
+    def resolve(self):
+        """在后置ocr完成后，将首次出现的block内容复制到重复块的占位dict中，
+        行和span的bbox按两个块的位移平移到占位块上"""
+        for placeholder, key in self._placeholders:
+            source = self._sources.get(key)
+            if source is None:
+                continue
+            bbox = placeholder["bbox"]
+            dx = bbox[0] - source["bbox"][0]
+            dy = bbox[1] - source["bbox"][1]
+            placeholder.update(copy.deepcopy(source))
+            placeholder["bbox"] = bbox
+            spans = []
+            for line in placeholder.get("lines", []):
+                line["bbox"] = _shift_bbox(line["bbox"], dx, dy)
+                for span in line["spans"]:
+                    span["bbox"] = _shift_bbox(span["bbox"], dx, dy)
+                    spans.append(span)
+            self.skipped_blocks += 1
+            self.skipped_spans += len(spans)
+            self.skipped_ocr_spans += self._source_ocr_counts.get(key, 0)
+        self._placeholders = []
+
+    def log_stats(self):
+        if self.skipped_det_regions or self.skipped_blocks:
+            logger.info(
+                f"page furniture: {self.skipped_det_regions} repeated regions skipped OCR-det, "
+                f"{self.skipped_rec_crops} OCR-rec crops avoided in BatchAnalyze; "
+                f"{self.skipped_blocks} discarded blocks copied, {self.skipped_spans} spans, "
+                f"{self.skipped_ocr_spans} post OCR-rec crops avoided"
+            )
+
+
+def _shift_bbox(bbox, dx, dy):
+    x0, y0, x1, y1 = bbox
+    return [x0 + dx, y0 + dy, x1 + dx, y1 + dy]
+
+
+_document_trackers = weakref.WeakKeyDictionary()
+
+
+def furniture_skip_enabled() -> bool:
+    return os.getenv("MINERU_SKIP_PAGE_FURNITURE", "true").lower() == "true"
+
+
+def set_document_furniture_tracker(pdf_doc, tracker: PageFurnitureTracker):
+    """将模型阶段的判定绑定到pdf_doc上，构建middle json时沿用"""
+    _document_trackers[pdf_doc] = tracker
+
+
+def get_document_furniture_tracker(pdf_doc):
+    return _document_trackers.get(pdf_doc)
@@ -4,29 +4,25 @@ from io import BytesIO
 import numpy as np
 import pypdfium2 as pdfium
 from loguru import logger
-from pdfminer.high_level import extract_text
-from pdfminer.pdfparser import PDFParser
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfinterp import PDFResourceManager
-from pdfminer.pdfinterp import PDFPageInterpreter
-from pdfminer.layout import LAParams, LTImage, LTFigure
-from pdfminer.converter import PDFPageAggregator
 
 
-def classify(pdf_bytes):
+def classify(pdf_bytes, text_layer=None, page_indices=None):
     """
     判断PDF文件是可以直接提取文本还是需要OCR
 
     Args:
         pdf_bytes: PDF文件的字节数据
+        text_layer: 可选，文档的DocumentTextLayer，提供时直接用其中的字符统计，不再重复提取文本
+        page_indices: 可选，抽样检查的页码，默认随机选择；与text_layer同时提供时其中需包含这些页
 
     Returns:
         str: 'txt' 表示可以直接提取文本，'ocr' 表示需要OCR
     """
 
     # 从字节数据加载PDF
-    sample_pdf_bytes = extract_pages(pdf_bytes)
+    if page_indices is None:
+        page_indices = sample_page_indices(pdf_bytes)
+    sample_pdf_bytes = extract_pages(pdf_bytes, page_indices)
     pdf = pdfium.PdfDocument(sample_pdf_bytes)
     try:
         # 获取PDF页数
@@ -43,9 +39,13 @@ def classify(pdf_bytes):
         chars_threshold = 50
 
         # 检查平均字符数和无效字符
-        if (
-            get_avg_cleaned_chars_per_page(pdf, pages_to_check) < chars_threshold
-        ) or detect_invalid_chars(sample_pdf_bytes):
+        if text_layer is not None:
+            avg_cleaned_chars = text_layer.avg_cleaned_chars_per_page(page_indices)
+        else:
+            avg_cleaned_chars = get_avg_cleaned_chars_per_page(pdf, pages_to_check)
+        if (avg_cleaned_chars < chars_threshold) or detect_invalid_chars(
+            sample_pdf_bytes
+        ):
             return "ocr"
 
         # 检查图像覆盖率
@@ -90,6 +90,14 @@ def get_avg_cleaned_chars_per_page(pdf_doc, pages_to_check):
 
 
 def get_high_image_coverage_ratio(sample_pdf_bytes, pages_to_check):
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfinterp import PDFResourceManager
+    from pdfminer.pdfinterp import PDFPageInterpreter
+    from pdfminer.layout import LAParams, LTImage, LTFigure
+    from pdfminer.converter import PDFPageAggregator
+
     # 创建内存文件对象
     pdf_stream = BytesIO(sample_pdf_bytes)
 
@@ -178,12 +186,22 @@ def get_high_image_coverage_ratio(sample_pdf_bytes, pages_to_check):
     return high_coverage_ratio
 
 
-def extract_pages(src_pdf_bytes: bytes) -> bytes:
+def sample_page_indices(src_pdf_bytes: bytes) -> list:
+    """从PDF中随机选择最多10页，返回页码列表"""
+    pdf = pdfium.PdfDocument(src_pdf_bytes)
+    total_page = len(pdf)
+    pdf.close()
+    select_page_cnt = min(10, total_page)
+    return np.random.choice(total_page, select_page_cnt, replace=False).tolist()
+
+
+def extract_pages(src_pdf_bytes: bytes, page_indices: list = None) -> bytes:
     """
     从PDF字节数据中随机提取最多10页，返回新的PDF字节数据
 
     Args:
         src_pdf_bytes: PDF文件的字节数据
+        page_indices: 可选，指定提取的页码，默认随机选择
 
     Returns:
         bytes: 提取页面后的PDF字节数据
@@ -199,11 +217,12 @@ def extract_pages(src_pdf_bytes: bytes) -> bytes:
         logger.warning("PDF is empty, return empty document")
         return b""
 
-    # 选择最多10页
-    select_page_cnt = min(10, total_page)
+    if page_indices is None:
+        # 选择最多10页
+        select_page_cnt = min(10, total_page)
 
-    # 从总页数中随机选择页面
-    page_indices = np.random.choice(total_page, select_page_cnt, replace=False).tolist()
+        # 从总页数中随机选择页面
+        page_indices = np.random.choice(total_page, select_page_cnt, replace=False).tolist()
 
     # 创建一个新的PDF文档
     sample_docs = pdfium.PdfDocument.new()
@@ -229,6 +248,9 @@ def detect_invalid_chars(sample_pdf_bytes: bytes) -> bool:
     """ "
     检测PDF中是否包含非法字符
     """
+    from pdfminer.high_level import extract_text
+    from pdfminer.layout import LAParams
+
     """pdfminer比较慢,需要先随机抽取10页左右的sample"""
     # sample_pdf_bytes = extract_pages(src_pdf_bytes)
     sample_pdf_file_like_object = BytesIO(sample_pdf_bytes)
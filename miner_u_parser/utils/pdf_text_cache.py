@@ -0,0 +1,276 @@
+import os
+import re
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pypdfium2 as pdfium
+from loguru import logger
+
+from miner_u_parser.utils.pdf_text_tool import get_page
+
+# 每个进程至少分到的页数，页数太少时进程启动的开销大于并行收益
+MIN_PAGES_PER_WORKER = 32
+
+
+def get_text_layer_workers() -> int:
+    return int(os.getenv("MINERU_TEXT_LAYER_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def _bbox_list(bbox):
+    # pdftext的行、span框是Bbox对象，字符框可以直接下标访问
+    bbox = getattr(bbox, "bbox", bbox)
+    return [bbox[0], bbox[1], bbox[2], bbox[3]]
+
+
+def _is_rotated(rotation) -> bool:
+    # 旋转角度在0-90度之间的行不参与文本层的使用
+    return 0 < abs(rotation) < 90
+
+
+class PageTextLayer:
+    """单页文本层的紧凑表示。
+
+    字符框、行框存为float32数组，字符和span文本存为字符串表的下标，
+    行→span→字符的层级关系用偏移数组表示。对象可以被pickle，用于多进程提取。
+    """
+
+    __slots__ = (
+        "strings",
+        "char_bboxes",
+        "char_ids",
+        "char_idx",
+        "span_char_offsets",
+        "span_text_ids",
+        "line_bboxes",
+        "line_rotations",
+        "line_span_offsets",
+        "cleaned_char_count",
+    )
+
+    def __init__(
+        self,
+        strings,
+        char_bboxes,
+        char_ids,
+        char_idx,
+        span_char_offsets,
+        span_text_ids,
+        line_bboxes,
+        line_rotations,
+        line_span_offsets,
+        cleaned_char_count,
+    ):
+        self.strings = strings
+        self.char_bboxes = char_bboxes
+        self.char_ids = char_ids
+        self.char_idx = char_idx
+        self.span_char_offsets = span_char_offsets
+        self.span_text_ids = span_text_ids
+        self.line_bboxes = line_bboxes
+        self.line_rotations = line_rotations
+        self.line_span_offsets = line_span_offsets
+        self.cleaned_char_count = cleaned_char_count
+
+    @classmethod
+    def from_page_dict(cls, page_dict):
+        string_ids = {}
+        strings = []
+
+        def intern(text):
+            string_id = string_ids.get(text)
+            if string_id is None:
+                string_id = string_ids[text] = len(strings)
+                strings.append(text)
+            return string_id
+
+        char_bboxes, char_ids, char_idx = [], [], []
+        span_char_offsets, span_text_ids = [0], []
+        line_bboxes, line_rotations, line_span_offsets = [], [], [0]
+        for block in page_dict["blocks"]:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    for char in span["chars"]:
+                        char_bboxes.append(_bbox_list(char["bbox"]))
+                        char_ids.append(intern(char["char"]))
+                        char_idx.append(char["char_idx"])
+                    span_char_offsets.append(len(char_ids))
+                    span_text_ids.append(intern(span["text"]))
+                line_bboxes.append(_bbox_list(line["bbox"]))
+                line_rotations.append(line["rotation"])
+                line_span_offsets.append(len(span_text_ids))
+
+        char_ids = np.asarray(char_ids, dtype=np.int32)
+        # 去掉空白后的字符数，按字符串表统计，供pdf分类使用
+        string_counts = np.bincount(char_ids, minlength=len(strings))
+        cleaned_char_count = int(
+            sum(
+                count * len(re.sub(r"\s+", "", text))
+                for count, text in zip(string_counts.tolist(), strings)
+                if count
+            )
+        )
+        return cls(
+            strings=strings,
+            char_bboxes=np.asarray(char_bboxes, dtype=np.float32).reshape(-1, 4),
+            char_ids=char_ids,
+            char_idx=np.asarray(char_idx, dtype=np.int64),
+            span_char_offsets=np.asarray(span_char_offsets, dtype=np.int64),
+            span_text_ids=np.asarray(span_text_ids, dtype=np.int32),
+            line_bboxes=np.asarray(line_bboxes, dtype=np.float32).reshape(-1, 4),
+            line_rotations=np.asarray(line_rotations, dtype=np.float32),
+            line_span_offsets=np.asarray(line_span_offsets, dtype=np.int64),
+            cleaned_char_count=cleaned_char_count,
+        )
+
+    @classmethod
+    def from_pdf_page(cls, pdf_page):
+        return cls.from_page_dict(get_page(pdf_page))
+
+    def line_text(self, line_index) -> str:
+        start, end = self.line_span_offsets[line_index : line_index + 2]
+        return "".join(self.strings[i] for i in self.span_text_ids[start:end])
+
+    def lines(self, skip_rotated=True):
+        """按顺序返回行，每行为{"bbox": [x0, y0, x1, y1], "text": 行内各span文本拼接}"""
+        lines = []
+        for i, bbox in enumerate(self.line_bboxes.tolist()):
+            if skip_rotated and _is_rotated(self.line_rotations[i]):
+                continue
+            lines.append({"bbox": bbox, "text": self.line_text(i)})
+        return lines
+
+    def char_mask(self, skip_rotated=True):
+        """字符是否属于需要保留的行"""
+        if not skip_rotated:
+            return np.ones(len(self.char_ids), dtype=bool)
+        line_char_counts = np.diff(self.span_char_offsets[self.line_span_offsets])
+        rotated = (np.abs(self.line_rotations) > 0) & (np.abs(self.line_rotations) < 90)
+        return ~np.repeat(rotated, line_char_counts)
+
+    def char_arrays(self, skip_rotated=True):
+        """返回(字符框float32数组, 字符列表, char_idx数组)，供字符填充按数组计算"""
+        mask = self.char_mask(skip_rotated)
+        texts = [self.strings[char_id] for char_id in self.char_ids[mask].tolist()]
+        return self.char_bboxes[mask], texts, self.char_idx[mask]
+
+    def chars(self, skip_rotated=True):
+        """按顺序返回字符dict，格式与pdftext的char一致(bbox, char, char_idx)"""
+        mask = self.char_mask(skip_rotated)
+        bboxes = self.char_bboxes[mask].tolist()
+        char_ids = self.char_ids[mask].tolist()
+        char_idx = self.char_idx[mask].tolist()
+        return [
+            {"bbox": bbox, "char": self.strings[char_id], "char_idx": idx}
+            for bbox, char_id, idx in zip(bboxes, char_ids, char_idx)
+        ]
+
+
+def _extract_pages(pdf_bytes, page_indices):
+    """子进程中打开文档并提取指定页面的文本层"""
+    pdf_doc = pdfium.PdfDocument(pdf_bytes)
+    try:
+        return {
+            page_idx: PageTextLayer.from_pdf_page(pdf_doc[page_idx])
+            for page_idx in page_indices
+        }
+    finally:
+        pdf_doc.close()
+
+
+class DocumentTextLayer:
+    """文档级的文本层缓存，每页的字符/行结构只提取一次。
+
+    供pdf分类、txt模式的文本层快速路径和span字符填充共用。没有提前提取的页面在
+    首次访问时从pdf_page提取。
+    """
+
+    def __init__(self, pages=None):
+        self._pages = dict(pages or {})
+
+    @classmethod
+    def extract(cls, pdf_bytes, page_indices=None, workers=None):
+        """提取文档中指定页面(默认全部)的文本层，页数较多时按页分片多进程并行。
+
+        pdfium不是线程安全的，所以并行使用进程而不是线程，每个进程各自打开文档。
+        """
+        if page_indices is None:
+            pdf_doc = pdfium.PdfDocument(pdf_bytes)
+            page_indices = list(range(len(pdf_doc)))
+            pdf_doc.close()
+        page_indices = list(page_indices)
+        if workers is None:
+            workers = get_text_layer_workers()
+        workers = max(1, min(workers, len(page_indices) // MIN_PAGES_PER_WORKER))
+
+        if workers > 1:
+            chunks = [page_indices[i::workers] for i in range(workers)]
+            try:
+                pages = {}
+                with ProcessPoolExecutor(
+                    max_workers=workers, mp_context=get_context("spawn")
+                ) as executor:
+                    for result in executor.map(
+                        _extract_pages, [pdf_bytes] * len(chunks), chunks
+                    ):
+                        pages.update(result)
+                return cls(pages)
+            except Exception as e:
+                logger.warning(f"parallel text layer extraction failed, fall back to serial: {e}")
+
+        return cls(_extract_pages(pdf_bytes, page_indices))
+
+    def extract_missing(self, pdf_bytes, page_indices=None, workers=None):
+        """补充提取指定页面(默认全部)中尚未提取的页面"""
+        if page_indices is None:
+            pdf_doc = pdfium.PdfDocument(pdf_bytes)
+            page_indices = range(len(pdf_doc))
+            pdf_doc.close()
+        missing = [i for i in page_indices if i not in self._pages]
+        if missing:
+            self._pages.update(type(self).extract(pdf_bytes, missing, workers)._pages)
+        return self
+
+    def page(self, page_idx, pdf_page=None) -> PageTextLayer:
+        layer = self._pages.get(page_idx)
+        if layer is None:
+            if pdf_page is None:
+                raise KeyError(f"text layer of page {page_idx} is not extracted")
+            layer = self._pages[page_idx] = PageTextLayer.from_pdf_page(pdf_page)
+        return layer
+
+    def has_page(self, page_idx) -> bool:
+        return page_idx in self._pages
+
+    def avg_cleaned_chars_per_page(self, page_indices) -> float:
+        page_indices = list(page_indices)
+        if not page_indices:
+            return 0.0
+        return sum(self._pages[i].cleaned_char_count for i in page_indices) / len(page_indices)
+
+
+_document_text_layers = weakref.WeakKeyDictionary()
+
+
+def set_document_text_layer(pdf_doc, text_layer: DocumentTextLayer):
+    """将文本层缓存绑定到pdf_doc上，文档对象释放时缓存随之释放"""
+    _document_text_layers[pdf_doc] = text_layer
+
+
+def get_document_text_layer(pdf_doc) -> DocumentTextLayer:
+    text_layer = _document_text_layers.get(pdf_doc)
+    if text_layer is None:
+        text_layer = _document_text_layers[pdf_doc] = DocumentTextLayer()
+    return text_layer
+
+
+def release_document_text_layer(pdf_doc):
+    _document_text_layers.pop(pdf_doc, None)
+
+
+def get_page_text_layer(pdf_doc, page_idx) -> PageTextLayer:
+    text_layer = get_document_text_layer(pdf_doc)
+    if text_layer.has_page(page_idx):
+        return text_layer.page(page_idx)
+    return text_layer.page(page_idx, pdf_doc[page_idx])
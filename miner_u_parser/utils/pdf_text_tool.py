@@ -2,8 +2,6 @@ from typing import List
 import math
 
 import pypdfium2 as pdfium
-from pdftext.pdf.chars import get_chars, deduplicate_chars
-from pdftext.pdf.pages import get_spans, get_lines, assign_scripts, get_blocks
 
 
 def get_page(
@@ -12,6 +10,8 @@ def get_page(
     superscript_height_threshold: float = 0.7,
     line_distance_threshold: float = 0.1,
 ) -> dict:
+        from pdftext.pdf.chars import get_chars, deduplicate_chars
+        from pdftext.pdf.pages import get_spans, get_lines, assign_scripts, get_blocks
 
         textpage = page.get_textpage()
         page_bbox: List[float] = page.get_bbox()
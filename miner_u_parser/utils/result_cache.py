@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from loguru import logger
+
+
+def hash_array(array, *extra) -> str:
+    """对图片像素(以及shape、dtype和额外参数)做精确hash，作为模型结果缓存的key"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{array.shape}|{array.dtype}|{extra}".encode("utf-8"))
+    h.update(memoryview(array if array.flags.c_contiguous else array.copy()))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """进程内LRU缓存，可选sqlite持久化层。
+
+    内存层按条目数限制大小，超出时淘汰最久未使用的条目；持久化层只做写入和读取，
+    命中后回填内存层。值需要可以被json序列化。
+    """
+
+    def __init__(self, name: str, max_entries: int, persist_path: str = None):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if persist_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(persist_path)), exist_ok=True)
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)"
+                )
+                self._db.commit()
+            except Exception as e:
+                logger.warning(f"failed to open {name} cache at {persist_path}: {e}")
+                self._db = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys) -> list:
+        """批量查询，未命中的位置返回None"""
+        values = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key is not None and key in self._entries:
+                    self._entries.move_to_end(key)
+                    values[i] = self._entries[key]
+                    self.memory_hits += 1
+                else:
+                    missing.append(i)
+
+            if self._db is not None and missing:
+                lookup_keys = list({keys[i] for i in missing if keys[i] is not None})
+                stored = {}
+                # sqlite单条语句的参数个数有限制，分批查询
+                for start in range(0, len(lookup_keys), 500):
+                    chunk = lookup_keys[start : start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    stored.update((key, json.loads(value)) for key, value in rows)
+                still_missing = []
+                for i in missing:
+                    if keys[i] in stored:
+                        values[i] = stored[keys[i]]
+                        self._put(keys[i], values[i])
+                        self.persistent_hits += 1
+                    else:
+                        still_missing.append(i)
+                missing = still_missing
+
+            self.misses += len(missing)
+        return values
+
+    def put_many(self, items) -> None:
+        items = [(key, value) for key, value in items if key is not None]
+        if not items:
+            return
+        with self._lock:
+            for key, value in items:
+                self._put(key, value)
+            if self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                        [(key, json.dumps(value, ensure_ascii=False)) for key, value in items],
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    logger.warning(f"failed to persist {self.name} cache entries: {e}")
+
+    def _put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "lookups": lookups,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+_result_caches = {}
+_result_caches_lock = threading.Lock()
+
+
+def get_result_cache(name: str, max_entries: int, persist_path: str = None):
+    """按名称获取进程内共享的缓存，max_entries<=0时返回None表示禁用缓存"""
+    if max_entries <= 0:
+        return None
+    with _result_caches_lock:
+        cache = _result_caches.get(name)
+        if cache is None:
+            cache = ResultCache(name, max_entries, persist_path)
+            _result_caches[name] = cache
+    return cache
+
+
+def log_result_cache_stats(reset=True):
+    """输出自上次报告以来各缓存的命中情况"""
+    with _result_caches_lock:
+        caches = list(_result_caches.values())
+    for cache in caches:
+        stats = cache.stats()
+        if not stats["lookups"]:
+            continue
+        logger.info(
+            f"{stats['name']} cache: {stats['hits']}/{stats['lookups']} hits "
+            f"({stats['hit_rate']:.1%}, {stats['persistent_hits']} from disk), "
+            f"{stats['entries']} entries in memory"
+        )
+        if reset:
+            cache.reset_stats()
@@ -1,5 +1,4 @@
 # Copyright (c) Opendatalab. All rights reserved.
-import collections
 import re
 import statistics
 
@@ -14,7 +13,6 @@ from miner_u_parser.utils.boxbase import (
 )
 from miner_u_parser.utils.enum_class import BlockType, ContentType
 from miner_u_parser.utils.pdf_image_tools import get_crop_img
-from miner_u_parser.utils.pdf_text_tool import get_page
 
 
 def remove_outside_spans(spans, all_bboxes, all_discarded_blocks):
@@ -156,22 +154,12 @@ def __replace_unicode(text: str):
 
 
 def txt_spans_extract(
-    pdf_page, spans, pil_img, scale, all_bboxes, all_discarded_blocks
+    page_text_layer, spans, pil_img, scale, all_bboxes, all_discarded_blocks
 ):
 
-    page_dict = get_page(pdf_page)
-
-    page_all_chars = []
-    page_all_lines = []
-    for block in page_dict["blocks"]:
-        for line in block["lines"]:
-            if 0 < abs(line["rotation"]) < 90:
-                # 旋转角度在0-90度之间的行，直接跳过
-                continue
-            page_all_lines.append(line)
-            for span in line["spans"]:
-                for char in span["chars"]:
-                    page_all_chars.append(char)
+    # 旋转角度在0-90度之间的行及其字符，直接跳过
+    page_all_chars = page_text_layer.char_arrays()
+    page_all_lines = page_text_layer.lines()
 
     # 计算所有sapn的高度的中位数
     span_height_list = []
@@ -220,12 +208,11 @@ def txt_spans_extract(
             for span in vertical_spans:
                 if (
                     calculate_overlap_area_in_bbox1_area_ratio(
-                        pdfium_line["bbox"].bbox, span["bbox"]
+                        pdfium_line["bbox"], span["bbox"]
                     )
                     > 0.5
                 ):
-                    for pdfium_span in pdfium_line["spans"]:
-                        span["content"] += pdfium_span["text"]
+                    span["content"] += pdfium_line["text"]
                     break
 
         for span in vertical_spans:
@@ -237,10 +224,9 @@ def txt_spans_extract(
 
     for span in useful_spans + unuseful_spans:
         if span["type"] in [ContentType.TEXT]:
-            span["chars"] = []
             new_spans.append(span)
 
-    need_ocr_spans = fill_char_in_spans(new_spans, page_all_chars, median_span_height)
+    need_ocr_spans = fill_char_in_spans(new_spans, page_all_chars)
 
     """对未填充的span进行ocr"""
     if len(need_ocr_spans) > 0:
@@ -261,33 +247,47 @@ def txt_spans_extract(
     return spans
 
 
-def fill_char_in_spans(spans, all_chars, median_span_height):
+def fill_char_in_spans(spans, page_chars, chunk_size=2048):
+    """将字符分配到span中并生成span的content，返回需要ocr的span。
+
+    page_chars为(字符框数组, 字符列表, char_idx数组)。字符与span的包含关系按
+    calculate_char_in_span的规则一次性用数组计算，每个字符分配给按y0排序后第一个
+    满足条件的span。
+    """
     # 简单从上到下排一下序
     spans = sorted(spans, key=lambda x: x["bbox"][1])
+    char_bboxes, char_texts, char_idx = page_chars
+    char_bboxes = np.asarray(char_bboxes, dtype=np.float64).reshape(-1, 4)
+    char_idx = np.asarray(char_idx)
+
+    char_span_ids = np.full(len(char_texts), -1, dtype=np.int64)
+    if len(spans) > 0 and len(char_texts) > 0:
+        span_bboxes = np.asarray([span["bbox"] for span in spans], dtype=np.float64)
+        char_texts_arr = np.asarray(char_texts)
+        is_stop = np.isin(char_texts_arr, LINE_STOP_FLAG)
+        # 同时属于两类的字符(如引号)按结尾符号处理
+        is_start = np.isin(char_texts_arr, LINE_START_FLAG) & ~is_stop
+        # 分块计算，限制(字符数, span数)矩阵的内存
+        for start in range(0, len(char_texts), chunk_size):
+            end = start + chunk_size
+            in_span = chars_in_spans_matrix(
+                char_bboxes[start:end], span_bboxes, is_stop[start:end], is_start[start:end]
+            )
+            matched = in_span.any(axis=1)
+            first_span = in_span.argmax(axis=1)
+            char_span_ids[start:end] = np.where(matched, first_span, -1)
 
-    grid_size = median_span_height
-    grid = collections.defaultdict(list)
-    for i, span in enumerate(spans):
-        start_cell = int(span["bbox"][1] / grid_size)
-        end_cell = int(span["bbox"][3] / grid_size)
-        for cell_idx in range(start_cell, end_cell + 1):
-            grid[cell_idx].append(i)
-
-    for char in all_chars:
-        char_center_y = (char["bbox"][1] + char["bbox"][3]) / 2
-        cell_idx = int(char_center_y / grid_size)
-
-        candidate_span_indices = grid.get(cell_idx, [])
-
-        for span_idx in candidate_span_indices:
-            span = spans[span_idx]
-            if calculate_char_in_span(char["bbox"], span["bbox"], char["char"]):
-                span["chars"].append(char)
-                break
+    # 按span分组，组内按char_idx排序
+    assigned = np.flatnonzero(char_span_ids >= 0)
+    order = assigned[np.lexsort((char_idx[assigned], char_span_ids[assigned]))]
+    bounds = np.searchsorted(char_span_ids[order], np.arange(len(spans) + 1))
 
     need_ocr_spans = []
-    for span in spans:
-        chars_to_content(span)
+    for i, span in enumerate(spans):
+        span_chars = order[bounds[i] : bounds[i + 1]]
+        chars_to_content(
+            span, [char_texts[j] for j in span_chars], char_bboxes[span_chars]
+        )
         # 有的span中虽然没有字但有一两个空的占位符，用宽高和content长度过滤
         if len(span["content"]) * span["height"] < span["width"] * 0.5:
             # logger.info(f"maybe empty span: {len(span['content'])}, {span['height']}, {span['width']}")
@@ -381,45 +381,60 @@ def calculate_char_in_span(
             return False
 
 
-def chars_to_content(span):
+def chars_in_spans_matrix(
+    char_bboxes, span_bboxes, is_stop, is_start, span_height_radio=Span_Height_Radio
+):
+    """calculate_char_in_span的数组版本，返回(字符数, span数)的bool矩阵"""
+    cx0, cy0, cx1, cy1 = (char_bboxes[:, i : i + 1] for i in range(4))
+    sx0, sy0, sx1, sy1 = (span_bboxes[None, :, i] for i in range(4))
+    char_center_x = (cx0 + cx1) / 2
+    char_center_y = (cy0 + cy1) / 2
+    span_height = sy1 - sy0
+
+    # 所有规则共同的高度判定
+    in_height = (
+        (sy0 < char_center_y)
+        & (char_center_y < sy1)
+        & (np.abs(char_center_y - (sy0 + sy1) / 2) < span_height * span_height_radio)
+    )
+    by_center = (sx0 < char_center_x) & (char_center_x < sx1)
+    # 结尾符号：左边界在span内且离span右边界较近
+    by_stop = (
+        ((sx1 - span_height) < cx0) & (cx0 < sx1) & (char_center_x > sx0)
+    ) & is_stop[:, None]
+    # 开头符号：右边界在span内且离span左边界较近
+    by_start = (
+        (sx0 < cx1) & (cx1 < (sx0 + span_height)) & (char_center_x < sx1)
+    ) & is_start[:, None]
+    return in_height & (by_center | by_stop | by_start)
+
+
+def chars_to_content(span, char_texts, char_bboxes):
+    """用span内按char_idx排序后的字符生成content，字符间距较大时插入空格"""
     # 检查span中的char是否为空
-    if len(span["chars"]) == 0:
-        pass
-    else:
-        # 给chars按char_idx排序
-        span["chars"] = sorted(span["chars"], key=lambda x: x["char_idx"])
-
-        # Calculate the width of each character
-        char_widths = [char["bbox"][2] - char["bbox"][0] for char in span["chars"]]
-        # Calculate the median width
-        median_width = statistics.median(char_widths)
-
-        content = ""
-        for char in span["chars"]:
-
-            # 如果下一个char的x0和上一个char的x1距离超过0.25个字符宽度，则需要在中间插入一个空格
-            char1 = char
-            char2 = (
-                span["chars"][span["chars"].index(char) + 1]
-                if span["chars"].index(char) + 1 < len(span["chars"])
-                else None
-            )
-            if (
-                char2
-                and char2["bbox"][0] - char1["bbox"][2] > median_width * 0.25
-                and char["char"] != " "
-                and char2["char"] != " "
-            ):
-                content += f"{char['char']} "
-            else:
-                content += char["char"]
-
-        content = __replace_unicode(content)
-        content = __replace_ligatures(content)
-        content = __replace_ligatures(content)
-        span["content"] = content.strip()
-
-    del span["chars"]
+    if len(char_texts) == 0:
+        return
+
+    # Calculate the width of each character
+    char_widths = (char_bboxes[:, 2] - char_bboxes[:, 0]).tolist()
+    # Calculate the median width
+    median_width = statistics.median(char_widths)
+
+    # 如果下一个char的x0和上一个char的x1距离超过0.25个字符宽度，则需要在中间插入一个空格
+    wide_gaps = (char_bboxes[1:, 0] - char_bboxes[:-1, 2] > median_width * 0.25).tolist()
+    pieces = []
+    for i, char in enumerate(char_texts[:-1]):
+        if wide_gaps[i] and char != " " and char_texts[i + 1] != " ":
+            pieces.append(f"{char} ")
+        else:
+            pieces.append(char)
+    pieces.append(char_texts[-1])
+    content = "".join(pieces)
+
+    content = __replace_unicode(content)
+    content = __replace_ligatures(content)
+    content = __replace_ligatures(content)
+    span["content"] = content.strip()
 
 
 def calculate_contrast(img, img_mode) -> float:
@@ -0,0 +1,65 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+from loguru import logger
+
+_IMPORT_TIME_PATTERN = re.compile(
+    r"^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<name>\s+.+)$"
+)
+
+
+def profile_import(module_name: str, top_n: int = 20) -> dict:
+    """在新的解释器中导入module_name，返回总耗时和按累计耗时排序的导入明细。
+
+    使用`python -X importtime`统计，不受当前进程已导入模块的影响。
+
+    Args:
+        module_name: 要导入的模块名
+        top_n: 返回累计耗时最长的前top_n个模块
+
+    Returns:
+        dict: {"module", "wall_time", "breakdown": [(name, cumulative_s, self_s), ...]}
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    wall_time = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module_name} failed:\n{proc.stderr[-2000:]}")
+
+    breakdown = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_TIME_PATTERN.match(line)
+        if match is None:
+            continue
+        name = match.group("name")
+        # 只统计顶层导入，嵌套导入的耗时已包含在上层的累计耗时中
+        if len(name) - len(name.lstrip()) > 1:
+            continue
+        name = name.strip()
+        breakdown.append(
+            (
+                name,
+                int(match.group("cumulative")) / 1e6,
+                int(match.group("self")) / 1e6,
+            )
+        )
+    breakdown.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "module": module_name,
+        "wall_time": wall_time,
+        "breakdown": breakdown[:top_n],
+    }
+
+
+def log_import_profile(profile: dict) -> None:
+    logger.info(f"import {profile['module']}: {profile['wall_time']:.2f}s")
+    for name, cumulative, self_time in profile["breakdown"]:
+        logger.info(f"  {name:<60} {cumulative:8.3f}s (self {self_time:.3f}s)")
@@ -1,13 +1,23 @@
 # Copyright (c) Opendatalab. All rights reserved.
 
+import re
+
 from loguru import logger
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 
 from miner_u_parser.utils.enum_class import BlockType, SplitFlag
 
 
+# 全角字母、数字和标点(FF01-FF5E)到半角的映射
+FULL_TO_HALF_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+
+# 序列化表格时标记行的插入位置，使用私有区字符避免与表格内容冲突
+ROW_INSERT_MARKER = "\ue000mineru-table-rows\ue000"
+TR_TAG_PATTERN = re.compile(r"<tr[\s>/]")
+
+
 def full_to_half(text: str) -> str:
-    """Convert full-width characters to half-width characters using code point manipulation.
+    """Convert full-width characters to half-width characters.
 
     Args:
         text: String containing full-width characters
@@ -15,15 +25,88 @@ def full_to_half(text: str) -> str:
     Returns:
         String with full-width characters converted to half-width
     """
-    result = []
-    for char in text:
-        code = ord(char)
-        # Full-width letters, numbers and punctuation (FF01-FF5E)
-        if 0xFF01 <= code <= 0xFF5E:
-            result.append(chr(code - 0xFEE0))  # Shift to ASCII range
-        else:
-            result.append(char)
-    return "".join(result)
+    return text.translate(FULL_TO_HALF_TABLE)
+
+
+class TableRow:
+    """表格的一行：各单元格的(colspan, rowspan, 文本)以及该行序列化后的html"""
+
+    __slots__ = ("cells", "html")
+
+    def __init__(self, cells, html):
+        self.cells = cells
+        self.html = html
+
+    @classmethod
+    def from_tag(cls, row):
+        cells = [
+            (
+                int(cell.get("colspan", 1)),
+                int(cell.get("rowspan", 1)),
+                full_to_half(cell.get_text().strip()),
+            )
+            for cell in row.find_all(["td", "th"])
+        ]
+        return cls(cells, str(row))
+
+
+class TableModel:
+    """跨页合并使用的轻量表格结构。
+
+    每个表格的html只解析一次，得到各行的单元格信息和序列化结果；合并时只在行列表间移动行，
+    合并链结束后再拼接一次html。拼接结果与在BeautifulSoup中移动tr节点后str(soup)一致：
+    head/tail为在第一个tbody(没有时为table)末尾插入标记后序列化并切分得到的两部分。
+    """
+
+    __slots__ = ("rows", "head", "tail", "has_body", "appended_rows")
+
+    def __init__(self, rows, head, tail, has_body):
+        self.rows = rows
+        self.head = head
+        self.tail = tail
+        self.has_body = has_body
+        self.appended_rows = []
+
+    @classmethod
+    def from_html(cls, html):
+        """解析表格html，嵌套表格或tbody之后还有行等结构无法按上述方式拼接，返回None"""
+        soup = BeautifulSoup(html, "html.parser")
+        if len(soup.find_all("table")) > 1:
+            return None
+        rows = [TableRow.from_tag(row) for row in soup.find_all("tr")]
+        body = soup.find("tbody") or soup.find("table")
+        if body is None:
+            return cls(rows, str(soup), "", False)
+        body.append(NavigableString(ROW_INSERT_MARKER))
+        parts = str(soup).split(ROW_INSERT_MARKER)
+        if len(parts) != 2 or TR_TAG_PATTERN.search(parts[1]):
+            return None
+        return cls(rows, parts[0], parts[1], True)
+
+    def append_rows(self, rows):
+        self.rows.extend(rows)
+        self.appended_rows.extend(rows)
+
+    def total_columns(self):
+        """计算表格的总列数，处理rowspan和colspan，与calculate_table_total_columns一致"""
+        max_cols = 0
+        occupied = {}  # {row_idx: {col_idx: True}}
+        for row_idx, row in enumerate(self.rows):
+            col_idx = 0
+            row_occupied = occupied.setdefault(row_idx, {})
+            for colspan, rowspan, _ in row.cells:
+                while col_idx in row_occupied:
+                    col_idx += 1
+                for r in range(row_idx, row_idx + rowspan):
+                    occupied_r = occupied.setdefault(r, {})
+                    for c in range(col_idx, col_idx + colspan):
+                        occupied_r[c] = True
+                col_idx += colspan
+                max_cols = max(max_cols, col_idx)
+        return max_cols
+
+    def to_html(self):
+        return self.head + "".join(row.html for row in self.appended_rows) + self.tail
 
 
 def calculate_table_total_columns(soup):
@@ -166,43 +249,120 @@ def detect_table_headers(soup1, soup2, max_header_rows=5):
     return header_rows, headers_match, header_texts
 
 
-def can_merge_tables(current_table_block, previous_table_block):
-    """判断两个表格是否可以合并"""
+def detect_table_model_headers(model1, model2, max_header_rows=5):
+    """与detect_table_headers相同，作用于TableModel
+
+    Returns:
+        tuple: (表头行数, 表头是否一致, 表头文本列表)
+    """
+    rows1 = model1.rows
+    rows2 = model2.rows
+
+    min_rows = min(len(rows1), len(rows2), max_header_rows)
+    header_rows = 0
+    headers_match = True
+    header_texts = []
+
+    for i in range(min_rows):
+        # 单元格数量以及每个单元格的colspan、rowspan和文本都一致
+        if rows1[i].cells == rows2[i].cells:
+            header_rows += 1
+            header_texts.append([text for _, _, text in rows1[i].cells])
+        else:
+            headers_match = header_rows > 0  # 只有当至少匹配了一行时，才认为表头匹配
+            break
+
+    if header_rows == 0:
+        headers_match = False
+
+    return header_rows, headers_match, header_texts
+
+
+def check_table_model_rows_match(model1, model2):
+    """与check_rows_match相同，作用于TableModel"""
+    rows1 = model1.rows
+    rows2 = model2.rows
+
+    if not (rows1 and rows2):
+        return False
+
+    # 获取第一个表的最后一行数据行
+    last_row = next((row for row in reversed(rows1) if row.cells), None)
+
+    # 检测表头行数，以便获取第二个表的首个数据行
+    header_count, _, _ = detect_table_model_headers(model1, model2)
+    first_data_row = rows2[header_count] if len(rows2) > header_count else None
+
+    if not (last_row and first_data_row):
+        return False
+
+    last_row_cols = sum(colspan for colspan, _, _ in last_row.cells)
+    first_row_cols = sum(colspan for colspan, _, _ in first_data_row.cells)
+
+    # 同时考虑实际列数匹配和视觉列数匹配
+    return last_row_cols == first_row_cols or len(last_row.cells) == len(
+        first_data_row.cells
+    )
+
+
+def get_table_body_span(table_block):
+    for block in table_block["blocks"]:
+        if (
+            block["type"] == BlockType.TABLE_BODY
+            and block["lines"]
+            and block["lines"][0]["spans"]
+        ):
+            return block["lines"][0]["spans"][0]
+    return None
+
+
+def get_table_html(table_block, table_models):
+    """表格当前的html，合并过的表格由TableModel拼接"""
+    model = table_models.get(id(table_block))
+    if model is not None and model.appended_rows:
+        return model.to_html()
+    span = get_table_body_span(table_block)
+    return span.get("html", "") if span is not None else ""
+
+
+def get_table_model(table_block, html, table_models):
+    """同一个表格在合并链中只解析一次"""
+    key = id(table_block)
+    if key not in table_models:
+        table_models[key] = TableModel.from_html(html)
+    return table_models[key]
+
+
+def can_merge_tables(current_table_block, previous_table_block, table_models):
+    """判断两个表格是否可以合并
+
+    Returns:
+        tuple: (是否可以合并, 前一个表格, 当前表格)，表格为TableModel；
+        任一表格无法使用TableModel时为BeautifulSoup对象
+    """
     # 检查表格是否有caption和footnote
     if any(
         block["type"] == BlockType.TABLE_CAPTION
         for block in current_table_block["blocks"]
     ):
-        return False, None, None, None, None
+        return False, None, None
 
     if any(
         block["type"] == BlockType.TABLE_FOOTNOTE
         for block in previous_table_block["blocks"]
     ):
-        return False, None, None, None, None
+        return False, None, None
 
     # 获取两个表格的HTML内容
-    current_html = ""
-    previous_html = ""
-
-    for block in current_table_block["blocks"]:
-        if (
-            block["type"] == BlockType.TABLE_BODY
-            and block["lines"]
-            and block["lines"][0]["spans"]
-        ):
-            current_html = block["lines"][0]["spans"][0].get("html", "")
-
-    for block in previous_table_block["blocks"]:
-        if (
-            block["type"] == BlockType.TABLE_BODY
-            and block["lines"]
-            and block["lines"][0]["spans"]
-        ):
-            previous_html = block["lines"][0]["spans"][0].get("html", "")
-
-    if not current_html or not previous_html:
-        return False, None, None, None, None
+    current_span = get_table_body_span(current_table_block)
+    previous_span = get_table_body_span(previous_table_block)
+    if not (
+        current_span
+        and current_span.get("html", "")
+        and previous_span
+        and previous_span.get("html", "")
+    ):
+        return False, None, None
 
     # 检查表格宽度差异
     x0_t1, y0_t1, x1_t1, y1_t1 = current_table_block["bbox"]
@@ -211,22 +371,30 @@ def can_merge_tables(current_table_block, previous_table_block):
     table2_width = x1_t2 - x0_t2
 
     if abs(table1_width - table2_width) / min(table1_width, table2_width) >= 0.1:
-        return False, None, None, None, None
-
-    # 解析HTML并检查表格结构
-    soup1 = BeautifulSoup(previous_html, "html.parser")
-    soup2 = BeautifulSoup(current_html, "html.parser")
+        return False, None, None
+
+    current_html = get_table_html(current_table_block, table_models)
+    previous_html = get_table_html(previous_table_block, table_models)
+    model1 = get_table_model(previous_table_block, previous_html, table_models)
+    model2 = get_table_model(current_table_block, current_html, table_models)
+
+    if model1 is None or model2 is None:
+        # 嵌套表格等结构直接在BeautifulSoup上合并
+        soup1 = BeautifulSoup(previous_html, "html.parser")
+        soup2 = BeautifulSoup(current_html, "html.parser")
+        tables_match = calculate_table_total_columns(
+            soup1
+        ) == calculate_table_total_columns(soup2)
+        rows_match = check_rows_match(soup1, soup2)
+        return (tables_match or rows_match), soup1, soup2
 
     # 检查整体列数匹配
-    table_cols1 = calculate_table_total_columns(soup1)
-    table_cols2 = calculate_table_total_columns(soup2)
-    # logger.debug(f"Table columns - Previous: {table_cols1}, Current: {table_cols2}")
-    tables_match = table_cols1 == table_cols2
+    tables_match = model1.total_columns() == model2.total_columns()
 
     # 检查首末行列数匹配
-    rows_match = check_rows_match(soup1, soup2)
+    rows_match = check_table_model_rows_match(model1, model2)
 
-    return (tables_match or rows_match), soup1, soup2, current_html, previous_html
+    return (tables_match or rows_match), model1, model2
 
 
 def check_rows_match(soup1, soup2):
@@ -269,8 +437,16 @@ def check_rows_match(soup1, soup2):
     )
 
 
+def append_table_footnotes(previous_table_block, wait_merge_table_footnotes):
+    """添加待合并表格的footnote到前一个表格中"""
+    for table_footnote in wait_merge_table_footnotes:
+        temp_table_footnote = table_footnote.copy()
+        temp_table_footnote[SplitFlag.CROSS_PAGE] = True
+        previous_table_block["blocks"].append(temp_table_footnote)
+
+
 def perform_table_merge(soup1, soup2, previous_table_block, wait_merge_table_footnotes):
-    """执行表格合并操作"""
+    """在BeautifulSoup上执行表格合并操作"""
     # 检测表头有几行，并确认表头内容是否一致
     header_count, headers_match, header_texts = detect_table_headers(soup1, soup2)
     # logger.debug(f"检测到表头行数: {header_count}, 表头匹配: {headers_match}")
@@ -291,17 +467,29 @@ def perform_table_merge(soup1, soup2, previous_table_block, wait_merge_table_foo
             row.extract()
             tbody1.append(row)
 
-    # 添加待合并表格的footnote到前一个表格中
-    for table_footnote in wait_merge_table_footnotes:
-        temp_table_footnote = table_footnote.copy()
-        temp_table_footnote[SplitFlag.CROSS_PAGE] = True
-        previous_table_block["blocks"].append(temp_table_footnote)
+    append_table_footnotes(previous_table_block, wait_merge_table_footnotes)
 
     return str(soup1)
 
 
+def perform_table_model_merge(
+    model1, model2, previous_table_block, wait_merge_table_footnotes
+):
+    """在TableModel上执行表格合并操作，html在合并全部完成后再生成"""
+    header_count, _, _ = detect_table_model_headers(model1, model2)
+
+    # 将第二个表格的行（跳过表头行）添加到第一个表格中
+    if model1.has_body and model2.has_body:
+        model1.append_rows(model2.rows[header_count:])
+
+    append_table_footnotes(previous_table_block, wait_merge_table_footnotes)
+
+
 def merge_table(page_info_list):
     """合并跨页表格"""
+    # id(table block) -> TableModel，无法使用TableModel的表格为None
+    table_models = {}
+    merged_table_blocks = {}
     # 倒序遍历每一页
     for page_idx in range(len(page_info_list) - 1, -1, -1):
         # 跳过第一页，因为它没有前一页
@@ -337,29 +525,35 @@ def merge_table(page_info_list):
         ]
 
         # 检查两个表格是否可以合并
-        can_merge, soup1, soup2, current_html, previous_html = can_merge_tables(
-            current_table_block, previous_table_block
+        can_merge, table1, table2 = can_merge_tables(
+            current_table_block, previous_table_block, table_models
         )
 
         if not can_merge:
             continue
 
         # 执行表格合并
-        merged_html = perform_table_merge(
-            soup1, soup2, previous_table_block, wait_merge_table_footnotes
-        )
-
-        # 更新previous_table_block的html
-        for block in previous_table_block["blocks"]:
-            if (
-                block["type"] == BlockType.TABLE_BODY
-                and block["lines"]
-                and block["lines"][0]["spans"]
-            ):
-                block["lines"][0]["spans"][0]["html"] = merged_html
-                break
+        if isinstance(table1, TableModel):
+            perform_table_model_merge(
+                table1, table2, previous_table_block, wait_merge_table_footnotes
+            )
+            merged_table_blocks[id(previous_table_block)] = previous_table_block
+        else:
+            merged_html = perform_table_merge(
+                table1, table2, previous_table_block, wait_merge_table_footnotes
+            )
+            # 更新previous_table_block的html，之后按新的html处理
+            get_table_body_span(previous_table_block)["html"] = merged_html
+            table_models[id(previous_table_block)] = None
+            merged_table_blocks.pop(id(previous_table_block), None)
 
         # 删除当前页的table
         for block in current_table_block["blocks"]:
             block["lines"] = []
             block[SplitFlag.LINES_DELETED] = True
+
+    # 合并完成后每个表格只生成一次html，已被合并到前一页的表格不再输出
+    for table_block in merged_table_blocks.values():
+        span = get_table_body_span(table_block)
+        if span is not None:
+            span["html"] = table_models[id(table_block)].to_html()
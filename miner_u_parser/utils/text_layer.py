@@ -0,0 +1,92 @@
+import os
+
+import cv2
+import numpy as np
+
+from miner_u_parser.utils.ocr_utils import (
+    OcrConfidence,
+    bbox_to_points,
+    points_to_bbox,
+    update_det_boxes,
+)
+
+# 区域内墨迹像素被文本层行框覆盖的比例不低于该值时，直接使用文本层的行代替ocr-det
+MIN_TEXT_LAYER_COVERAGE = 0.9
+INK_THRESHOLD = 200
+
+
+def text_layer_fast_path_enabled() -> bool:
+    return os.getenv("MINERU_TEXT_LAYER_FAST_PATH", "true").lower() == "true"
+
+
+def get_page_text_lines(page_text_layer, scale):
+    """从页面的文本层(PageTextLayer)取非旋转、非空的行框，坐标转换到页面图片的像素坐标"""
+    line_bboxes = []
+    for line in page_text_layer.lines():
+        if not line["text"].strip():
+            continue
+        x0, y0, x1, y1 = line["bbox"]
+        line_bboxes.append([x0 * scale, y0 * scale, x1 * scale, y1 * scale])
+    return line_bboxes
+
+
+def region_text_lines(region_bbox, line_bboxes):
+    """中心点落在区域内的行，裁剪到区域范围内"""
+    rx0, ry0, rx1, ry1 = region_bbox
+    lines = []
+    for x0, y0, x1, y1 in line_bboxes:
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        if rx0 <= cx <= rx1 and ry0 <= cy <= ry1:
+            lines.append([max(x0, rx0), max(y0, ry0), min(x1, rx1), min(y1, ry1)])
+    return lines
+
+
+def region_text_coverage(gray_img, region_bbox, lines) -> float:
+    """区域内墨迹像素被文本层行框覆盖的比例，没有墨迹时为1"""
+    rx0, ry0, rx1, ry1 = [int(v) for v in region_bbox]
+    ink = gray_img[ry0:ry1, rx0:rx1] < INK_THRESHOLD
+    ink_count = np.count_nonzero(ink)
+    if ink_count == 0:
+        return 1.0
+    covered = np.zeros_like(ink)
+    for x0, y0, x1, y1 in lines:
+        # 行框按字形外框给出，上下各放宽1像素
+        covered[
+            max(int(y0) - ry0 - 1, 0) : int(np.ceil(y1)) - ry0 + 1,
+            max(int(x0) - rx0 - 1, 0) : int(np.ceil(x1)) - rx0 + 1,
+        ] = True
+    return np.count_nonzero(ink & covered) / ink_count
+
+
+def build_text_layer_spans(ocr_res_list, np_img, line_bboxes, mfd_res):
+    """用文本层的行框为文本类区域生成span，代替ocr-det。
+
+    返回(生成的span列表, 文本层覆盖不足、仍需要ocr-det的区域列表)。
+    生成的span与txt模式下ocr-det的结果格式一致，后续由txt_spans_extract填充字符。
+    """
+    gray_img = cv2.cvtColor(np_img, cv2.COLOR_RGB2GRAY)
+    spans = []
+    need_det_list = []
+    for res in ocr_res_list:
+        region_bbox = [res["poly"][0], res["poly"][1], res["poly"][4], res["poly"][5]]
+        lines = region_text_lines(region_bbox, line_bboxes)
+        if region_text_coverage(gray_img, region_bbox, lines) < MIN_TEXT_LAYER_COVERAGE:
+            need_det_list.append(res)
+            continue
+        dt_boxes = [bbox_to_points(line) for line in lines]
+        # 与ocr-det路径一致，去掉行内公式所在的部分
+        if dt_boxes and mfd_res:
+            dt_boxes = update_det_boxes(dt_boxes, mfd_res)
+        for box in dt_boxes:
+            x0, y0, x1, y1 = [float(v) for v in points_to_bbox(box)]
+            if x1 - x0 < OcrConfidence.min_width:
+                continue
+            spans.append(
+                {
+                    "category_id": 15,
+                    "poly": [x0, y0, x1, y0, x1, y1, x0, y1],
+                    "score": 1.0,
+                    "text": "",
+                }
+            )
+    return spans, need_det_list
@@ -0,0 +1,39 @@
+import numpy as np
+from PIL import Image
+
+from miner_u_parser.backend.pipeline import batch_tuner
+from miner_u_parser.backend.pipeline.batch_tuner import BatchSizeTuner, largest_size_group
+
+
+def test_largest_size_group_handles_arrays_and_pil_images():
+    arrays = [np.zeros((10, 20, 3)), np.zeros((30, 20, 3)), np.zeros((10, 20, 3))]
+    assert len(largest_size_group(arrays)) == 2
+
+    images = [Image.new("RGB", (20, 10)), Image.new("RGB", (10, 20)), Image.new("RGB", (10, 20))]
+    assert [img.size for img in largest_size_group(images)] == [(10, 20), (10, 20)]
+
+
+def test_calibration_uses_same_size_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_tuner, "_cpu_memory_budget", lambda: (0, 1))
+    monkeypatch.setattr(batch_tuner, "_memory_fraction", lambda device, cpu_budget: 0.0)
+    seen_sizes = []
+
+    def predict_fn(images):
+        seen_sizes.append({img.shape for img in images})
+        return [None] * len(images)
+
+    samples = [np.zeros((64, 64, 3)), np.zeros((32, 96, 3)), np.zeros((64, 64, 3))]
+    tuner = BatchSizeTuner(cache_path=str(tmp_path / "batch_sizes.json"))
+    tuner.get_batch_size("test", predict_fn, samples, "cpu")
+
+    assert seen_sizes
+    assert all(sizes == {(64, 64, 3)} for sizes in seen_sizes)
+
+
+def test_cpu_memory_fraction_is_process_rss_delta(monkeypatch):
+    from miner_u_parser.utils import model_utils
+
+    monkeypatch.setattr(model_utils, "get_process_rss", lambda: 300)
+    assert batch_tuner._memory_fraction("cpu", (100, 1000)) == 0.2
+    monkeypatch.setattr(model_utils, "get_process_rss", lambda: 50)
+    assert batch_tuner._memory_fraction("cpu", (100, 1000)) == 0.0
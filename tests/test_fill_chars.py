@@ -0,0 +1,99 @@
+import copy
+import json
+import statistics
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from miner_u_parser.utils.span_pre_proc import (  # noqa: E402
+    __replace_ligatures,
+    __replace_unicode,
+    calculate_char_in_span,
+    fill_char_in_spans,
+)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "fill_chars_page.json"
+
+
+def chars_to_content_reference(span):
+    """原来逐字符拼接content的实现"""
+    if span["chars"]:
+        span["chars"] = sorted(span["chars"], key=lambda x: x["char_idx"])
+        median_width = statistics.median(c["bbox"][2] - c["bbox"][0] for c in span["chars"])
+        content = ""
+        for i, char in enumerate(span["chars"]):
+            next_char = span["chars"][i + 1] if i + 1 < len(span["chars"]) else None
+            if (
+                next_char
+                and next_char["bbox"][0] - char["bbox"][2] > median_width * 0.25
+                and char["char"] != " "
+                and next_char["char"] != " "
+            ):
+                content += f"{char['char']} "
+            else:
+                content += char["char"]
+        content = __replace_unicode(content)
+        content = __replace_ligatures(content)
+        content = __replace_ligatures(content)
+        span["content"] = content.strip()
+    del span["chars"]
+
+
+def fill_char_in_spans_reference(spans, all_chars):
+    """原来的实现：每个字符分配给按y0排序后第一个满足calculate_char_in_span的span"""
+    spans = sorted(spans, key=lambda x: x["bbox"][1])
+    for span in spans:
+        span["chars"] = []
+    for char in all_chars:
+        for span in spans:
+            if calculate_char_in_span(char["bbox"], span["bbox"], char["char"]):
+                span["chars"].append(char)
+                break
+    need_ocr_spans = []
+    for span in spans:
+        chars_to_content_reference(span)
+        if len(span["content"]) * span["height"] < span["width"] * 0.5:
+            need_ocr_spans.append(span)
+        del span["height"], span["width"]
+    return need_ocr_spans
+
+
+def load_fixture():
+    data = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    chars = [
+        {"bbox": c[:4], "char": c[4], "char_idx": c[5]} for c in data["chars"]
+    ]
+    spans = [
+        {
+            "bbox": bbox,
+            "type": "text",
+            "content": "",
+            "score": 1.0,
+            "height": bbox[3] - bbox[1],
+            "width": bbox[2] - bbox[0],
+        }
+        for bbox in data["spans"]
+    ]
+    return chars, spans
+
+
+def test_fill_char_in_spans_matches_reference():
+    chars, spans = load_fixture()
+    reference_spans = copy.deepcopy(spans)
+    reference_need_ocr = fill_char_in_spans_reference(reference_spans, chars)
+
+    page_chars = (
+        np.array([c["bbox"] for c in chars], dtype=np.float64),
+        [c["char"] for c in chars],
+        np.array([c["char_idx"] for c in chars]),
+    )
+    need_ocr = fill_char_in_spans(spans, page_chars, chunk_size=16)
+
+    assert [s["content"] for s in spans] == [s["content"] for s in reference_spans]
+    assert [s["bbox"] for s in need_ocr] == [s["bbox"] for s in reference_need_ocr]
+    # fixture覆盖了拆分的span、空span和span重叠时的首个匹配
+    assert any(s["content"] for s in spans)
+    assert need_ocr
@@ -0,0 +1,118 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from miner_u_parser.data.io import HttpReader, HttpWriter
+
+DATA = bytes(range(256)) * 64
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            hits = self.server.hits[self.path]
+        if self.path == "/flaky" and hits <= 2:
+            return self._send(503)
+        if self.path == "/missing":
+            return self._send(404)
+        range_header = self.headers.get("Range")
+        if range_header and self.path != "/norange":
+            start, end = range_header[len("bytes="):].split("-")
+            end = int(end) if end else len(DATA) - 1
+            body = DATA[int(start) : end + 1]
+            return self._send(
+                206, body, {"Content-Range": f"bytes {start}-{end}/{len(DATA)}"}
+            )
+        return self._send(200, DATA)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        self._send(503 if self.path == "/fail" else 200)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.lock = threading.Lock()
+    httpd.connections = 0
+    httpd.hits = {}
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_sequential_reads_reuse_one_connection(server):
+    with HttpReader() as reader:
+        for _ in range(10):
+            assert reader.read(_url(server, "/doc.pdf")) == DATA
+    assert server.connections == 1
+
+
+def test_read_many_keeps_order_and_pool(server):
+    urls = [_url(server, f"/doc{i}.pdf") for i in range(20)]
+    with HttpReader(pool_size=4) as reader:
+        results = list(reader.read_many(urls))
+        assert [url for url, _ in results] == urls
+        assert all(data == DATA for _, data in results)
+        connections = server.connections
+        # a second batch reuses the keep-alive connections of the first
+        list(reader.read_many(urls))
+    assert connections <= 4
+    assert server.connections == connections
+
+
+@pytest.mark.parametrize("path", ["/doc.pdf", "/norange"])
+@pytest.mark.parametrize("offset, limit", [(0, -1), (5, 10), (100, -1), (0, 1)])
+def test_read_at(server, path, offset, limit):
+    with HttpReader() as reader:
+        data = reader.read_at(_url(server, path), offset, limit)
+    expected = DATA[offset:] if limit < 0 else DATA[offset : offset + limit]
+    assert data == expected
+
+
+def test_read_retries_5xx(server):
+    with HttpReader(max_retries=3, backoff_factor=0) as reader:
+        assert reader.read(_url(server, "/flaky")) == DATA
+    assert server.hits["/flaky"] == 3
+
+
+def test_read_raises_after_client_error(server):
+    with HttpReader(max_retries=3, backoff_factor=0) as reader:
+        with pytest.raises(Exception):
+            reader.read(_url(server, "/missing"))
+    assert server.hits["/missing"] == 1
+
+
+def test_upload_is_not_retried(server):
+    with HttpWriter(max_retries=3, backoff_factor=0) as writer:
+        with pytest.raises(AssertionError):
+            writer.write(_url(server, "/fail"), b"data")
+    assert server.hits["/fail"] == 1
@@ -0,0 +1,66 @@
+from PIL import Image, ImageDraw
+
+from miner_u_parser.utils.enum_class import BlockType
+from miner_u_parser.utils.page_furniture import PageFurnitureTracker
+
+
+def make_page(header_y=20):
+    img = Image.new("RGB", (400, 600), "white")
+    ImageDraw.Draw(img).rectangle((50, header_y, 150, header_y + 10), fill="black")
+    return img
+
+
+def header_region(y0=15):
+    return {"category_id": 2, "poly": [40, y0, 160, y0, 160, y0 + 20, 40, y0 + 20], "score": 0.9}
+
+
+def test_repeated_regions_skip_ocr_det_and_reuse_decision():
+    tracker = PageFurnitureTracker(min_repeats=2)
+    text_region = {"category_id": 1, "poly": [0, 100, 400, 100, 400, 200, 0, 200], "score": 0.9}
+    kept_per_page = []
+    for page_index in range(4):
+        region = header_region()
+        remaining, region_keys = tracker.skip_repeated_regions(
+            [region, text_region], make_page(), page_index, ocr_enable=True
+        )
+        for key in region_keys.values():
+            tracker.record_det_boxes(key, 3)
+        kept_per_page.append(region in remaining)
+
+    assert kept_per_page == [True, True, False, False]
+    assert tracker.skipped_det_regions == 2
+    assert tracker.skipped_rec_crops == 6
+
+    # middle json阶段沿用模型阶段的判定，第3页的同一区域转为占位块
+    block = [40, 15, 160, 35, None, None, None, BlockType.DISCARDED]
+    remaining, keys, placeholders = tracker.split_repeated([block], make_page(), 1, 2)
+    assert remaining == [] and len(placeholders) == 1
+    remaining, keys, placeholders = tracker.split_repeated([block], make_page(), 1, 0)
+    assert remaining == [block] and placeholders == []
+
+
+def test_resolve_reanchors_lines_and_spans():
+    tracker = PageFurnitureTracker(min_repeats=1)
+    tracker.split_repeated(
+        [[40, 15, 160, 35, None, None, None, BlockType.DISCARDED]], make_page(), 1, 0
+    )
+    key = tracker.block_key([40, 15, 160, 35], make_page())
+    source = {
+        "type": BlockType.DISCARDED,
+        "bbox": [40, 15, 160, 35],
+        "lines": [{"bbox": [50, 20, 150, 30], "spans": [{"bbox": [50, 20, 150, 30], "content": "header"}]}],
+    }
+    tracker.register([key], [source])
+
+    # 同样的墨迹略有错位，仍落在同一个位置网格里
+    block = [42, 14, 162, 34, None, None, None, BlockType.DISCARDED]
+    _, _, placeholders = tracker.split_repeated([block], make_page(header_y=19), 1, 1)
+    assert len(placeholders) == 1
+    tracker.resolve()
+
+    placeholder = placeholders[0][1]
+    assert placeholder["bbox"] == [42, 14, 162, 34]
+    assert placeholder["lines"][0]["bbox"] == [52, 19, 152, 29]
+    assert placeholder["lines"][0]["spans"][0]["bbox"] == [52, 19, 152, 29]
+    assert placeholder["lines"][0]["spans"][0]["content"] == "header"
+    assert source["lines"][0]["bbox"] == [50, 20, 150, 30]
@@ -0,0 +1,26 @@
+from miner_u_parser.backend.pipeline.table_routing import (
+    ROUTE_DUAL,
+    ROUTE_WIRED,
+    TableRouteStats,
+)
+
+
+def test_log_returns_snapshot_before_reset():
+    stats = TableRouteStats()
+    stats.record({ROUTE_WIRED: 2, ROUTE_DUAL: 1}, fallbacks=1)
+
+    summary = stats.log()
+
+    assert summary["tables"] == 3
+    assert summary["invocations"] == 5
+    assert stats.last_summary == summary
+    assert stats.summary()["tables"] == 0
+
+
+def test_log_without_reset_keeps_counters():
+    stats = TableRouteStats()
+    stats.record({ROUTE_WIRED: 1})
+
+    stats.log(reset=False)
+
+    assert stats.summary()["tables"] == 1